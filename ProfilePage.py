@@ -1,6 +1,9 @@
+import threading
 import tkinter as tk
 from tkinter import messagebox, filedialog
-from PIL import Image, ImageTk
+
+import image_loader
+import thumbnails
 
 
 users = {
@@ -33,17 +36,11 @@ def open_home_screen(user_email):
 
     tk.Label(home, text=f"Welcome, {user['name']}!", font=("Arial", 14)).pack(pady=10)
 
-    # Profile Picture
+    # Profile Picture: the 128 px thumbnail made at upload, loaded off the Tk thread
     if user["profile_picture"]:
-        try:
-            img = Image.open(user["profile_picture"])
-            img = img.resize((100, 100))
-            photo = ImageTk.PhotoImage(img)
-            img_label = tk.Label(home, image=photo)
-            img_label.image = photo
-            img_label.pack(pady=5)
-        except Exception:
-            tk.Label(home, text="[Error loading image]").pack()
+        img_label = tk.Label(home)
+        image_loader.get_loader(home).show_avatar(img_label, user.get("avatar_key"), user["profile_picture"], 128)
+        img_label.pack(pady=5)
 
     # Display profile details
     tk.Label(home, text=f"Email: {user['email']}").pack()
@@ -85,11 +82,37 @@ def edit_profile(user_email, parent):
             title="Select Profile Picture",
             filetypes=[("Image Files", "*.png;*.jpg;*.jpeg")]
         )
-        if file_path:
+        if not file_path:
+            return
+        # Decoding and shrinking a large photo takes a while; keep it off the Tk thread
+        result = {}
+
+        def run():
+            try:
+                result['key'] = thumbnails.make_thumbnails(file_path)
+            except (ImportError, OSError) as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        upload_button.config(state=tk.DISABLED, text="Processing picture...")
+
+        def check_done():
+            if worker.is_alive():
+                edit_win.after(50, check_done)
+                return
+            upload_button.config(state=tk.NORMAL, text="Upload Picture")
+            if 'error' in result:
+                messagebox.showerror("Error", f"Could not use this picture: {result['error']}", parent=edit_win)
+                return
+            user["avatar_key"] = result['key']
             user["profile_picture"] = file_path
-            messagebox.showinfo("Success", "Profile picture updated!")
+            messagebox.showinfo("Success", "Profile picture updated!", parent=edit_win)
+
+        edit_win.after(50, check_done)
 
-    tk.Button(edit_win, text="Upload Picture", command=upload_picture).pack(pady=5)
+    upload_button = tk.Button(edit_win, text="Upload Picture", command=upload_picture)
+    upload_button.pack(pady=5)
 
     def save_changes():
         user["name"] = name_entry.get()
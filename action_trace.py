@@ -0,0 +1,110 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# A trace is a JSONL file with one record per user action in the Tk apps:
+#
+#   {"ts": 1746100800.123, "app": "posts", "session": "3f2a9c1e77d0",
+#    "user": "student@dcccd.edu", "action": "react",
+#    "params": {"post_id": 42, "reaction": "like"}}
+#
+# ts is the wall clock time when the action started, session is one run of
+# one app, and params hold what is needed to perform the action again.
+# replay_trace.py does that against a copy of the database. Apart from the
+# account email that identifies the user, typed text (posts, comments, names,
+# search terms, filters) is recorded by length only and other users are
+# referred to by row id. Passwords are never recorded.
+#
+# Recording is off unless the SOCIAL_TRACE environment variable names the
+# file to append to (or is "1" for DEFAULT_TRACE_FILE). record() is then a
+# dict build and a list append. Records are written in batches when
+# FLUSH_RECORDS are waiting, every FLUSH_SECONDS from a background thread (so
+# an idle app doesn't hold on to its last actions), and when the app exits.
+# One write per batch, so apps sharing a trace file don't interleave partial
+# lines.
+
+TRACE_ENV = "SOCIAL_TRACE"
+DEFAULT_TRACE_FILE = "action_trace.jsonl"
+FLUSH_RECORDS = 64
+FLUSH_SECONDS = 2.0
+
+
+class TraceWriter:
+    """Buffers trace records of one app session and appends them to a file."""
+
+    def __init__(self, path, app, flush_records=FLUSH_RECORDS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.app = app
+        self.session = os.urandom(6).hex()
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.lock = threading.Lock()
+        # Held while writing, so a timed flush and a full-buffer flush keep batches in order
+        self.write_lock = threading.Lock()
+        self.closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, name="action-trace", daemon=True).start()
+        atexit.register(self.close)
+
+    def record(self, action, user=None, **params):
+        line = json.dumps({"ts": round(time.time(), 3), "app": self.app, "session": self.session,
+                           "user": user, "action": action, "params": params}, separators=(",", ":"))
+        with self.lock:
+            self.buffer.append(line)
+            due = len(self.buffer) >= self.flush_records
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                lines, self.buffer = self.buffer, []
+            if lines:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        """Stops the flush thread and writes what is left."""
+        self.closed.set()
+        self.flush()
+
+    def _flush_periodically(self):
+        while not self.closed.wait(self.flush_seconds):
+            self.flush()
+
+
+_writer = None
+
+
+def start(app, path=None):
+    """Starts recording the actions of `app` if SOCIAL_TRACE (or path) is set. Returns the writer or None."""
+    global _writer
+    path = path or os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    if path == "1":
+        path = DEFAULT_TRACE_FILE
+    _writer = TraceWriter(path, app)
+    return _writer
+
+
+def record(action, user=None, **params):
+    """Adds one action to the trace; does nothing while recording is off."""
+    if _writer is not None:
+        _writer.record(action, user, **params)
+
+
+def read_trace(path):
+    """Yields the records of a trace file in file order, skipping lines that don't parse."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave half a line at the end
+                continue
@@ -0,0 +1,93 @@
+"""Benchmark threaded comments on deep and wide threads.
+
+Builds a throwaway copy of the posts.py schema, then times reply inserts,
+subtree fetches, reply counts and full-thread rendering queries.
+
+    python benchmarks/bench_comment_threads.py --depth 500 --width 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import posts  # noqa: E402
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<38} {elapsed * 1000:9.3f} ms")
+    return result
+
+
+def build_deep(post_id, email, depth):
+    """A single reply chain: every comment answers the previous one."""
+    ids = []
+    parent = None
+    start = time.perf_counter()
+    for i in range(depth):
+        posts.add_comment(post_id, email, f"deep {i}", parent_id=parent)
+        parent = last_comment_id()
+        ids.append(parent)
+    elapsed = time.perf_counter() - start
+    print(f"  insert {depth} chained replies           {elapsed / depth * 1000:9.3f} ms/insert")
+    return ids
+
+
+def build_wide(post_id, email, width):
+    """One root comment with `width` direct replies."""
+    posts.add_comment(post_id, email, "wide root")
+    root = last_comment_id()
+    start = time.perf_counter()
+    for i in range(width):
+        posts.add_comment(post_id, email, f"wide {i}", parent_id=root)
+    elapsed = time.perf_counter() - start
+    print(f"  insert {width} sibling replies          {elapsed / width * 1000:9.3f} ms/insert")
+    return root
+
+
+def last_comment_id():
+    conn = posts.get_conn()
+    try:
+        return conn.execute("SELECT MAX(id) FROM comments").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=500, help="length of the deep reply chain")
+    parser.add_argument("--width", type=int, default=5000, help="number of replies in the wide thread")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions for each read query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        posts.DB_FILE = os.path.join(tmp, "bench_threads.db")
+        posts.setup_database()
+        user_id = posts.create_user("bench", "bench@example.com")
+        email = "bench@example.com"
+
+        print(f"Deep thread (depth={args.depth})")
+        deep_post = posts.create_post(user_id, "deep thread")
+        chain = build_deep(deep_post, email, args.depth)
+        timed("fetch whole thread in path order", lambda: posts.get_comment_thread(deep_post), args.repeat)
+        mid = chain[len(chain) // 2]
+        timed("fetch subtree from the middle", lambda: posts.get_comment_thread(deep_post, mid), args.repeat)
+        timed("count descendants of the root", lambda: posts.count_subtree(chain[0]), args.repeat)
+        timed("reply counts for every comment", lambda: posts.get_reply_counts(chain[:900]), args.repeat)
+
+        print(f"Wide thread (width={args.width})")
+        wide_post = posts.create_post(user_id, "wide thread")
+        root = build_wide(wide_post, email, args.width)
+        timed("fetch whole thread in path order", lambda: posts.get_comment_thread(wide_post), args.repeat)
+        timed("fetch subtree of the root", lambda: posts.get_comment_thread(wide_post, root), args.repeat)
+        timed("count descendants of the root", lambda: posts.count_subtree(root), args.repeat)
+        timed("reply count of the root", lambda: posts.get_reply_counts([root]), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark credential lookups against re-parsing credentials.txt per login.
+
+Writes a credentials file of --lines lines in which a share of the emails
+are registered more than once, then times the old try_login approach
+(clear and re-read the whole file on every attempt) against the
+CredentialStore: first load, lookups on an unchanged file, a lookup after
+one appended registration, and compaction.
+
+    python benchmarks/bench_credential_store.py --lines 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import credential_store  # noqa: E402
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<40} {elapsed * 1000:10.3f} ms")
+    return result
+
+
+def write_credentials(path, lines, duplicate_ratio, seed):
+    rng = random.Random(seed)
+    unique = max(1, int(lines * (1 - duplicate_ratio)))
+    with open(path, "w") as f:
+        for i in range(lines):
+            n = i if i < unique else rng.randrange(unique)
+            f.write(f"student{n}@dccc.edu,pw{rng.getrandbits(32):08x}\n")
+    return unique
+
+
+def old_try_login(path, email):
+    """What try_login did before the store: rebuild the dict on every attempt."""
+    login_credentials = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                e, password = line.split(",")
+                login_credentials[e.strip()] = password.strip()
+    return login_credentials.get(email)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000, help="lines in the credentials file")
+    parser.add_argument("--duplicates", type=float, default=0.3, help="share of lines re-registering an email")
+    parser.add_argument("--repeat", type=int, default=1000, help="lookups timed on the unchanged file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "credentials.txt")
+        unique = write_credentials(path, args.lines, args.duplicates, args.seed)
+        size = os.path.getsize(path)
+        print(f"{args.lines} lines, {unique} emails, {size / 1e6:.1f} MB")
+        email = f"student{unique // 2}@dccc.edu"
+
+        timed("old try_login (re-parse per attempt)", lambda: old_try_login(path, email), 3)
+        store = credential_store.CredentialStore(path)
+        timed("store: first load", store.refresh)
+        timed("store: lookup, file unchanged", lambda: store.get(email), args.repeat)
+        timed("store: lookup after one registration",
+              lambda: (store.add(f"new{time.perf_counter_ns()}@dccc.edu", "secret1"), store.get(email)), 20)
+        timed("store: compaction", store.compact)
+        print(f"  after compaction: {os.path.getsize(path) / 1e6:.1f} MB, {store.lines} lines")
+        # Another program (or an older version of the apps) rewrites the file in place
+        with open(path, "w") as f:
+            f.write("changed@dccc.edu,secret1\n")
+            f.writelines(f"{e},{p}\n" for e, p in list(store.credentials.items()))
+        timed("store: reload after in-place rewrite", store.refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Time the data-access functions behind the hot screens at several data sizes.
+
+For each --scales entry a feed database and an accounts database are made
+with generate_dataset.py (same seed, so every run sees the same rows), and
+each case below is called with fresh random arguments until it has run for
+--min-time seconds or --max-calls times:
+
+* posts.py: fetch_posts, get_comments_for_post, get_reaction_counts,
+  set_reaction, follow_user, add_comment;
+* ddcsocial_media_app.py: verify_user_credentials, find_students (the
+  search screen's query) and get_all_users.
+
+Results go to a JSON file that benchmarks/compare_results.py compares with
+an earlier run. The account hashes are made with --iterations PBKDF2 rounds
+and that cost is made the current one, so logins time the lookup rather
+than 600k rounds of hashing and never rehash.
+
+    python benchmarks/bench_data_access.py --scales 10000,100000,1000000 --output after.json
+    python benchmarks/compare_results.py before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from random import Random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ddcsocial_media_app as app  # noqa: E402
+import generate_dataset  # noqa: E402
+import password_hashing  # noqa: E402
+import posts  # noqa: E402
+
+SEARCH_TERMS = ["an", "Lee", "mar", "Kim", "Sofia", "zz"]
+
+
+def feed_cases(rng, users, post_count, emails):
+    """(name, fn) pairs; each fn makes its own random arguments."""
+    first_post = 1
+
+    def some_post():
+        return first_post + rng.randrange(post_count)
+
+    def some_user():
+        return 1 + rng.randrange(users)
+
+    return [
+        ("fetch_posts", posts.fetch_posts),
+        ("get_comments_for_post", lambda: posts.get_comments_for_post(some_post())),
+        ("get_reaction_counts", lambda: posts.get_reaction_counts(some_post())),
+        ("set_reaction", lambda: posts.set_reaction(some_post(), some_user(), rng.choice(("like", "dislike")))),
+        ("follow_user", lambda: posts.follow_user(*rng.sample(range(1, users + 1), 2))),
+        ("add_comment", lambda: posts.add_comment(some_post(), rng.choice(emails), "Benchmark comment")),
+    ]
+
+
+def account_cases(rng, emails):
+    return [
+        ("verify_user_credentials",
+         lambda: app.verify_user_credentials(rng.choice(emails), generate_dataset.DATASET_PASSWORD)),
+        ("find_students", lambda: app.find_students(rng.choice(SEARCH_TERMS), rng.choice(emails))),
+        ("get_all_users", app.get_all_users),
+    ]
+
+
+def measure(fn, min_time, max_calls):
+    """Calls fn until min_time has passed or max_calls were made. Returns seconds per call."""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_calls and (len(samples) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "calls": len(samples),
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_scale(tmp, rows, args, results):
+    rng = Random(f"{args.seed}-{rows}")
+    counts = {table: max(1, int(rows * share)) for table, share in generate_dataset.ROW_MIX.items()}
+    counts['users'] = max(counts['users'], 2)
+    print(f"--- {rows:,} rows ---")
+    feed_db = os.path.join(tmp, f"feed-{rows}.db")
+    accounts_db = os.path.join(tmp, f"accounts-{rows}.db")
+    generate_dataset.generate_feed(feed_db, counts, args.seed)
+    generate_dataset.generate_accounts(accounts_db, counts['users'], args.seed, args.iterations)
+
+    posts.DB_FILE = feed_db
+    conn = sqlite3.connect(feed_db)
+    feed_emails = [r[0] for r in conn.execute("SELECT email FROM users")]
+    post_count = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    conn.close()
+    app.DB_NAME = accounts_db
+    conn = sqlite3.connect(accounts_db)
+    account_emails = [r[0] for r in conn.execute("SELECT email FROM users WHERE role = 'user'")]
+    conn.close()
+
+    cases = feed_cases(rng, counts['users'], post_count, feed_emails) + account_cases(rng, account_emails)
+    for name, fn in cases:
+        if args.only and name not in args.only:
+            continue
+        stats = summarize(measure(fn, args.min_time, args.max_calls))
+        results[f"{name}@{rows}"] = {"case": name, "rows": rows, **stats}
+        print(f"  {name:<26} median {stats['median_ms']:10.3f} ms   p95 {stats['p95_ms']:10.3f} ms   "
+              f"({stats['calls']} calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000", help="comma separated --rows values for generate_dataset")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to keep calling each case")
+    parser.add_argument("--max-calls", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=1000, help="PBKDF2 iterations of the account hashes")
+    parser.add_argument("--seed", default="42")
+    parser.add_argument("--only", nargs="*", help="case names to run (default: all)")
+    parser.add_argument("--output", default="bench_data_access.json")
+    args = parser.parse_args()
+
+    # Generated hashes count as current, so verify_user_credentials never rehashes
+    password_hashing.PBKDF2_ITERATIONS = args.iterations
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        # setup_database and friends print and may create files in the cwd
+        os.chdir(tmp)
+        try:
+            for rows in map(int, args.scales.split(",")):
+                run_scale(tmp, rows, args, results)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Measure memory while scrolling a posts.py feed full of image attachments.
+
+Fills a throwaway database with posts that each carry an image attachment,
+opens the feed and scrolls it top to bottom. It prints the process RSS, the
+image loader's cache size and how many labels hold a full thumbnail at each
+step. --eager loads every thumbnail up front with no cache limit, which is
+how a feed without lazy loading behaves.
+
+Needs a display (run it under xvfb-run on a headless machine). Pillow is
+not needed: the images are generated as PNGs here.
+
+    python benchmarks/bench_feed_memory.py --posts 300
+    python benchmarks/bench_feed_memory.py --posts 300 --eager
+"""
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+import tkinter as tk
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import posts  # noqa: E402
+
+
+def png_bytes(width, height, seed):
+    """A gradient PNG that differs per seed, so no two posts share a blob."""
+    base = bytes((x * 7 + seed * 13) % 256 for x in range(width * 3 + 256 * 3))
+    raw = b"".join(b"\x00" + base[(y % 256) * 3:(y % 256) * 3 + width * 3] for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b""))
+
+
+def build(count, width, height):
+    user_id = posts.create_user("bench", "bench@example.com")
+    preview_height = max(1, posts.PREVIEW_SIDE * height // width)
+    start = time.perf_counter()
+    for i in range(count):
+        thumb = png_bytes(width, height, i)
+        attachment = {'image': thumb, 'thumb': thumb, 'thumb_width': width, 'thumb_height': height,
+                      'preview': png_bytes(posts.PREVIEW_SIDE, preview_height, i)}
+        posts.create_post(user_id, f"post {i}", [attachment])
+    print(f"Built {count} posts with {width}x{height} attachments in {time.perf_counter() - start:.1f}s")
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, in KiB on Linux
+
+
+def settle(root, app, timeout=10.0):
+    """Runs the event loop until no image load is outstanding."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        root.update()
+        if not app.images._waiting and not app.image_check_pending:
+            return
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--width", type=int, default=posts.FEED_IMAGE_WIDTH)
+    parser.add_argument("--height", type=int, default=320)
+    parser.add_argument("--steps", type=int, default=40, help="scroll positions from top to bottom")
+    parser.add_argument("--eager", action="store_true", help="load every thumbnail, no cache limit")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        posts.DB_FILE = os.path.join(tmp, "feed.db")
+        posts.setup_database()
+        build(args.posts, args.width, args.height)
+
+        if args.eager:
+            posts.PRELOAD_SCREENS = args.posts * 10
+        rss_before = rss_mb()
+        root = tk.Tk()
+        app = posts.SocialApp(root)
+        if args.eager:
+            app.images.max_bytes = float("inf")
+        settle(root, app)
+        print(f"{'mode':<6} {'step':>4} {'rss MB':>8} {'cache MB':>9} {'full labels':>12}")
+        mode = "eager" if args.eager else "lazy"
+        peak = 0.0
+        start = time.perf_counter()
+        for step in range(args.steps + 1):
+            app.feed_canvas.yview_moveto(step / args.steps)
+            settle(root, app)
+            rss = rss_mb()
+            peak = max(peak, rss)
+            full = sum(item['state'] == 'full' for item in app.feed_images)
+            if step % max(1, args.steps // 10) == 0:
+                print(f"{mode:<6} {step:>4} {rss:>8.1f} {app.images.cached_bytes / 2**20:>9.1f} {full:>12}")
+        elapsed = time.perf_counter() - start
+        print(f"Peak RSS {peak:.1f} MB ({peak - rss_before:+.1f} MB over the process before the window), "
+              f"{app.images.decodes} thumbnails decoded, {elapsed / (args.steps + 1) * 1000:.0f} ms per scroll step")
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
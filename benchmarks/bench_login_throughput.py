@@ -0,0 +1,55 @@
+"""Benchmark password verification cost against login latency and throughput.
+
+For each hashing setting, times a single verification (what one user waits
+for after clicking Login) and the number of verifications per second the
+worker pool sustains when many logins arrive at once.
+
+    python benchmarks/bench_login_throughput.py --logins 64 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import password_hashing  # noqa: E402
+
+SETTINGS = [
+    ("pbkdf2_sha256", (100_000,)),
+    ("pbkdf2_sha256", (300_000,)),
+    ("pbkdf2_sha256", (600_000,)),
+    ("pbkdf2_sha256", (1_200_000,)),
+    ("scrypt", (2 ** 14, 8, 1)),
+    ("scrypt", (2 ** 15, 8, 1)),
+    ("scrypt", (2 ** 16, 8, 1)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64, help="concurrent logins per setting")
+    parser.add_argument("--workers", type=int, default=4, help="verification threads")
+    args = parser.parse_args()
+
+    print(f"{'scheme':<15} {'cost':<20} {'latency ms':>11} {'logins/s':>10}")
+    for scheme, cost in SETTINGS:
+        stored = password_hashing.hash_password("correct horse", scheme, cost)
+
+        start = time.perf_counter()
+        password_hashing.check_password(stored, "correct horse")
+        latency = time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            start = time.perf_counter()
+            results = list(pool.map(lambda _: password_hashing.check_password(stored, "correct horse"),
+                                    range(args.logins)))
+            elapsed = time.perf_counter() - start
+        assert all(results)
+
+        cost_text = "/".join(map(str, cost))
+        print(f"{scheme:<15} {cost_text:<20} {latency * 1000:11.1f} {args.logins / elapsed:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure screen-to-screen navigation in ddcsocial_media_app.py.
+
+Logs a user in against a throwaway database and walks dashboard -> profile
+-> dashboard -> search -> dashboard, timing each navigation including the
+redraw. The "rebuild" run drops every cached screen before each step, which
+is what the old destroy-and-rebuild clear_window did. The "cached" run uses
+the screen router as the app does.
+
+Needs a display (run it under xvfb-run on a headless machine).
+
+    python benchmarks/bench_navigation.py --rounds 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ddcsocial_media_app as app  # noqa: E402
+import screen_router  # noqa: E402
+import session  # noqa: E402
+
+ROUTE = (
+    ("dashboard", lambda root, email: app.show_user_dashboard(root, email)),
+    ("profile", lambda root, email: app.show_user_profile(root, email)),
+    ("dashboard", lambda root, email: app.show_user_dashboard(root, email)),
+    ("search", lambda root, email: app.search_students(root, email)),
+)
+
+
+def walk(root, email, rounds, rebuild):
+    router = screen_router.get_router(root)
+    timings = {}
+    for _ in range(rounds):
+        for name, navigate in ROUTE:
+            if rebuild:
+                router.reset()
+            start = time.perf_counter()
+            navigate(root, email)
+            root.update()
+            timings.setdefault(name, []).append(time.perf_counter() - start)
+    return timings, router.builds
+
+
+def report(label, timings, builds):
+    everything = [t for samples in timings.values() for t in samples]
+    p95 = statistics.quantiles(everything, n=20)[-1] if len(everything) >= 20 else max(everything)
+    print(f"{label:<8} mean {statistics.mean(everything) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   "
+          f"screens built {builds}")
+    for name, samples in timings.items():
+        print(f"  {name:<10} {statistics.mean(samples) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        app.DB_NAME = os.path.join(tmp, "nav.db")
+        app.ensure_schema()
+        email = "bench.student@dcccd.edu"
+        app.register_user_db(email, "benchmark", "Bench Student")
+        conn = app.get_db_connection()
+        user = dict(conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone())
+        conn.close()
+        session.start_session(user)
+
+        root = tk.Tk()
+        root.geometry("450x350")
+        for label, rebuild in (("rebuild", True), ("cached", False)):
+            screen_router.get_router(root).reset()
+            screen_router.get_router(root).builds = 0
+            report(label, *walk(root, email, args.rounds, rebuild))
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark single-profile reads: full parse versus the mmap index.
+
+Builds a profile log of --users profiles (plus --updates re-saved ones),
+then times what show_profile used to do per view (parse every profile)
+against ProfileIndex lookups, including the first lookup that builds the
+index file and lookups after new records were appended.
+
+    python benchmarks/bench_profile_lookup.py --users 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import profile_index  # noqa: E402
+import profile_log  # noqa: E402
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<40} {elapsed * 1000:10.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000, help="distinct profiles")
+    parser.add_argument("--updates", type=int, default=50_000, help="extra records re-saving a profile")
+    parser.add_argument("--repeat", type=int, default=10_000, help="lookups timed per case")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profiles.txt")
+        with open(path, "wb") as f:
+            for i in range(args.users):
+                f.write(profile_log.encode_record(f"student{i}@dccc.edu", {
+                    "name": f"Student {i}", "bio": "Hello", "grad_year": "2026",
+                    "major": "Computer Science", "minor": "Math"}))
+            for _ in range(args.updates):
+                i = rng.randrange(args.users)
+                f.write(profile_log.encode_record(f"student{i}@dccc.edu", {"name": f"Student {i}", "bio": "Edited"}))
+        print(f"{args.users} profiles, {args.updates} updates, {os.path.getsize(path) / 1e6:.1f} MB")
+        emails = [f"student{rng.randrange(args.users)}@dccc.edu" for _ in range(args.repeat)]
+
+        timed("full parse per view (old load_profiles)", lambda: profile_log.ProfileLog(path).load_all(), 3)
+        reader = profile_index.ProfileIndex(path)
+        timed("index: first lookup (builds index)", lambda: reader.get(emails[0]))
+        lookups = iter(emails * 2)
+        timed("index: lookup", lambda: reader.get(next(lookups)), args.repeat)
+        timed("index: reopen existing index + lookup",
+              lambda: profile_index.ProfileIndex(path).get(emails[1]), 20)
+
+        log = profile_log.ProfileLog(path)
+        log.refresh()
+        timed("append 1 record + lookup (overlay)",
+              lambda: (log.put(emails[2], {"name": "New"}), reader.get(emails[2])), 50)
+        timed("append until merge + lookup",
+              lambda: [log.put(f"new{i}@dccc.edu", {"name": "New"}) or reader.get(f"new{i}@dccc.edu")
+                       for i in range(profile_index.MERGE_THRESHOLD)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark the bulk roster import (roster_import.py).
+
+Generates a synthetic roster with a sprinkling of bad rows, creates a fresh
+copy of the social_media.db schema, and reports rows per second for the
+import at the given hashing cost.
+
+    python benchmarks/bench_roster_import.py --rows 100000 --iterations 1000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ddcsocial_media_app as app  # noqa: E402
+import roster_import  # noqa: E402
+
+MAJORS = ["Computer Science", "Nursing", "Business", "Biology", "Art", "Engineering"]
+
+
+def write_roster(path, rows, bad_ratio, seed):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["email", "name", "password", "grad_year", "major"])
+        for i in range(rows):
+            email = f"student{i}@dccc.edu"
+            password = f"pw-{rng.getrandbits(32):08x}"
+            roll = rng.random()
+            if roll < bad_ratio / 3:
+                email = f"student{i}-at-dccc"
+            elif roll < 2 * bad_ratio / 3:
+                password = "123"
+            elif roll < bad_ratio:
+                email = f"student{max(i - 1, 0)}@dccc.edu"
+            writer.writerow([email, f"Student {i}", password, rng.randint(2024, 2030), rng.choice(MAJORS)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="roster size")
+    parser.add_argument("--bad-ratio", type=float, default=0.01, help="fraction of rows that fail validation")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help="PBKDF2 iterations (0 for the login cost)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        roster = os.path.join(tmp, "roster.csv")
+        write_roster(roster, args.rows, args.bad_ratio, args.seed)
+        app.DB_NAME = os.path.join(tmp, "bench_roster.db")
+        app.ensure_schema()
+
+        cost = (args.iterations,) if args.iterations else None
+        report = roster_import.import_roster(roster, app.DB_NAME, workers=args.workers,
+                                             scheme="pbkdf2_sha256", cost=cost)
+        iterations = args.iterations or roster_import.password_hashing.PBKDF2_ITERATIONS
+        print(f"workers={args.workers} iterations={iterations}")
+        print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Measure what ddcsocial_media_app.py costs before its login window appears.
+
+Two parts:
+
+* imports: runs `python -X importtime -c "import ddcsocial_media_app"` in
+  fresh interpreters and reports the module's cumulative import time along
+  with the slowest modules it pulls in;
+* schema: times the startup schema work on a throwaway database, both the
+  full DDL (setup_database + update_database_schema) and the
+  PRAGMA user_version fast path of ensure_schema().
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --app-dir /path/to/other/checkout
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(app_dir, module):
+    """{module: (self us, cumulative us)} from one fresh interpreter."""
+    code = f"import sys; sys.path.insert(0, {app_dir!r}); import {module}"
+    with tempfile.TemporaryDirectory() as cwd:
+        # A scratch cwd so nothing the import does at module level touches the repo
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=cwd, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def bench_imports(app_dir, module, runs, top):
+    totals, slowest = [], {}
+    for _ in range(runs):
+        times = import_times(app_dir, module)
+        totals.append(times[module][1])
+        for name, (_, cumulative) in times.items():
+            if name != module:
+                slowest.setdefault(name, []).append(cumulative)
+    print(f"import {module}: median {statistics.median(totals) / 1000:.1f} ms "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}) over {runs} runs")
+    ranked = sorted(slowest.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, samples in ranked[:top]:
+        print(f"  {statistics.median(samples) / 1000:7.1f} ms  {name}")
+
+
+def bench_schema(app_dir, runs):
+    sys.path.insert(0, app_dir)
+    import ddcsocial_media_app as app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            app.DB_NAME = os.path.join(tmp, "startup.db")
+            # First run creates everything, admin hash included
+            app.setup_database()
+            app.update_database_schema()
+
+            def timed(fn):
+                samples = []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    fn()
+                    samples.append(time.perf_counter() - start)
+                return statistics.median(samples) * 1000
+
+            full = timed(lambda: (app.setup_database(), app.update_database_schema()))
+            # Checkouts from before the fast path only have the full DDL
+            fast = None
+            if hasattr(app, "ensure_schema"):
+                app.ensure_schema()  # stamps user_version
+                fast = timed(app.ensure_schema)
+        finally:
+            os.chdir(cwd)
+    result = f"schema on a current database: full DDL {full:.2f} ms"
+    if fast is not None:
+        result += f", user_version fast path {fast:.3f} ms"
+    print(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="slowest imported modules to list")
+    parser.add_argument("--app-dir", default=REPO, help="checkout to measure (default: this one)")
+    parser.add_argument("--module", default="ddcsocial_media_app")
+    args = parser.parse_args()
+
+    bench_imports(args.app_dir, args.module, args.runs, args.top)
+    bench_schema(args.app_dir, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare two bench_data_access.py result files and flag regressions.
+
+Each case present in both files is compared by its fastest call (--metric
+picks another). On a busy machine the minimum moves the least between runs
+of the same code; medians and p95s are better compared on a quiet one. A
+case is a regression when the new time is more than --threshold (a
+fraction) above the old one and also more than --min-delta milliseconds
+slower, so noise on the sub-millisecond cases does not trip it. The exit
+status is 1 when anything regressed, for use in scripts and CI.
+
+    python benchmarks/compare_results.py before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new, threshold, min_delta, metric):
+    """[(key, old ms, new ms, change, regressed)] for cases in both results."""
+    rows = []
+    for key in sorted(old["results"].keys() & new["results"].keys(),
+                      key=lambda k: (new["results"][k]["case"], new["results"][k]["rows"])):
+        before = old["results"][key][metric]
+        after = new["results"][key][metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > min_delta
+        rows.append((key, before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignore changes smaller than this many ms")
+    parser.add_argument("--metric", default="min_ms", choices=("median_ms", "mean_ms", "p95_ms", "min_ms"))
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('created')}   "
+          f"new: {new['meta'].get('commit')} {new['meta'].get('created')}")
+    if old["meta"].get("machine") != new["meta"].get("machine"):
+        print("warning: the two runs were made on different machines")
+
+    rows = compare(old, new, args.threshold, args.min_delta, args.metric)
+    for key, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ("faster" if change < -args.threshold else "")
+        print(f"{key:<36} {before:10.3f} -> {after:10.3f} ms  {change:+7.1%}  {flag}")
+    for key in sorted(old["results"].keys() ^ new["results"].keys()):
+        print(f"{key:<36} only in {'old' if key in old['results'] else 'new'}")
+
+    regressions = [row for row in rows if row[4]]
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%} in {len(rows)} cases")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Simulate many students using posts.py against one SQLite file at once.
+
+Every Tk client of posts.py opens the same database file, so production
+load is several processes reading and writing it concurrently. This driver
+starts --workers processes. Each one plays student sessions through the
+posts.py functions the GUI calls:
+
+* login: get_user_by_email, count_followers and count_following, then a feed;
+* feed: what refresh_feed loads. That is fetch_posts, get_comment_previews
+  and get_attachments, then get_reaction_counts and is_following for each of
+  the first --feed-posts posts (refresh_feed does it for every post);
+* like, comment, follow, post: set_reaction, add_comment, follow_user and
+  create_post. Each one is followed by a feed, as the GUI refreshes after
+  every change.
+
+A session logs in, then runs --actions actions picked by the --mix weights,
+with an exponentially distributed think time before each one. The report
+gives per-operation p50/p95/p99 latency, throughput, and how many calls
+failed with "database is locked".
+
+The writes go into --db, so point it at a generated or copied database:
+
+    python generate_dataset.py --db /tmp/load.db --rows 200000
+    python benchmarks/load_driver.py --db /tmp/load.db --workers 8 --duration 30 --think 200
+    python benchmarks/load_driver.py --db /tmp/load.db --workers 16 --think 0 --mix feed=20,like=40,comment=30,post=10
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import posts  # noqa: E402
+
+DEFAULT_MIX = "feed=60,like=20,comment=10,follow=5,post=5"
+WRITES = {"like", "comment", "follow", "post"}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- Operations (each one a single timed step) ---
+
+def op_login(state):
+    user = posts.get_user_by_email(state['rng'].choice(state['emails']))
+    if user is not None:
+        state['user'] = dict(user)
+        posts.count_followers(user['id'])
+        posts.count_following(user['id'])
+
+
+def op_feed(state):
+    rows = posts.fetch_posts()
+    post_ids = [p['id'] for p in rows]
+    posts.get_comment_previews(post_ids)
+    posts.get_attachments(post_ids)
+    me = state['user']['id']
+    for p in rows[:state['feed_posts']]:
+        posts.get_reaction_counts(p['id'])
+        if p['user_id'] != me:
+            posts.is_following(me, p['user_id'])
+    state['post_ids'] = post_ids[:state['feed_posts']] or state['post_ids']
+
+
+def op_like(state):
+    rng = state['rng']
+    posts.set_reaction(rng.choice(state['post_ids']), state['user']['id'], rng.choice(("like", "like", "dislike")))
+
+
+def op_comment(state):
+    posts.add_comment(state['rng'].choice(state['post_ids']), state['user']['email'], "Load driver comment")
+
+
+def op_follow(state):
+    posts.follow_user(state['user']['id'], state['rng'].choice(state['user_ids']))
+
+
+def op_post(state):
+    posts.create_post(state['user']['id'], "Load driver post")
+
+
+ACTIONS = {"feed": op_feed, "like": op_like, "comment": op_comment, "follow": op_follow, "post": op_post}
+
+
+def timed(state, name, fn):
+    """Runs one operation, recording its latency or its error."""
+    start = time.perf_counter()
+    try:
+        fn(state)
+    except sqlite3.OperationalError as e:
+        key = "locked" if "locked" in str(e) or "busy" in str(e) else "errors"
+        state[key][name] = state[key].get(name, 0) + 1
+        return False
+    state['samples'].setdefault(name, []).append(time.perf_counter() - start)
+    return True
+
+
+def worker(index, args, start_at):
+    """One simulated client. Returns its samples and error counts."""
+    posts.DB_FILE = args.db
+    rng = Random(f"{args.seed}-{index}")
+    conn = sqlite3.connect(args.db)
+    emails = [r[0] for r in conn.execute("SELECT email FROM users WHERE is_active = 1 AND deleted_at IS NULL")]
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users")]
+    post_ids = [r[0] for r in conn.execute("SELECT id FROM posts ORDER BY id DESC LIMIT ?", (args.feed_posts,))]
+    conn.close()
+    state = {'rng': rng, 'emails': emails, 'user_ids': user_ids, 'post_ids': post_ids or [0],
+             'feed_posts': args.feed_posts, 'user': None, 'samples': {}, 'locked': {}, 'errors': {}}
+    names, weights = list(args.mix), list(args.mix.values())
+    think = args.think / 1000
+
+    # Everyone starts together, after the slowest process has loaded its ids
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + args.duration
+    sessions = 0
+    while time.time() < deadline:
+        if not timed(state, "login", op_login) or state['user'] is None:
+            continue
+        sessions += 1
+        timed(state, "feed", op_feed)
+        for _ in range(args.actions):
+            if time.time() >= deadline:
+                break
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+            name = rng.choices(names, weights)[0]
+            if timed(state, name, ACTIONS[name]) and name in WRITES:
+                timed(state, "feed", op_feed)
+    return {'samples': state['samples'], 'locked': state['locked'], 'errors': state['errors'], 'sessions': sessions}
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(results, elapsed, args):
+    samples, locked, errors = {}, {}, {}
+    for r in results:
+        for name, values in r['samples'].items():
+            samples.setdefault(name, []).extend(values)
+        for total, counts in ((locked, r['locked']), (errors, r['errors'])):
+            for name, n in counts.items():
+                total[name] = total.get(name, 0) + n
+    summary = {}
+    print(f"{'operation':<10} {'ok':>8} {'locked':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>8}")
+    for name in sorted(samples.keys() | locked.keys() | errors.keys()):
+        ordered = sorted(samples.get(name, [])) or [0.0]
+        ok = len(samples.get(name, []))
+        row = {'ok': ok, 'locked': locked.get(name, 0), 'errors': errors.get(name, 0),
+               'p50_ms': percentile(ordered, 0.50) * 1000, 'p95_ms': percentile(ordered, 0.95) * 1000,
+               'p99_ms': percentile(ordered, 0.99) * 1000, 'ops_per_s': ok / elapsed}
+        summary[name] = row
+        print(f"{name:<10} {ok:8d} {row['locked']:7d} {row['errors']:7d} {row['p50_ms']:9.2f} "
+              f"{row['p95_ms']:9.2f} {row['p99_ms']:9.2f} {row['ops_per_s']:8.1f}")
+    total_ok = sum(r['ok'] for r in summary.values())
+    total_locked = sum(locked.values())
+    attempts = total_ok + total_locked + sum(errors.values())
+    print(f"{args.workers} workers, {sum(r['sessions'] for r in results)} sessions in {elapsed:.1f}s: "
+          f"{total_ok / elapsed:.1f} ops/s, {total_locked} locked "
+          f"({total_locked / attempts if attempts else 0:.2%} of calls)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="posts.py database to load (it is written to)")
+    parser.add_argument("--workers", type=int, default=4, help="client processes")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    parser.add_argument("--actions", type=int, default=20, help="actions per session after login")
+    parser.add_argument("--think", type=float, default=500.0, help="mean think time before an action, ms (0: none)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--feed-posts", type=int, default=20, help="posts per feed that get reaction and follow lookups")
+    parser.add_argument("--seed", default="42")
+    parser.add_argument("--json", help="also save the summary to this file")
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; make one with generate_dataset.py")
+
+    start_at = time.time() + 1.0 + 0.05 * args.workers
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(worker, i, args, start_at) for i in range(args.workers)]
+        results = [f.result() for f in futures]
+    summary = report(results, args.duration, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'args': {k: v for k, v in vars(args).items()}, 'operations': summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
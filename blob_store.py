@@ -0,0 +1,201 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# Images and attachments stored inside the database, so a shared database
+# carries its pictures with it instead of paths into one machine's disk.
+#
+# A blob's key is the SHA-256 of its content, the same key thumbnails.py
+# uses, so identical files are stored once. Contents go in and out through
+# Connection.blobopen in CHUNK_SIZE pieces: a large file is never held in
+# memory whole on either side. blobopen is new in Python 3.11; on older
+# versions a blob goes in and out as one bound value instead, which works
+# the same but holds the whole file in memory.
+#
+# Tables point at blobs by key. Triggers on every registered (table, column)
+# keep blobs.refcount current, including for rows removed by cascades or by
+# the tombstone purge, and collect_garbage() deletes blobs nobody points at.
+# A fresh blob starts with no references: put_file() then an UPDATE/INSERT
+# of the referencing row is the normal sequence, and GC leaves blobs younger
+# than GC_GRACE_SECONDS alone so it cannot delete one in between.
+
+CHUNK_SIZE = 256 * 1024
+GC_GRACE_SECONDS = 3600
+GC_BATCH_SIZE = 100
+HAS_BLOBOPEN = hasattr(sqlite3.Connection, "blobopen")
+
+
+def ensure_schema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mime TEXT,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs(created_at) WHERE refcount <= 0;
+        -- Every (table, column) holding blob keys, for refcount rebuilds
+        CREATE TABLE IF NOT EXISTS blob_refs (
+            tbl TEXT NOT NULL,
+            col TEXT NOT NULL,
+            PRIMARY KEY (tbl, col)
+        );
+    """)
+
+
+def track_references(conn, table, column):
+    """Keeps blobs.refcount in step with the blob keys stored in table.column."""
+    ensure_schema(conn)
+    name = f"blobref_{table}_{column}"
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name + "_ins",)).fetchone():
+        return
+    conn.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_ins AFTER INSERT ON {table}
+        WHEN NEW.{column} IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.{column};
+        END;
+        CREATE TRIGGER IF NOT EXISTS {name}_del AFTER DELETE ON {table}
+        WHEN OLD.{column} IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.{column};
+        END;
+        CREATE TRIGGER IF NOT EXISTS {name}_upd AFTER UPDATE OF {column} ON {table}
+        WHEN OLD.{column} IS NOT NEW.{column} BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.{column};
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.{column};
+        END;
+    """)
+    conn.execute("INSERT OR IGNORE INTO blob_refs (tbl, col) VALUES (?, ?)", (table, column))
+    # Rows written before the triggers existed
+    recount_references(conn)
+
+
+def recount_references(conn):
+    """Recomputes every refcount from the registered referencing columns."""
+    refs = conn.execute("SELECT tbl, col FROM blob_refs").fetchall()
+    counts = " + ".join(f"(SELECT COUNT(*) FROM {tbl} WHERE {col} = blobs.hash)" for tbl, col in refs) or "0"
+    conn.execute(f"UPDATE blobs SET refcount = {counts}")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def put_file(conn, path, mime=None):
+    """Stores a file's contents (once per distinct content) and returns its key.
+
+    The caller commits; nothing references the blob until the caller
+    stores the key somewhere.
+    """
+    ensure_schema(conn)
+    key, size = file_hash(path)
+    if mime is None:
+        import mimetypes  # reads the system MIME tables; kept out of app startup
+        mime = mimetypes.guess_type(path)[0]
+    if conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (key,)).fetchone():
+        return key
+    if not HAS_BLOBOPEN:
+        with open(path, "rb") as f:
+            data = f.read()
+        conn.execute("INSERT INTO blobs (hash, size, mime, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                     (key, len(data), mime, time.time(), data))
+        return key
+    cursor = conn.execute("INSERT INTO blobs (hash, size, mime, created_at, data) VALUES (?, ?, ?, ?, zeroblob(?))",
+                          (key, size, mime, time.time(), size))
+    with open(path, "rb") as f, conn.blobopen("blobs", "data", cursor.lastrowid) as blob:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            blob.write(chunk)
+    return key
+
+
+def put_bytes(conn, data, mime=None):
+    """Stores an in-memory payload (e.g. a re-encoded upload) and returns its key."""
+    ensure_schema(conn)
+    key = hashlib.sha256(data).hexdigest()
+    conn.execute("INSERT OR IGNORE INTO blobs (hash, size, mime, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                 (key, len(data), mime, time.time(), data))
+    return key
+
+
+def _rowid(conn, key):
+    row = conn.execute("SELECT rowid FROM blobs WHERE hash = ?", (key,)).fetchone()
+    if row is None:
+        raise KeyError(key)
+    return row[0]
+
+
+def iter_chunks(conn, key, chunk_size=CHUNK_SIZE):
+    """Yields a blob's contents in chunks; raises KeyError for unknown keys."""
+    if not HAS_BLOBOPEN:
+        row = conn.execute("SELECT data FROM blobs WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        data = row[0]
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+        return
+    with conn.blobopen("blobs", "data", _rowid(conn, key), readonly=True) as blob:
+        for chunk in iter(lambda: blob.read(chunk_size), b""):
+            yield chunk
+
+
+def read_bytes(conn, key):
+    """A whole blob in memory; meant for small ones such as thumbnails."""
+    return b"".join(iter_chunks(conn, key))
+
+
+def export_to_file(conn, key, path):
+    """Streams a blob into a file, written next to it first and then renamed."""
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as f:
+        for chunk in iter_chunks(conn, key):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+
+def store_file(db_file, path):
+    """Opens db_file, stores one file in it and commits. Returns the key."""
+    conn = sqlite3.connect(db_file, timeout=10)
+    try:
+        with conn:
+            return put_file(conn, path)
+    finally:
+        conn.close()
+
+
+def export_blob(db_file, key, path):
+    """Copies a blob out of db_file into path. Returns path, or None if it is not stored there."""
+    conn = sqlite3.connect(db_file, timeout=10)
+    try:
+        return export_to_file(conn, key, path)
+    except (KeyError, sqlite3.OperationalError):
+        return None  # unknown key, or a database without a blobs table
+    finally:
+        conn.close()
+
+
+def collect_garbage(conn, grace_seconds=GC_GRACE_SECONDS, batch_size=GC_BATCH_SIZE):
+    """Deletes unreferenced blobs older than the grace period, a batch per transaction.
+
+    Returns how many were deleted.
+    """
+    deleted = 0
+    cutoff = time.time() - grace_seconds
+    while True:
+        with conn:
+            count = conn.execute("""
+                DELETE FROM blobs WHERE rowid IN (
+                    SELECT rowid FROM blobs WHERE refcount <= 0 AND created_at < ? LIMIT ?)
+            """, (cutoff, batch_size)).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
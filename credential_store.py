@@ -0,0 +1,192 @@
+import os
+import tempfile
+import threading
+
+# credentials.txt holds one "email,password" per line. Registration only ever
+# appends, so an email can appear several times; the last line wins. The
+# store below parses the file once, then on every lookup only checks its
+# size and mtime: an unchanged file costs one stat(), a file that only grew
+# (the usual case) has just the new lines parsed, and anything else is
+# reloaded in full. Compaction rewrites the file with one line per email.
+#
+# Compaction only keeps the lines it has seen, so an append landing between
+# its read and its os.replace would be lost. Within a process that can't
+# happen as long as every screen goes through the one store get_store()
+# returns: add() and compact() hold the same lock.
+
+CREDENTIALS_FILE = "credentials.txt"
+COMPACT_INTERVAL = 300.0   # seconds between compaction checks
+COMPACT_RATIO = 1.5        # compact once there are this many lines per email
+CHECK_BYTES = 64           # bytes before the read offset compared on append
+
+
+def parse_lines(text, credentials):
+    """Adds the "email,password" lines of text to credentials. Returns the line count."""
+    count = 0
+    for line in text.splitlines():
+        email, sep, password = line.partition(",")
+        if sep:
+            credentials[email.strip()] = password.strip()
+            count += 1
+    return count
+
+
+class CredentialStore:
+    """Email -> password lookups backed by a credentials file."""
+
+    def __init__(self, path=CREDENTIALS_FILE):
+        self.path = path
+        # Kept as the same dict object for the life of the store, so callers
+        # holding on to it (user_management's screens) always see fresh data
+        self.credentials = {}
+        self.lines = 0        # lines in the file, duplicates included
+        self._stamp = None    # (inode, size, mtime) the dict was loaded from
+        self._offset = 0      # bytes of the file parsed so far
+        self._check = b""     # the CHECK_BYTES before _offset
+        self._lock = threading.RLock()
+        self._compaction = None   # stop event of the compaction thread, if started
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def refresh(self):
+        """Brings the dict up to date with the file. Cheap when nothing changed."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return
+            if stamp is None:
+                self.credentials.clear()
+                self.lines, self._offset, self._check = 0, 0, b""
+            elif not self._read_appended(stamp):
+                self._load()
+            self._stamp = stamp
+
+    def _read_appended(self, stamp):
+        """Parses only the bytes past _offset if the file was appended to."""
+        if self._stamp is None or stamp[0] != self._stamp[0] or stamp[1] < self._offset:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(self._offset - len(self._check))
+            if f.read(len(self._check)) != self._check:
+                return False  # rewritten in place
+            self._advance(f.read())
+        return True
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.credentials.clear()
+        self.lines, self._offset, self._check = 0, 0, b""
+        self._advance(data)
+
+    def _advance(self, data):
+        """Parses data read at _offset and moves past its complete lines.
+
+        A last line without a newline is used too, but is read again on the
+        next refresh in case it was still being written.
+        """
+        end = data.rfind(b"\n") + 1
+        if end:
+            self.lines += parse_lines(data[:end].decode("utf-8", errors="replace"), self.credentials)
+            self._offset += end
+            self._check = (self._check + data[:end])[-CHECK_BYTES:]
+        if end < len(data):
+            parse_lines(data[end:].decode("utf-8", errors="replace"), self.credentials)
+
+    def get(self, email):
+        """The password for email, or None."""
+        self.refresh()
+        return self.credentials.get(email)
+
+    def __contains__(self, email):
+        self.refresh()
+        return email in self.credentials
+
+    def __len__(self):
+        self.refresh()
+        return len(self.credentials)
+
+    def add(self, email, password):
+        """Appends a credential line; replaces any earlier password for email."""
+        with self._lock:
+            self.refresh()
+            with open(self.path, "a") as f:
+                f.write(f"{email},{password}\n")
+            self.refresh()
+
+    def needs_compaction(self):
+        self.refresh()
+        return self.lines > len(self.credentials) * COMPACT_RATIO
+
+    def compact(self):
+        """Rewrites the file with one line per email. Returns True if it did.
+
+        The new file is written next to the old one and swapped in with
+        os.replace, so readers see either the old or the new file, never a
+        partial one. If the file changed while the copy was being written
+        the copy is thrown away and the next run tries again.
+        """
+        with self._lock:
+            self.refresh()
+            stamp = self._stamp
+            if stamp is None or self._offset != stamp[1]:
+                return False  # missing, or a line is still being written
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".credentials-", dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.writelines(f"{email},{password}\n" for email, password in self.credentials.items())
+                if self._stat() != stamp:
+                    os.remove(tmp_path)
+                    return False
+                os.replace(tmp_path, self.path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._stamp = None
+            self._load()
+            self._stamp = self._stat()
+            return True
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=CREDENTIALS_FILE):
+    """The process-wide CredentialStore for path, made on first use."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CredentialStore(path)
+        return store
+
+
+def start_compaction_thread(store, interval=COMPACT_INTERVAL):
+    """Compacts store's file on a daemon thread whenever it has piled up duplicates.
+
+    A store gets one thread however often this is called. Returns the
+    threading.Event that stops the loop when set.
+    """
+    with store._lock:
+        if store._compaction is not None and not store._compaction.is_set():
+            return store._compaction
+        stop_event = store._compaction = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                if store.needs_compaction():
+                    store.compact()
+            except OSError as e:
+                print(f"Credential compaction error: {e}")
+
+    threading.Thread(target=run, name="credential-compaction", daemon=True).start()
+    return stop_event
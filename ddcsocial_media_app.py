@@ -1,12 +1,29 @@
 import tkinter as tk
 from tkinter import messagebox
 import sqlite3
-import hashlib
 import os
 import re
+import threading
+
+import action_trace
+import query_stats
+import tombstones
+import blob_store
+import password_hashing
+import session
+import screen_router
+import thumbnails
+import image_loader
+
+# Modules only some screens need (ttk, the file and input dialogs, csv,
+# roster_import with its process pool, deactivate_account) are imported
+# where they are used, so none of them delay the login window.
 
 # --- Configuration ---
 DB_NAME = 'social_media.db'
+# Bump whenever setup_database() or update_database_schema() changes; a
+# database at this PRAGMA user_version skips both at startup
+SCHEMA_VERSION = 2
 ADMIN_USER = 'admin@dcccd.edu'
 # Password for admin is 'admin123'. This is hashed in the database setup for consistency.
 # Use this plain text password to log in as admin: admin123
@@ -14,30 +31,58 @@ ADMIN_USER = 'admin@dcccd.edu'
 # --- Utility Functions: Password Hashing ---
 
 def hash_password(password):
-    """Hashes a password using SHA-256."""
-    # Use a fixed salt for simplicity in a demo, but in production, a unique salt per user is required.
-    salt = "dcccd_social_salt"
-    hashed = hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
-    return hashed
+    """Hashes a password with a per-user salt (scheme and cost in password_hashing.py)."""
+    return password_hashing.hash_password(password)
 
 def check_password(hashed_password, user_password):
     """Checks a plain text password against the stored hash."""
-    salt = "dcccd_social_salt"
-    return hashed_password == hashlib.sha256((user_password + salt).encode('utf-8')).hexdigest()
+    return password_hashing.check_password(hashed_password, user_password)
 
 # --- Database Functions (Unified and Translated from 'database.py' and 'database connection .py') ---
 
 def get_db_connection():
     """Establishes a connection to the SQLite database."""
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = query_stats.connect(DB_NAME)
         conn.row_factory = sqlite3.Row  # Allows accessing columns by name
+        conn.execute("PRAGMA foreign_keys = ON")
         return conn
     except sqlite3.Error as e:
         print(f"Database connection error: {e}")
         messagebox.showerror("Database Error", "Failed to connect to the database.")
         return None
 
+def schema_version():
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def ensure_schema():
+    """Creates or upgrades the database unless its user_version is already current.
+
+    A current database costs one PRAGMA read instead of the CREATE, ALTER
+    and admin lookups. Returns True if the DDL ran.
+    """
+    if schema_version() >= SCHEMA_VERSION:
+        return False
+    setup_database()
+    update_database_schema()
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        conn.close()
+    return True
+
+# Set once the schema is in place. main() draws the login window while
+# ensure_schema() runs on a thread. The login, registration and password
+# reset handlers hash on a worker that waits on this first, so by the time
+# their result is back on the Tk thread the database is ready.
+database_ready = threading.Event()
+database_ready.set()  # scripts that import this module set up the schema themselves
+
 def setup_database():
     """Creates the 'users' table and adds the default admin user if it doesn't exist."""
     conn = get_db_connection()
@@ -59,18 +104,21 @@ def setup_database():
         );
         """)
 
-        # Insert default admin user if not exists (using hashed password)
-        admin_password_hash = hash_password('admin123')
-        try:
-            cursor.execute("""
-            INSERT INTO users (email, password_hash, name, role)
-            VALUES (?, ?, ?, ?)
-            """, (ADMIN_USER, admin_password_hash, 'Administrator', 'admin'))
-            conn.commit()
-            print("Default admin user created.")
-        except sqlite3.IntegrityError:
-            # This happens if the admin user already exists (unique constraint violation)
-            pass
+        # Insert default admin user if not exists (using hashed password).
+        # Hashing is deliberately slow, so only do it when the admin is missing.
+        cursor.execute("SELECT 1 FROM users WHERE email = ?", (ADMIN_USER,))
+        if cursor.fetchone() is None:
+            admin_password_hash = hash_password('admin123')
+            try:
+                cursor.execute("""
+                INSERT INTO users (email, password_hash, name, role)
+                VALUES (?, ?, ?, ?)
+                """, (ADMIN_USER, admin_password_hash, 'Administrator', 'admin'))
+                conn.commit()
+                print("Default admin user created.")
+            except sqlite3.IntegrityError:
+                # Another instance created it in the meantime
+                pass
            
         conn.commit()
         print("Database and 'users' table initialized successfully.")
@@ -80,13 +128,13 @@ def setup_database():
         if conn:
             conn.close()
 
-def register_user_db(email, password, name):
-    """Adds a new user to the database."""
+def register_user_db(email, password, name, password_hash=None):
+    """Adds a new user to the database. Pass password_hash if it was already hashed on a worker."""
     conn = get_db_connection()
     if conn is None:
         return False
    
-    hashed_pw = hash_password(password)
+    hashed_pw = password_hash or hash_password(password)
     try:
         cursor = conn.cursor()
         # Initial bio is empty, role is 'user'
@@ -114,10 +162,14 @@ def verify_user_credentials(email, password):
 
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
+        cursor.execute("SELECT * FROM users WHERE email = ? AND deleted_at IS NULL", (email,))
         user = cursor.fetchone()
        
         if user and check_password(user['password_hash'], password):
+            # Upgrade hashes made with an older scheme or cost while we know the password
+            if password_hashing.needs_rehash(user['password_hash']):
+                cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", (hash_password(password), user['id']))
+                conn.commit()
             # Convert sqlite3.Row to a dictionary for easier use
             return dict(user)
         return None
@@ -136,7 +188,7 @@ def get_all_users():
 
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT email, name, role, created_at FROM users")
+        cursor.execute("SELECT email, name, role, created_at, is_active FROM users WHERE deleted_at IS NULL")
         return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         print(f"Error retrieving users: {e}")
@@ -145,6 +197,97 @@ def get_all_users():
         if conn:
             conn.close()
 
+def find_students(search_term, exclude_email):
+    """Active users whose name contains search_term, other than exclude_email.
+
+    Returns (name, email, bio, avatar_key) rows. Database errors are left to
+    the caller, which shows them.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT name, email, bio FROM users WHERE name LIKE ? AND email != ? AND {ACTIVE_USER}",
+                       (f"%{search_term}%", exclude_email))
+        results = cursor.fetchall()
+        if not results:
+            return []
+        # Avatars by primary key lookups, so the search itself stays on its covering index
+        emails = [r['email'] for r in results]
+        cursor.execute(f"SELECT email, avatar_key FROM users WHERE email IN ({','.join('?' * len(emails))})", emails)
+        avatars = {r['email']: r['avatar_key'] for r in cursor.fetchall()}
+        return [(name, email, bio, avatars.get(email)) for name, email, bio in results]
+    finally:
+        conn.close()
+
+# Sortable columns of the admin user list. NULLs are folded to '' so that the
+# (sort value, id) keyset stays totally ordered; the indexes use the same
+# expressions so SQLite can walk them instead of sorting.
+USER_SORT_KEYS = {
+    'email': "email",
+    'name': "IFNULL(name, '')",
+    'role': "IFNULL(role, '')",
+    'created_at': "IFNULL(created_at, '')",
+}
+USER_PAGE_SIZE = 100
+# Condition every user-facing query uses to hide deactivated and deleted
+# accounts. The partial indexes are declared with exactly this predicate so
+# SQLite can answer those queries from them without checking each row.
+ACTIVE_USER = "is_active = 1 AND deleted_at IS NULL"
+# The admin filter matches email and name prefixes regardless of case. Both
+# sides are folded with SQLite's lower(), which only folds ASCII, and the
+# indexes are on the same expressions so the prefix ranges can seek them.
+USER_PREFIX_KEYS = {
+    'email': "lower(email)",
+    'name': "lower(IFNULL(name, ''))",
+}
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def get_users_page(sort_by='email', descending=False, after=None, prefix='', limit=USER_PAGE_SIZE,
+                   include_inactive=False):
+    """Returns one keyset page of users for the admin list.
+
+    `after` is the (sort_value, id) of the last row already shown, or None for
+    the first page. `prefix` keeps users whose email or name starts with it,
+    ignoring case.
+    Deactivated accounts are left out unless `include_inactive` is set.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return []
+
+    sort_expr = USER_SORT_KEYS[sort_by]
+    where = ["deleted_at IS NULL" if include_inactive else ACTIVE_USER]
+    params = []
+    if prefix:
+        # Prefix ranges instead of LIKE so the email and name indexes are used
+        folded = prefix.translate(ASCII_LOWER)
+        where.append("(" + " OR ".join(f"({expr} >= ? AND {expr} < ?)" for expr in USER_PREFIX_KEYS.values()) + ")")
+        params += [folded, folded + "\uffff"] * len(USER_PREFIX_KEYS)
+    if after is not None:
+        # Spelled out rather than as a row value so SQLite seeks the index
+        op = '<' if descending else '>'
+        where.append(f"{sort_expr} {op}= ? AND ({sort_expr} {op} ? OR id {op} ?)")
+        params += [after[0], after[0], after[1]]
+    order = "DESC" if descending else "ASC"
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id, email, name, role, created_at, is_active, {sort_expr} AS sort_value
+            FROM users
+            WHERE {" AND ".join(where)}
+            ORDER BY {sort_expr} {order}, id {order}
+            LIMIT ?
+        """, (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving users: {e}")
+        return []
+    finally:
+        conn.close()
+
 def get_user_data(email):
     """Retrieves a single user's data (excluding password hash)."""
     conn = get_db_connection()
@@ -153,7 +296,7 @@ def get_user_data(email):
 
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, email, name, bio, role, created_at FROM users WHERE email = ?", (email,))
+        cursor.execute("SELECT id, email, name, bio, role, created_at FROM users WHERE email = ? AND deleted_at IS NULL", (email,))
         user = cursor.fetchone()
         return dict(user) if user else None
     except sqlite3.Error as e:
@@ -163,15 +306,40 @@ def get_user_data(email):
         if conn:
             conn.close()
 
+def get_user_by_id(user_id):
+    """Retrieves an active user's profile by id (used to resume a saved session)."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM users WHERE id = ? AND {ACTIVE_USER}", (user_id,))
+        user = cursor.fetchone()
+        return dict(user) if user else None
+    except sqlite3.Error as e:
+        print(f"Error retrieving user data: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def session_user(user_email):
+    """The logged-in user's profile from the session; other users come from the database."""
+    current = session.current_session
+    if current and current.email == user_email:
+        return current.profile
+    return get_user_data(user_email)
+
 def delete_user_db(email):
-    """Deletes a user from the database by email."""
+    """Marks a user as deleted; the purge job removes the row and everything it owns later."""
     conn = get_db_connection()
     if conn is None:
         return False
 
     try:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE email = ?", (email,))
+        cursor.execute("UPDATE users SET deleted_at = CURRENT_TIMESTAMP WHERE email = ? AND deleted_at IS NULL", (email,))
         conn.commit()
         return cursor.rowcount > 0 # Return true if at least one row was deleted
     except sqlite3.Error as e:
@@ -182,19 +350,83 @@ def delete_user_db(email):
         if conn:
             conn.close()
 
+def bulk_delete_users_db(emails):
+    """Marks many users as deleted in one transaction. Returns how many were deleted."""
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE users SET deleted_at = CURRENT_TIMESTAMP WHERE email = ? AND deleted_at IS NULL",
+                           [(email,) for email in emails])
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error deleting users: {e}")
+        messagebox.showerror("Database Error", f"An error occurred while deleting users: {e}")
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
+def bulk_set_active_db(emails, active):
+    """Deactivates or reactivates many users in one transaction (see deactivate_account.py)."""
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    from deactivate_account import deactivate_user
+
+    try:
+        return deactivate_user.set_users_active(conn, emails, active)
+    finally:
+        conn.close()
+
+EXPORT_CHUNK = 500  # emails per IN (...) query, well under SQLite's variable limit
+
+def export_users_csv(emails, path):
+    """Streams the selected users to a CSV file without loading them all at once."""
+    import csv
+
+    conn = get_db_connection()
+    if conn is None:
+        return 0
+
+    written = 0
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["email", "name", "role", "bio", "grad_year", "major", "is_active", "created_at"])
+            for start in range(0, len(emails), EXPORT_CHUNK):
+                chunk = emails[start:start + EXPORT_CHUNK]
+                cursor = conn.execute(f"""
+                    SELECT email, name, role, bio, grad_year, major, is_active, created_at
+                    FROM users WHERE email IN ({",".join("?" * len(chunk))}) AND deleted_at IS NULL
+                """, chunk)
+                for row in cursor:
+                    writer.writerow(tuple(row))
+                    written += 1
+        return written
+    except (sqlite3.Error, OSError) as e:
+        messagebox.showerror("Export Failed", f"An error occurred while exporting users: {e}")
+        return written
+    finally:
+        conn.close()
+
 # --- GUI Functions (Based on 'register_login.py', 'ProfilePage.py', etc.) ---
 
-def clear_window(root):
-    """Destroys all widgets in the given root window."""
-    for widget in root.winfo_children():
-        widget.destroy()
+def show_screen(root, name, build, *args):
+    """Raises a cached screen (see screen_router.py), building it with build(root, frame) on the first visit."""
+    return screen_router.get_router(root).show(name, lambda frame: build(root, frame), *args)
 
 # Main Login Screen
 def show_login_screen(root):
-    clear_window(root)
-    root.title("Login | Social Media Platform")
-   
-    main_frame = tk.Frame(root, padx=20, pady=20)
+    show_screen(root, "login", build_login_screen)
+
+def build_login_screen(root, frame):
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
    
     # Title
@@ -204,17 +436,17 @@ def show_login_screen(root):
     tk.Label(main_frame, text="Email:").grid(row=1, column=0, sticky="w", pady=5)
     email_entry = tk.Entry(main_frame, width=30)
     email_entry.grid(row=1, column=1, pady=5)
-    email_entry.insert(0, ADMIN_USER) # Pre-fill for easy testing
 
     # Password
     tk.Label(main_frame, text="Password:").grid(row=2, column=0, sticky="w", pady=5)
     password_entry = tk.Entry(main_frame, width=30, show="*")
     password_entry.grid(row=2, column=1, pady=5)
-    password_entry.insert(0, "admin123") # Pre-fill for easy testing
+
+    remember_var = tk.BooleanVar(value=False)
 
     # Login Button
     login_button = tk.Button(main_frame, text="Login", width=20,
-                             command=lambda: process_login(root, email_entry.get(), password_entry.get()))
+                             command=lambda: process_login(root, email_entry.get(), password_entry.get(), remember_var.get()))
     login_button.grid(row=3, column=0, columnspan=2, pady=10)
 
     # Register Button
@@ -225,32 +457,78 @@ def show_login_screen(root):
     # Forgot Password Button
     tk.Button(main_frame, text="Forgot Password?", width=20, command=lambda: show_forgot_password_screen(root)).grid(row=5, column=0, columnspan=2, pady=5)
 
+    tk.Checkbutton(main_frame, text="Keep me signed in", variable=remember_var).grid(row=6, column=0, columnspan=2)
+
+    def refresh():
+        root.title("Login | Social Media Platform")
+        email_entry.delete(0, tk.END)
+        email_entry.insert(0, ADMIN_USER) # Pre-fill for easy testing
+        password_entry.delete(0, tk.END)
+        password_entry.insert(0, "admin123") # Pre-fill for easy testing
+        remember_var.set(False)
+
+    return refresh
+
 
-def process_login(root, email, password):
-    """Handles the login process."""
+def process_login(root, email, password, remember=False):
+    """Handles the login process. The password check runs on a worker thread."""
     if not email or not password:
         messagebox.showerror("Login Failed", "Email and password are required.")
         return
 
-    user_data = verify_user_credentials(email, password)
+    action_trace.record("login", email)
+    root.config(cursor="watch")
+    future = password_hashing.submit(verify_when_ready, email, password)
 
-    if user_data:
+    def check_done():
+        if not future.done():
+            root.after(20, check_done)
+            return
+        root.config(cursor="")
+        finish_login(root, future.result(), remember)
+
+    root.after(20, check_done)
+
+def verify_when_ready(email, password):
+    """verify_user_credentials, once the startup schema check is done. Runs on a worker."""
+    database_ready.wait()
+    with query_stats.action("login"):
+        return verify_user_credentials(email, password)
+
+def hash_when_ready(password):
+    """hash_password, once the startup schema check is done. Runs on a worker."""
+    database_ready.wait()
+    return hash_password(password)
+
+def finish_login(root, user_data, remember=False):
+    """Opens the right screen once the credentials have been checked."""
+    if user_data and not user_data.get('is_active', 1):
+        messagebox.showerror("Login Failed", "This account has been deactivated. Please contact an administrator.")
+    elif user_data:
         messagebox.showinfo("Login Successful", f"Welcome, {user_data['name']}!")
-       
-        # Determine screen based on role
-        if user_data['role'] == 'admin':
-            show_admin_dashboard(root, user_data['email'])
-        else:
-            show_user_dashboard(root, user_data['email'])
+        show_home_screen(root, session.start_session(user_data, remember))
     else:
         messagebox.showerror("Login Failed", "Invalid email or password.")
 
+def show_home_screen(root, current):
+    """Opens the dashboard for the session's role."""
+    if current.is_admin:
+        show_admin_dashboard(root, current.email)
+    else:
+        show_user_dashboard(root, current.email)
+
+def logout(root):
+    session.end_session()
+    # The next user gets freshly built screens
+    screen_router.get_router(root).reset()
+    show_login_screen(root)
+
 # Registration Screen
 def show_registration_screen(root):
-    clear_window(root)
-    root.title("Register New User")
+    show_screen(root, "registration", build_registration_screen)
 
-    main_frame = tk.Frame(root, padx=20, pady=20)
+def build_registration_screen(root, frame):
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
    
     tk.Label(main_frame, text="New User Registration", font=("Arial", 16, "bold")).grid(row=0, column=0, columnspan=2, pady=10)
@@ -283,58 +561,90 @@ def show_registration_screen(root):
             messagebox.showerror("Registration Failed", "Password must be at least 6 characters.")
             return
 
-        if register_user_db(email, password, name):
-            messagebox.showinfo("Success", f"User {email} registered successfully!")
-            show_login_screen(root) # Go back to login after successful registration
+        action_trace.record("register", email, name_len=len(name))
+        # Hashing is slow on purpose; the insert itself is quick
+        root.config(cursor="watch")
+        register_button.config(state=tk.DISABLED)
+        future = password_hashing.submit(hash_when_ready, password)
+
+        def check_done():
+            if not future.done():
+                root.after(20, check_done)
+                return
+            root.config(cursor="")
+            register_button.config(state=tk.NORMAL)
+            if register_user_db(email, password, name, password_hash=future.result()):
+                messagebox.showinfo("Success", f"User {email} registered successfully!")
+                show_login_screen(root) # Go back to login after successful registration
+
+        root.after(20, check_done)
 
     # Register Button
-    tk.Button(main_frame, text="Register", width=20, command=process_registration).grid(row=4, column=0, columnspan=2, pady=10)
+    register_button = tk.Button(main_frame, text="Register", width=20, command=process_registration)
+    register_button.grid(row=4, column=0, columnspan=2, pady=10)
 
     # Back to Login Button
     tk.Button(main_frame, text="Back to Login", width=20, command=lambda: show_login_screen(root)).grid(row=5, column=0, columnspan=2, pady=5)
 
+    def refresh():
+        root.title("Register New User")
+        for entry in (name_entry, email_entry, password_entry):
+            entry.delete(0, tk.END)
+
+    return refresh
+
 
 # User Dashboard
 def show_user_dashboard(root, user_email):
-    clear_window(root)
-    root.title("User Dashboard")
+    show_screen(root, "user_dashboard", build_user_dashboard, user_email)
 
-    user_data = get_user_data(user_email)
-    if not user_data:
-        messagebox.showerror("Error", "User data not found.")
-        show_login_screen(root)
-        return
-       
-    main_frame = tk.Frame(root, padx=20, pady=20)
+def build_user_dashboard(root, frame):
+    state = {}  # the user shown, set by refresh()
+
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
 
-    tk.Label(main_frame, text=f"Welcome, {user_data['name']}!", font=("Arial", 16, "bold")).pack(pady=10)
+    welcome_label = tk.Label(main_frame, font=("Arial", 16, "bold"))
+    welcome_label.pack(pady=10)
     tk.Label(main_frame, text="This is your main dashboard.", font=("Arial", 12)).pack(pady=5)
    
     # Functionality Buttons
-    tk.Button(main_frame, text="View Profile", width=30, command=lambda: show_user_profile(root, user_email)).pack(pady=5)
+    tk.Button(main_frame, text="View Profile", width=30, command=lambda: show_user_profile(root, state['email'])).pack(pady=5)
    
     # Edit Profile Button
-    tk.Button(main_frame, text="Edit Profile", width=30, command=lambda: edit_profile( user_email)).pack(pady=5)
+    tk.Button(main_frame, text="Edit Profile", width=30, command=lambda: edit_profile(state['email'])).pack(pady=5)
    
     # Button for Search student 
-    tk.Button(main_frame, text="Search Students", width=30, command=lambda: search_students(root, user_email)).pack(pady=5)
+    tk.Button(main_frame, text="Search Students", width=30, command=lambda: search_students(root, state['email'])).pack(pady=5)
 
     # Placeholder for the main Social Media Home Page from the uploaded HTML file
-    tk.Button(main_frame, text="Go to Social Feed (Mock)", width=30, command=lambda: show_home_page(user_data)).pack(pady=5)
+    tk.Button(main_frame, text="Go to Social Feed (Mock)", width=30, command=lambda: show_home_page(state['user_data'])).pack(pady=5)
 
-    tk.Button(main_frame, text="Logout", width=30, command=lambda: show_login_screen(root)).pack(pady=15)
+    tk.Button(main_frame, text="Logout", width=30, command=lambda: logout(root)).pack(pady=15)
 
-  
+    @query_stats.tagged("dashboard")
+    def refresh(user_email):
+        root.title("User Dashboard")
+        user_data = session_user(user_email)
+        if not user_data:
+            messagebox.showerror("Error", "User data not found.")
+            show_login_screen(root)
+            return
+        state['email'], state['user_data'] = user_email, user_data
+        welcome_label.config(text=f"Welcome, {user_data['name']}!")
+
+    return refresh
 
 
 # ---------------------------------------------- Search Other Students ---------------------------------
 def search_students(root, user_email):
     """Allows the logged-in user to search for other students by name."""
-    clear_window(root)
-    root.title("Search Students")
+    show_screen(root, "search_students", build_search_students, user_email)
+
+def build_search_students(root, frame):
+    state = {'email': None}
 
-    main_frame = tk.Frame(root, padx=20, pady=20)
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
 
     tk.Label(main_frame, text="Search for Students", font=("Arial", 16, "bold")).grid(row=0, column=0, columnspan=2, pady=10)
@@ -347,77 +657,110 @@ def search_students(root, user_email):
     results_frame = tk.Frame(main_frame)
     results_frame.grid(row=3, column=0, columnspan=2, pady=10)
 
-    def perform_search():
+    def clear_results():
         for widget in results_frame.winfo_children():
             widget.destroy()
 
+    @query_stats.tagged("search")
+    def perform_search():
+        clear_results()
+
         search_term = search_entry.get().strip()
         if not search_term:
             messagebox.showerror("Error", "Please enter a name to search.")
             return
 
-        conn = get_db_connection()
-        if conn is None:
-            return
-
+        action_trace.record("search", state['email'], term_len=len(search_term))
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, email, bio FROM users WHERE name LIKE ? AND email != ?", (f"%{search_term}%", user_email))
-            results = cursor.fetchall()
-
-            if not results:
-                tk.Label(results_frame, text="No students found.", fg="gray").pack()
-                return
-
-            # Display results
-            for i, (name, email, bio) in enumerate(results, start=1):
-                tk.Label(results_frame, text=f"{i}. {name}", font=("Arial", 12, "bold")).pack(anchor="w")
-                tk.Label(results_frame, text=f"📧 {email}", fg="blue").pack(anchor="w")
-                if bio:
-                    tk.Label(results_frame, text=f"📝 {bio}", fg="gray").pack(anchor="w")
-                tk.Label(results_frame, text="").pack()  # spacing
-
+            results = find_students(search_term, state['email'])
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"An error occurred: {e}")
-        finally:
-            conn.close()
+            return
+
+        if not results:
+            tk.Label(results_frame, text="No students found.", fg="gray").pack()
+            return
+
+        loader = image_loader.get_loader(root)
+        # Display results
+        for i, (name, email, bio, avatar_key) in enumerate(results, start=1):
+            name_label = tk.Label(results_frame, text=f" {i}. {name}", font=("Arial", 12, "bold"), compound="left")
+            loader.show_avatar(name_label, avatar_key, None, 32, db_file=DB_NAME)
+            name_label.pack(anchor="w")
+            tk.Label(results_frame, text=f"📧 {email}", fg="blue").pack(anchor="w")
+            if bio:
+                tk.Label(results_frame, text=f"📝 {bio}", fg="gray").pack(anchor="w")
+            tk.Label(results_frame, text="").pack()  # spacing
 
     # Buttons
     tk.Button(main_frame, text="Search", width=15, command=perform_search).grid(row=2, column=0, columnspan=2, pady=10)
-    tk.Button(main_frame, text="Back to Dashboard", width=20, command=lambda: show_user_dashboard(root, user_email)).grid(row=4, column=0, columnspan=2, pady=5)
+    tk.Button(main_frame, text="Back to Dashboard", width=20, command=lambda: show_user_dashboard(root, state['email'])).grid(row=4, column=0, columnspan=2, pady=5)
+
+    def refresh(user_email):
+        root.title("Search Students")
+        # The last search stays on screen when the same user comes back to it
+        if user_email != state['email']:
+            search_entry.delete(0, tk.END)
+            clear_results()
+        state['email'] = user_email
+
+    return refresh
            
 # ----------------------------------------------Search Students ---------------------------------------------
 
 def show_user_profile(root, user_email):
     """Displays the user's profile information."""
-    clear_window(root)
-    root.title("My Profile")
-   
-    user_data = get_user_data(user_email)
-    if not user_data:
-        messagebox.showerror("Error", "Profile data not found.")
-        show_user_dashboard(root, user_email)
-        return
-       
-    main_frame = tk.Frame(root, padx=20, pady=20)
+    show_screen(root, "user_profile", build_user_profile, user_email)
+
+def build_user_profile(root, frame):
+    state = {}
+
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
 
     tk.Label(main_frame, text="User Profile", font=("Arial", 18, "bold")).pack(pady=10)
+
+    avatar_label = tk.Label(main_frame)
+    avatar_label.pack(pady=5)
    
-    tk.Label(main_frame, text=f"Name: {user_data.get('name', 'N/A')}").pack(anchor="w", pady=2)
-    tk.Label(main_frame, text=f"Email: {user_data.get('email', 'N/A')}").pack(anchor="w", pady=2)
-    tk.Label(main_frame, text=f"Role: {user_data.get('role', 'user').capitalize()}").pack(anchor="w", pady=2)
+    name_label = tk.Label(main_frame)
+    name_label.pack(anchor="w", pady=2)
+    email_label = tk.Label(main_frame)
+    email_label.pack(anchor="w", pady=2)
+    role_label = tk.Label(main_frame)
+    role_label.pack(anchor="w", pady=2)
     tk.Label(main_frame, text="Bio:").pack(anchor="w", pady=5)
    
     # Bio is displayed in a Text widget to handle multi-line content
     bio_text = tk.Text(main_frame, height=5, width=40, state=tk.DISABLED)
-    bio_text.insert(tk.END, user_data.get('bio', 'No bio provided.'))
     bio_text.pack(pady=5)
-
-    #insert picture
    
     # Back button
-    tk.Button(main_frame, text="Back to Dashboard", width=30, command=lambda: show_user_dashboard(root, user_email)).pack(pady=20)
+    tk.Button(main_frame, text="Back to Dashboard", width=30, command=lambda: show_user_dashboard(root, state['email'])).pack(pady=20)
+
+    @query_stats.tagged("view_profile")
+    def refresh(user_email):
+        root.title("My Profile")
+        action_trace.record("view_profile", user_email)
+        user_data = session_user(user_email)
+        if not user_data:
+            messagebox.showerror("Error", "Profile data not found.")
+            show_user_dashboard(root, user_email)
+            return
+        state['email'] = user_email
+
+        # Pre-sized thumbnail made at upload, loaded off the Tk thread behind a placeholder;
+        # the original lives in the database's blob store
+        image_loader.get_loader(root).show_avatar(avatar_label, user_data.get('avatar_key'), None, 128, db_file=DB_NAME)
+        name_label.config(text=f"Name: {user_data.get('name', 'N/A')}")
+        email_label.config(text=f"Email: {user_data.get('email', 'N/A')}")
+        role_label.config(text=f"Role: {user_data.get('role', 'user').capitalize()}")
+        bio_text.config(state=tk.NORMAL)
+        bio_text.delete("1.0", tk.END)
+        bio_text.insert(tk.END, user_data.get('bio', 'No bio provided.'))
+        bio_text.config(state=tk.DISABLED)
+
+    return refresh
 
 
 # -------------------------------------------- Update_database_Schema------------------------------------
@@ -440,14 +783,72 @@ def update_database_schema():
         except sqlite3.OperationalError:
             pass
 
+        # Thumbnail cache key of the profile picture (thumbnails.py), which is
+        # also its key in the blob store holding the picture itself
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN avatar_key TEXT;")
+        except sqlite3.OperationalError:
+            pass
+        blob_store.track_references(conn, "users", "avatar_key")
+        import_picture_paths(conn)
+
+        # Carried over from profiles.txt by migrate_flat_files.py
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN minor TEXT;")
+        except sqlite3.OperationalError:
+            pass
+
+        # Soft-delete tombstone, cleared out by the purge job (tombstones.py)
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN deleted_at TIMESTAMP;")
+        except sqlite3.OperationalError:
+            pass
+
+        # Account status used by deactivate_account.py
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN is_active INTEGER DEFAULT 1;")
+        except sqlite3.OperationalError:
+            pass
+
+        # Keyset pagination of the admin list, one index per sortable column.
+        # The partial copies hold active users only and back the default view.
+        for key, expr in USER_SORT_KEYS.items():
+            if key != 'email':  # email already has its UNIQUE index
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_sort_{key} ON users({expr}, id);")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_active_{key} ON users({expr}, id) WHERE {ACTIVE_USER};")
+        # Case-insensitive prefix filter of the admin list
+        for key, expr in USER_PREFIX_KEYS.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_prefix_{key} ON users({expr});")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_active_prefix_{key} ON users({expr}) WHERE {ACTIVE_USER};")
+        # Student search scans a covering index of active users instead of the table
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_users_active_search ON users(name, email, bio, is_active, deleted_at) WHERE {ACTIVE_USER};")
+        # Cohort deactivation finds the still-active students of a graduation year
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_active_grad_year ON users(grad_year) WHERE is_active = 1;")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_deleted ON users(id) WHERE deleted_at IS NOT NULL;")
+
         conn.commit()
         conn.close()
         print("Database schema updated with new columns.")
 
+def import_picture_paths(conn):
+    """Moves profile pictures still stored as local file paths into the blob store.
+
+    Paths that do not exist on this machine are left as they are.
+    """
+    cursor = conn.cursor()
+    cursor.execute(r"SELECT id, profile_picture FROM users WHERE profile_picture LIKE '%/%' OR profile_picture LIKE '%\%'")
+    for user_id, path in cursor.fetchall():
+        if not os.path.isfile(path):
+            continue
+        key = blob_store.put_file(conn, path)
+        cursor.execute("UPDATE users SET avatar_key=?, profile_picture=? WHERE id=?",
+                       (key, os.path.basename(path), user_id))
+    conn.commit()
+
 # ---------------------------------------------- Edit User Profile ---------------------------------
 
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox
 import sqlite3
 
 def edit_profile(user_email):
@@ -456,45 +857,87 @@ def edit_profile(user_email):
     edit_win.geometry("450x450")
     edit_win.resizable(True, True)  # ✅ allows resize and maximize
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, email, bio, grad_year, major, profile_picture FROM users WHERE email=?", (user_email,))
-    user = cursor.fetchone()
-    conn.close()
+    current = session.current_session
+    if current and current.email == user_email:
+        user = current.profile
+    else:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, email, bio, grad_year, major, profile_picture, avatar_key FROM users WHERE email=?", (user_email,))
+        user = cursor.fetchone()
+        conn.close()
 
     if not user:
         messagebox.showerror("Error", "User not found.")
         return
 
-    name_var = tk.StringVar(value=user[0])
-    email_var = tk.StringVar(value=user[1])
-    bio_var = tk.StringVar(value=user[2] if user[2] else "")
-    grad_var = tk.StringVar(value=user[3] if user[3] else "")
-    major_var = tk.StringVar(value=user[4] if user[4] else "")
-    pic_var = tk.StringVar(value=user[5] if user[5] else "")
+    name_var = tk.StringVar(value=user['name'])
+    email_var = tk.StringVar(value=user['email'])
+    bio_var = tk.StringVar(value=user['bio'] or "")
+    grad_var = tk.StringVar(value=user['grad_year'] or "")
+    major_var = tk.StringVar(value=user['major'] or "")
+    pic_var = tk.StringVar(value=user['profile_picture'] or "")
+    avatar_key = {'key': user['avatar_key']}
 
-    # Function to choose picture
+    # Function to choose picture; the thumbnails are made and the picture is copied
+    # into the database right away, off the Tk thread. Only its file name is kept.
     def choose_picture():
+        from tkinter import filedialog
+
         filepath = filedialog.askopenfilename(
             title="Select Profile Picture",
             filetypes=[("Image Files", "*.png *.jpg *.jpeg")]
         )
-        if filepath:
-            pic_var.set(filepath)
+        if not filepath:
+            return
+
+        result = {}
+
+        def run():
+            try:
+                result['key'] = thumbnails.make_thumbnails(filepath)
+                blob_store.store_file(DB_NAME, filepath)
+            except (ImportError, OSError, sqlite3.Error) as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        pic_var.set("Processing picture...")
+
+        def check_done():
+            if worker.is_alive():
+                edit_win.after(50, check_done)
+            elif 'error' in result:
+                pic_var.set(user['profile_picture'] or "")
+                messagebox.showerror("Picture Error", f"Could not use this picture: {result['error']}", parent=edit_win)
+            else:
+                avatar_key['key'] = result['key']
+                pic_var.set(os.path.basename(filepath))
+
+        edit_win.after(50, check_done)
 
     # Function to save changes
     def save_profile():
+        action_trace.record("save_profile", user_email, bio_len=len(bio_var.get()))
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE users
-            SET name=?, email=?, bio=?, grad_year=?, major=?, profile_picture=?
+            SET name=?, email=?, bio=?, grad_year=?, major=?, profile_picture=?, avatar_key=?
             WHERE email=?
-        """, (name_var.get(), email_var.get(), bio_var.get(), grad_var.get(), major_var.get(), pic_var.get(), user_email))
+        """, (name_var.get(), email_var.get(), bio_var.get(), grad_var.get(), major_var.get(), pic_var.get(),
+              avatar_key['key'], user_email))
         conn.commit()
+        # The only place the session's profile changes
+        if current and current.email == user_email:
+            cursor.execute("SELECT * FROM users WHERE email=?", (email_var.get(),))
+            current.refresh(cursor.fetchone())
         conn.close()
         messagebox.showinfo("Success", "Profile updated successfully!")
         edit_win.destroy()
+        # Redraw the dashboard behind, which may still show the old name or email
+        if current and not current.is_admin:
+            show_user_dashboard(edit_win.master, current.email)
 
     # ---------- UI Layout ----------
     tk.Label(edit_win, text="Name:").pack(pady=5)
@@ -523,10 +966,10 @@ def edit_profile(user_email):
 # ----------------------------------------------Forget Password ---------------------------------
 
 def show_forgot_password_screen(root):
-    clear_window(root)
-    root.title("Forgot Password")
+    show_screen(root, "forgot_password", build_forgot_password_screen)
 
-    main_frame = tk.Frame(root, padx=20, pady=20)
+def build_forgot_password_screen(root, frame):
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True)
 
     tk.Label(main_frame, text="Reset Your Password", font=("Arial", 16, "bold")).grid(row=0, column=0, columnspan=2, pady=10)
@@ -561,18 +1004,32 @@ def show_forgot_password_screen(root):
             messagebox.showerror("Error", "Password must be at least 6 characters.")
             return
 
+        root.config(cursor="watch")
+        reset_button.config(state=tk.DISABLED)
+        future = password_hashing.submit(hash_when_ready, new_pw)
+
+        def check_done():
+            if not future.done():
+                root.after(20, check_done)
+                return
+            root.config(cursor="")
+            reset_button.config(state=tk.NORMAL)
+            save_password(email, future.result())
+
+        root.after(20, check_done)
+
+    def save_password(email, new_hash):
         conn = get_db_connection()
         if conn is None:
             return
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
+            cursor.execute("SELECT * FROM users WHERE email = ? AND deleted_at IS NULL", (email,))
             user = cursor.fetchone()
             if not user:
                 messagebox.showerror("Error", "No user found with that email.")
                 return
 
-            new_hash = hash_password(new_pw)
             cursor.execute("UPDATE users SET password_hash = ? WHERE email = ?", (new_hash, email))
             conn.commit()
             messagebox.showinfo("Success", "Password updated successfully! Please log in again.")
@@ -582,9 +1039,17 @@ def show_forgot_password_screen(root):
         finally:
             conn.close()
 
-    tk.Button(main_frame, text="Reset Password", width=20, command=reset_password).grid(row=4, column=0, columnspan=2, pady=10)
+    reset_button = tk.Button(main_frame, text="Reset Password", width=20, command=reset_password)
+    reset_button.grid(row=4, column=0, columnspan=2, pady=10)
     tk.Button(main_frame, text="Back to Login", width=20, command=lambda: show_login_screen(root)).grid(row=5, column=0, columnspan=2, pady=5)
 
+    def refresh():
+        root.title("Forgot Password")
+        for entry in (email_entry, new_pw_entry, confirm_pw_entry):
+            entry.delete(0, tk.END)
+
+    return refresh
+
 
 # ---------------------------------------------- Forgot Password ---------------------------------
 def show_home_page(user_data):
@@ -611,101 +1076,323 @@ def show_home_page(user_data):
 
 # Admin Dashboard
 def show_admin_dashboard(root, admin_email):
-    clear_window(root)
-    root.title("Admin Dashboard - User Management")
-   
-    main_frame = tk.Frame(root, padx=30, pady=30)
+    show_screen(root, "admin_dashboard", build_admin_dashboard, admin_email)
+
+def build_admin_dashboard(root, frame):
+    state = {}
+
+    main_frame = tk.Frame(frame, padx=30, pady=30)
     main_frame.pack(expand=True)
    
     tk.Label(main_frame, text="Admin Console", font=("Arial", 20, "bold"), fg="#8b0000").pack(pady=20)
-    tk.Label(main_frame, text=f"Logged in as: {admin_email}", font=("Arial", 10)).pack(pady=5)
+    logged_in_label = tk.Label(main_frame, font=("Arial", 10))
+    logged_in_label.pack(pady=5)
 
     # Functionality Buttons (from 'ProfilePage.py' and 'user_management.py')
-    tk.Button(main_frame, text="View All Users", width=30, command=lambda: show_all_users_admin(root, admin_email)).pack(pady=5)
+    tk.Button(main_frame, text="View All Users", width=30, command=lambda: show_all_users_admin(root, state['email'])).pack(pady=5)
     # The 'Add User' functionality is covered by the main Registration screen for now.
     tk.Button(main_frame, text="Register New User", width=30, command=lambda: show_registration_screen(root)).pack(pady=5)
+    tk.Button(main_frame, text="Import Student Roster", width=30, command=lambda: prompt_import_roster(root)).pack(pady=5)
+    tk.Button(main_frame, text="Deactivate Graduating Class", width=30, command=lambda: prompt_deactivate_cohort(root)).pack(pady=5)
    
-    tk.Button(main_frame, text="Logout", width=30, command=lambda: show_login_screen(root)).pack(pady=20)
+    tk.Button(main_frame, text="Logout", width=30, command=lambda: logout(root)).pack(pady=20)
+
+    def refresh(admin_email):
+        root.title("Admin Dashboard - User Management")
+        state['email'] = admin_email
+        logged_in_label.config(text=f"Logged in as: {admin_email}")
+
+    return refresh
+
+def prompt_import_roster(root):
+    """Imports a CSV/JSONL student roster on a background thread (see roster_import.py)."""
+    import csv
+    from tkinter import filedialog
+    import roster_import
+
+    path = filedialog.askopenfilename(title="Select Student Roster",
+                                      filetypes=[("Roster Files", "*.csv *.jsonl"), ("All Files", "*.*")])
+    if not path:
+        return
+
+    result = {}
+
+    def run():
+        try:
+            result['report'] = roster_import.import_roster(path, DB_NAME)
+        except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+            # ValueError covers a roster saved in another encoding than UTF-8
+            result['error'] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+
+    def check_done():
+        if worker.is_alive():
+            root.after(200, check_done)
+        elif result.get('report') is None:
+            messagebox.showerror("Import Failed",
+                                 f"The roster could not be imported: {result.get('error', 'unexpected error')}")
+        else:
+            report = result['report']
+            details = "\n".join(f"Line {line}: {email or '?'} - {reason}" for line, email, reason in report.bad_rows[:10])
+            if len(report.bad_rows) > 10:
+                details += f"\n... and {len(report.bad_rows) - 10} more"
+            messagebox.showinfo("Import Complete", report.summary() + ("\n\n" + details if details else ""))
+
+    root.after(200, check_done)
+
+def prompt_deactivate_cohort(root):
+    """Deactivates every active student of a graduation year on a background thread."""
+    from tkinter import simpledialog
+    from deactivate_account import deactivate_user
+
+    grad_year = simpledialog.askstring("Deactivate Graduating Class", "Graduation year:", parent=root)
+    if not grad_year or not grad_year.strip():
+        return
+    grad_year = grad_year.strip()
+    if not messagebox.askyesno("Confirm", f"Deactivate all active students graduating in {grad_year}?"):
+        return
+
+    result = {}
+
+    def run():
+        # The job commits every batch, so it needs its own connection
+        conn = sqlite3.connect(DB_NAME, timeout=10)
+        try:
+            result['count'] = deactivate_user.deactivate_cohort(conn, grad_year)
+        finally:
+            conn.close()
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+
+    def check_done():
+        if worker.is_alive():
+            root.after(200, check_done)
+        else:
+            messagebox.showinfo("Done", f"Deactivated {result.get('count', 0)} student(s) graduating in {grad_year}.")
+
+    root.after(200, check_done)
+
+def user_row_values(user):
+    """Column values for one user in the admin list."""
+    status = "Active" if user.get('is_active', 1) else "Deactivated"
+    return (user['email'], user['name'] or "", (user['role'] or "user").capitalize(), user['created_at'] or "", status)
 
 def show_all_users_admin(root, admin_email):
-    """Displays a list of all users and provides an option to delete them."""
-    clear_window(root)
-    root.title("Admin - Manage Users")
+    """Lists users page by page with bulk delete, deactivate, reactivate and export."""
+    show_screen(root, "all_users_admin", build_all_users_admin, admin_email)
 
-    users = get_all_users()
-   
-    main_frame = tk.Frame(root, padx=20, pady=20)
+def build_all_users_admin(root, frame):
+    from tkinter import ttk  # only this screen uses ttk widgets
+
+    main_frame = tk.Frame(frame, padx=20, pady=20)
     main_frame.pack(expand=True, fill=tk.BOTH)
    
     tk.Label(main_frame, text="All Registered Users", font=("Arial", 16, "bold")).pack(pady=10)
 
-    # Scrollbar and Listbox setup for user list
+    # Filter box: email or name prefix
+    filter_frame = tk.Frame(main_frame)
+    filter_frame.pack(fill=tk.X)
+    tk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+    filter_var = tk.StringVar()
+    tk.Entry(filter_frame, textvariable=filter_var, width=30).pack(side=tk.LEFT, padx=5)
+    show_inactive_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(filter_frame, text="Show deactivated", variable=show_inactive_var,
+                   command=lambda: reload()).pack(side=tk.LEFT, padx=5)
+
     list_frame = tk.Frame(main_frame)
     list_frame.pack(pady=10, fill=tk.BOTH, expand=True)
    
     scrollbar = tk.Scrollbar(list_frame)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-   
-    user_listbox = tk.Listbox(list_frame, width=70, height=15, yscrollcommand=scrollbar.set)
-    scrollbar.config(command=user_listbox.yview)
-    user_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-    if users:
-        for user in users:
-            # Format the display string: Email | Name | Role
-            display_str = f"{user['email']} | Name: {user['name']} | Role: {user['role'].capitalize()}"
-            user_listbox.insert(tk.END, display_str)
-    else:
-        user_listbox.insert(tk.END, "No users found in the database.")
-       
-    def prompt_delete_user():
-        selected_index = user_listbox.curselection()
-        if not selected_index:
-            messagebox.showwarning("Warning", "Please select a user to delete.")
-            return
 
-        # Extract the email from the selected string
-        selected_item = user_listbox.get(selected_index[0])
-        target_email = selected_item.split(' | ')[0].strip()
-       
-        if target_email == admin_email:
-            messagebox.showerror("Error", "You cannot delete your own admin account.")
+    columns = ('email', 'name', 'role', 'created_at', 'status')
+    tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=15, selectmode="extended")
+    widths = {'email': 200, 'name': 130, 'role': 60, 'created_at': 130, 'status': 80}
+    for col in columns:
+        tree.column(col, width=widths[col], anchor="w")
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    # Only the rows scrolled into view so far are fetched; the next page is
+    # loaded when the scrollbar nears the bottom
+    state = {'sort_by': None, 'descending': False, 'after': None, 'exhausted': False, 'pending': False, 'filter_job': None,
+             'admin_email': None}
+
+    @query_stats.tagged("admin_users")
+    def load_next_page():
+        state['pending'] = False
+        if state['exhausted']:
             return
-           
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete user: {target_email}?"):
-            if delete_user_db(target_email):
-                messagebox.showinfo("Success", f"User {target_email} has been deleted.")
-                # Refresh the screen
-                show_all_users_admin(root, admin_email)
+        action_trace.record("admin_users_page", state['admin_email'], sort_by=state['sort_by'],
+                            descending=state['descending'], after_id=state['after'][1] if state['after'] else None,
+                            prefix_len=len(filter_var.get().strip()),
+                            include_inactive=show_inactive_var.get())
+        page = get_users_page(state['sort_by'], state['descending'], state['after'], filter_var.get().strip(),
+                              include_inactive=show_inactive_var.get())
+        for user in page:
+            tree.insert("", tk.END, iid=user['email'], values=user_row_values(user))
+        if page:
+            state['after'] = (page[-1]['sort_value'], page[-1]['id'])
+        state['exhausted'] = len(page) < USER_PAGE_SIZE
+
+    def reload():
+        tree.delete(*tree.get_children())
+        state['after'] = None
+        state['exhausted'] = False
+        load_next_page()
+        # Keep filling until the view is full or there is nothing left
+        root.after_idle(check_scroll)
+
+    def check_scroll():
+        first, last = tree.yview()
+        if last >= 0.9:
+            load_next_page()
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        if float(last) >= 0.9 and not state['exhausted'] and not state['pending']:
+            state['pending'] = True
+            root.after_idle(load_next_page)
+
+    def sort_by(col):
+        key = 'email' if col == 'status' else col
+        if state['sort_by'] == key:
+            state['descending'] = not state['descending']
+        else:
+            state['sort_by'], state['descending'] = key, False
+        for c in columns:
+            arrow = (" \u25bc" if state['descending'] else " \u25b2") if c == key else ""
+            tree.heading(c, text=c.replace('_', ' ').title() + arrow)
+        reload()
+
+    def on_filter_change(*_):
+        # Wait for a pause in typing before hitting the database
+        if state['filter_job']:
+            root.after_cancel(state['filter_job'])
+        state['filter_job'] = root.after(250, reload)
+
+    for col in columns:
+        tree.heading(col, text=col.replace('_', ' ').title(), command=lambda c=col: sort_by(c))
+    tree.configure(yscrollcommand=on_scroll)
+    scrollbar.config(command=tree.yview)
+    filter_var.trace_add("write", on_filter_change)
+
+    def selected_emails(action):
+        emails = list(tree.selection())
+        if not emails:
+            messagebox.showwarning("Warning", f"Please select at least one user to {action}.")
+            return []
+        if state['admin_email'] in emails and action != "export":
+            messagebox.showerror("Error", f"You cannot {action} your own admin account.")
+            return []
+        return emails
+
+    def prompt_delete_users():
+        emails = selected_emails("delete")
+        if not emails:
+            return
+        target = emails[0] if len(emails) == 1 else f"{len(emails)} users"
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {target}?"):
+            if bulk_delete_users_db(emails):
+                # Patch the list in place instead of reloading every user
+                tree.delete(*emails)
+                messagebox.showinfo("Success", f"Deleted {target}.")
+                check_scroll()
             else:
-                messagebox.showerror("Error", "Failed to delete user.")
+                messagebox.showerror("Error", "Failed to delete the selected users.")
 
+    def set_selected_active(active):
+        action = "reactivate" if active else "deactivate"
+        emails = selected_emails(action)
+        if not emails:
+            return
+        changed = bulk_set_active_db(emails, active)
+        if not active and not show_inactive_var.get():
+            # Deactivated accounts are not part of the default view
+            tree.delete(*emails)
+            check_scroll()
+        else:
+            status = "Active" if active else "Deactivated"
+            for email in emails:
+                tree.set(email, 'status', status)
+        messagebox.showinfo("Success", f"{changed} account(s) {action}d.")
 
-    # Delete Button
-    tk.Button(main_frame, text="Delete Selected User", width=30, fg="red", command=prompt_delete_user).pack(pady=10)
+    def export_selected():
+        from tkinter import filedialog
+
+        emails = selected_emails("export")
+        if not emails:
+            return
+        path = filedialog.asksaveasfilename(title="Export Users", defaultextension=".csv",
+                                            filetypes=[("CSV Files", "*.csv")])
+        if path:
+            count = export_users_csv(emails, path)
+            messagebox.showinfo("Export Complete", f"Exported {count} user(s) to {path}.")
+
+    # Bulk action buttons
+    actions_frame = tk.Frame(main_frame)
+    actions_frame.pack(pady=10)
+    tk.Button(actions_frame, text="Delete Selected", width=16, fg="red", command=prompt_delete_users).grid(row=0, column=0, padx=3, pady=3)
+    tk.Button(actions_frame, text="Deactivate Selected", width=16, command=lambda: set_selected_active(False)).grid(row=0, column=1, padx=3, pady=3)
+    tk.Button(actions_frame, text="Reactivate Selected", width=16, command=lambda: set_selected_active(True)).grid(row=1, column=0, padx=3, pady=3)
+    tk.Button(actions_frame, text="Export Selected (CSV)", width=16, command=export_selected).grid(row=1, column=1, padx=3, pady=3)
    
     # Back button
-    tk.Button(main_frame, text="Back to Admin Dashboard", width=30, command=lambda: show_admin_dashboard(root, admin_email)).pack(pady=5)
+    tk.Button(main_frame, text="Back to Admin Dashboard", width=30, command=lambda: show_admin_dashboard(root, state['admin_email'])).pack(pady=5)
+
+    def refresh(admin_email):
+        root.title("Admin - Manage Users")
+        state['admin_email'] = admin_email
+        # Sort order and filter survive; the rows are read again
+        if state['sort_by'] is None:
+            sort_by('email')
+        else:
+            reload()
+
+    return refresh
 
 
 # --- Main Application Execution ---
 
 def main():
-    """Initializes the database and starts the main Tkinter application."""
-    # 1. Initialize the database
-    setup_database()
-    update_database_schema()  
-   
-    # 2. Setup the main window
+    """Shows the login window, then checks the database and starts the Tkinter event loop."""
+    # 1. Setup the main window; it is on screen before the database is touched
+    action_trace.start("accounts")
     root = tk.Tk()
     root.geometry("450x350")
     root.resizable(False, False)
-   
-    # 3. Show the initial login screen
+    if os.environ.get("SOCIAL_WATCHDOG"):
+        import ui_watchdog  # only needed when measuring UI stalls
+        ui_watchdog.start(root)
     show_login_screen(root)
-   
+
+    # 2. Initialize the database on a thread (usually just a user_version check)
+    database_ready.clear()
+
+    def run():
+        try:
+            ensure_schema()
+        finally:
+            database_ready.set()
+
+    threading.Thread(target=run, name="schema-setup", daemon=True).start()
+
+    # 3. Once it is ready, resume a saved session if there is one
+    def check_ready():
+        if not database_ready.is_set():
+            root.after(20, check_ready)
+            return
+        tombstones.start_purge_thread(DB_NAME)
+        current = session.restore_session(get_user_by_id)
+        if current:
+            show_home_screen(root, current)
+
+    root.after(20, check_ready)
+
     # 4. Start the Tkinter event loop
     root.mainloop()
 
-# if name == "main":
-main()
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ class deactivate_user():
             cursor = conn.cursor()
 
             # check if the user exits
-            cursor.execute("SELECT * FROM users WHERE email = ?", (email))
+            cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
             user = cursor.fetchone()
 
             if not user:
@@ -42,7 +42,7 @@ class deactivate_user():
             cursor = conn.cursor()
 
             # check if the user exits
-            cursor.execute("SELECT * FROM users WHERE email = ?", (email))
+            cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
             user = cursor.fetchone()
 
             if not user:
@@ -57,3 +57,57 @@ class deactivate_user():
 
         except sqlite3.Error as e:
             print(f"Database error while reactivating user: {e}")
+
+    def set_users_active(conn, emails, active):
+        """
+        Deactivate or reactivate many accounts in a single transaction.
+        args:
+            conn: db connection object
+            emails: iterable of email addresses
+            active: True to reactivate, False to deactivate
+        returns the number of accounts changed
+            """
+
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE users SET is_active = ? WHERE email = ? AND is_active != ?",
+                [(int(active), email, int(active)) for email in emails])
+            conn.commit()
+            return cursor.rowcount
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Database error while updating accounts: {e}")
+            return 0
+
+    def deactivate_cohort(conn, grad_year, batch_size=500):
+        """
+        Deactivate every active account of a graduating class.
+        Works through the class a batch at a time, committing after each
+        batch, so other users are never locked out for long.
+        args:
+            conn: db connection object
+            grad_year: graduation year of the class
+            batch_size: accounts updated per transaction
+        returns the number of accounts deactivated
+            """
+
+        total = 0
+        try:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(
+                    """UPDATE users SET is_active = 0 WHERE id IN (
+                           SELECT id FROM users WHERE grad_year = ? AND is_active = 1 LIMIT ?)""",
+                    (grad_year, batch_size))
+                conn.commit()
+                if cursor.rowcount <= 0:
+                    break
+                total += cursor.rowcount
+            print(f"Deactivated {total} account(s) graduating in {grad_year}.")
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Database error while deactivating graduating class: {e}")
+        return total
@@ -0,0 +1,321 @@
+"""Fill social_media_full.db or social_media.db with a synthetic population.
+
+posts.py (feed, comments, reactions, follows) and ddcsocial_media_app.py
+(student accounts) only ever see a handful of demo rows. This tool makes
+data at realistic volumes for load and scale tests:
+
+* users with names, bios, majors and graduation years;
+* a power-law follow graph: a few accounts have most of the followers;
+* posts and comments whose word counts follow a log-normal distribution,
+  with threaded replies;
+* comments and reactions concentrated on a minority of popular posts.
+
+Everything comes from random.Random instances seeded from --seed, and the
+timestamps count back from a fixed date, so a seed always gives the same
+database. Rows are written with executemany in large transactions, with
+journaling and syncing off for a new file and the secondary indexes built
+after the load.
+
+    python generate_dataset.py --db /tmp/feed.db --rows 10000000
+    python generate_dataset.py --target accounts --db /tmp/accounts.db --users 50000
+"""
+import argparse
+import bisect
+import itertools
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+import ddcsocial_media_app
+import password_hashing
+import posts
+
+BATCH_SIZE = 50_000
+# How --rows is split over the posts.py tables
+ROW_MIX = {'users': 0.02, 'followers': 0.18, 'posts': 0.10, 'comments': 0.30, 'post_reactions': 0.40}
+POPULARITY_EXPONENT = 1.1   # Zipf exponent of who gets followed and which posts get attention
+REPLY_SHARE = 0.3           # comments that answer an earlier comment
+LIKE_SHARE = 0.85
+END_TIME = datetime(2025, 5, 1, 12, 0)
+SPAN_DAYS = 365
+DATASET_PASSWORD = "password123"   # every generated account's password
+HASH_POOL_SIZE = 64                # distinct password hashes shared by the accounts
+
+FIRST_NAMES = ("Aaliyah Aiden Amir Ana Ava Carlos Chloe Daniel Diego Elena Emma Ethan Fatima Gabriel Grace "
+               "Hana Isaac Jada Jamal Jasmine Kevin Layla Leo Liam Lucia Maria Mateo Maya Mia Mohammed "
+               "Noah Nora Olivia Omar Priya Rosa Ryan Sara Sofia Tariq Valeria Wei Yusuf Zoe").split()
+LAST_NAMES = ("Adams Ahmed Brown Chen Cruz Davis Garcia Gonzalez Hernandez Johnson Jones Khan Kim Lee "
+              "Lopez Martin Martinez Miller Nguyen Patel Perez Ramirez Rivera Robinson Rodriguez Sanchez "
+              "Singh Smith Taylor Thomas Torres Walker White Williams Wilson Wright Young").split()
+MAJORS = ("Accounting Biology Business Chemistry Communications Computer_Science Criminal_Justice "
+          "Cybersecurity Economics Education Engineering English History Kinesiology Mathematics "
+          "Music Nursing Physics Psychology Sociology").replace("_", " ").split()
+WORDS = ("the a to and of in is it for on that this with my at be you so just was are have not "
+         "class exam study group campus library today tomorrow week semester professor lab project "
+         "homework notes coffee game team practice club event meeting anyone help question thanks "
+         "great awesome tired finally done ready excited love hate need want know think looking "
+         "forward after before during lunch dinner parking shuttle registration deadline quiz paper "
+         "essay presentation internship job career transfer scholarship graduation summer fall spring "
+         "math biology chemistry history english physics nursing business code python data").split()
+
+
+# --- Distributions ---
+
+def zipf_cum_weights(n, exponent=POPULARITY_EXPONENT):
+    """Cumulative Zipf weights for ranks 0..n-1, for Random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+
+def pick(rng, cum_weights, k):
+    """k ranks drawn with the given cumulative weights (with replacement)."""
+    total = cum_weights[-1]
+    return [bisect.bisect(cum_weights, rng.random() * total) for _ in range(k)]
+
+
+def spread(rng, n, total):
+    """Splits total over ranks 0..n-1 by Zipf popularity. Returns {rank: count}."""
+    counts = {}
+    for rank in pick(rng, zipf_cum_weights(n), total):
+        counts[rank] = counts.get(rank, 0) + 1
+    return counts
+
+
+def text(rng, median_words, sigma=0.8):
+    words = max(1, int(rng.lognormvariate(0, sigma) * median_words))
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def timestamp(fraction):
+    """A time `fraction` of the way from SPAN_DAYS before END_TIME to END_TIME."""
+    return END_TIME - timedelta(days=SPAN_DAYS * (1.0 - fraction))
+
+
+# --- Writing ---
+
+def fast_connect(path, fresh):
+    conn = sqlite3.connect(path)
+    # A new file that fails half way is simply deleted, so it needs no journal;
+    # an existing database keeps an in-memory one so a failure rolls back
+    conn.execute(f"PRAGMA journal_mode = {'OFF' if fresh else 'MEMORY'}")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MiB
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    return conn
+
+
+def drop_indexes(conn, tables):
+    """Drops the secondary indexes of tables and returns the SQL that recreates them."""
+    marks = ",".join("?" * len(tables))
+    rows = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+                        f"AND tbl_name IN ({marks})", tables).fetchall()
+    for name, _ in rows:
+        conn.execute(f"DROP INDEX {name}")
+    return [sql for _, sql in rows]
+
+
+def next_id(conn, table):
+    return (conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0) + 1
+
+
+def write(conn, table, sql, rows, total, stats):
+    """Inserts rows (an iterator) in BATCH_SIZE transactions, printing progress."""
+    start = time.perf_counter()
+    written = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        with conn:
+            conn.executemany(sql, batch)
+        written += len(batch)
+        if written % (BATCH_SIZE * 20) == 0:
+            print(f"  {table}: {written:,}/{total:,}")
+    elapsed = time.perf_counter() - start
+    stats[table] = (written, elapsed)
+    print(f"{table}: {written:,} rows in {elapsed:.1f}s ({written / elapsed if elapsed else 0:,.0f} rows/s)")
+    return written
+
+
+# --- posts.py tables ---
+
+def social_users(rng, first_id, count):
+    for i in range(first_id, first_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (i, f"{first.lower()}{last.lower()}{i}", f"{first.lower()}.{last.lower()}{i}@dcccd.edu")
+
+
+def follows(rng, first_id, user_count, count):
+    """Power-law follow graph: both how many accounts a user follows and how
+    many followers an account gets are Zipf-distributed."""
+    cum = zipf_cum_weights(user_count)
+    # Who follows the most is unrelated to who is followed the most
+    order = list(range(user_count))
+    rng.shuffle(order)
+    for rank, degree in sorted(spread(rng, user_count, count).items()):
+        follower = order[rank]
+        degree = min(degree, user_count - 1)
+        targets = set()
+        # Popular accounts come up again and again, so stop after a few misses
+        for _ in range(4 * degree):
+            if len(targets) == degree:
+                break
+            following = pick(rng, cum, 1)[0]
+            if following != follower:
+                targets.add(following)
+        for following in targets:
+            yield (first_id + follower, first_id + following)
+
+
+def feed_posts(rng, first_id, first_user, user_count, count):
+    """Posts in time order, written mostly by the popular accounts."""
+    cum = zipf_cum_weights(user_count)
+    for n in range(count):
+        author = first_user + pick(rng, cum, 1)[0]
+        created = timestamp(n / count).strftime(posts.TIME_FORMAT)
+        yield (first_id + n, author, text(rng, 25), created)
+
+
+def comments(rng, first_id, first_post, post_count, first_user, user_count, count):
+    """Comments spread over posts by Zipf popularity, some of them replies to earlier comments."""
+    comment_id = first_id
+    for n, per_post in sorted(spread(rng, post_count, count).items()):
+        post_id = first_post + n
+        thread = []   # (id, path) of this post's comments so far
+        for _ in range(per_post):
+            segment = posts.path_segment(comment_id)
+            parent_id = None
+            path = segment
+            if thread and rng.random() < REPLY_SHARE:
+                parent_id, parent_path = rng.choice(thread)
+                path = parent_path + posts.PATH_SEP + segment
+            created = timestamp(min(1.0, (n + rng.random() * 5) / post_count)).isoformat()
+            yield (comment_id, post_id, first_user + rng.randrange(user_count), text(rng, 10), created, parent_id, path)
+            thread.append((comment_id, path))
+            comment_id += 1
+
+
+def reactions(rng, first_post, post_count, first_user, user_count, count):
+    """Distinct (post, user) reactions, mostly on the popular posts."""
+    for post, per_post in sorted(spread(rng, post_count, count).items()):
+        created = timestamp((post + 1) / post_count).strftime(posts.TIME_FORMAT)
+        # A user reacts to a post at most once, which caps the most popular posts
+        for user in rng.sample(range(user_count), min(per_post, user_count)):
+            yield (first_post + post, first_user + user, "like" if rng.random() < LIKE_SHARE else "dislike", created)
+
+
+def generate_feed(path, counts, seed):
+    fresh = not os.path.exists(path)
+    posts.DB_FILE = path
+    posts.setup_database()
+    conn = fast_connect(path, fresh)
+    stats = {}
+    try:
+        tables = ["users", "followers", "posts", "comments", "post_reactions"]
+        index_sql = drop_indexes(conn, tables)
+        first_user = next_id(conn, "users")
+        first_post = next_id(conn, "posts")
+        users = write(conn, "users", "INSERT INTO users (id, username, email) VALUES (?, ?, ?)",
+                      social_users(Random(f"{seed}-users"), first_user, counts['users']), counts['users'], stats)
+        write(conn, "followers", "INSERT OR IGNORE INTO followers (follower_id, following_id) VALUES (?, ?)",
+              follows(Random(f"{seed}-followers"), first_user, users, counts['followers']), counts['followers'], stats)
+        post_count = write(conn, "posts", "INSERT INTO posts (id, user_id, content, created_at) VALUES (?, ?, ?, ?)",
+                           feed_posts(Random(f"{seed}-posts"), first_post, first_user, users, counts['posts']),
+                           counts['posts'], stats)
+        if post_count:
+            write(conn, "comments", """
+                INSERT INTO comments (id, post_id, user_id, comment_text, created_at, parent_id, path)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, comments(Random(f"{seed}-comments"), next_id(conn, "comments"), first_post, post_count,
+                          first_user, users, counts['comments']), counts['comments'], stats)
+            write(conn, "post_reactions",
+                  "INSERT OR IGNORE INTO post_reactions (post_id, user_id, reaction_type, reacted_at) VALUES (?, ?, ?, ?)",
+                  reactions(Random(f"{seed}-reactions"), first_post, post_count, first_user, users,
+                            counts['post_reactions']), counts['post_reactions'], stats)
+        start = time.perf_counter()
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.commit()
+        print(f"Rebuilt {len(index_sql)} indexes in {time.perf_counter() - start:.1f}s")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return stats
+
+
+# --- ddcsocial_media_app.py accounts ---
+
+def accounts(rng, first_id, count, hashes):
+    for i in range(first_id, first_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        major, minor = rng.sample(MAJORS, 2)
+        yield (f"{first.lower()}.{last.lower()}{i}@dcccd.edu", hashes[i % len(hashes)], f"{first} {last}",
+               text(rng, 12), str(rng.randint(END_TIME.year - 1, END_TIME.year + 4)), major,
+               minor if rng.random() < 0.4 else None, timestamp(rng.random()).strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def generate_accounts(path, count, seed, iterations):
+    fresh = not os.path.exists(path)
+    ddcsocial_media_app.DB_NAME = path
+    ddcsocial_media_app.ensure_schema()
+    # Real hashes of one known password, so generated accounts can log in.
+    # Hashing is the slow part of an account, so a small pool is shared.
+    hashes = [password_hashing.hash_password(DATASET_PASSWORD, "pbkdf2_sha256", (iterations,))
+              for _ in range(HASH_POOL_SIZE)]
+    conn = fast_connect(path, fresh)
+    stats = {}
+    try:
+        index_sql = drop_indexes(conn, ["users"])
+        write(conn, "users", """
+            INSERT OR IGNORE INTO users (email, password_hash, name, bio, role, grad_year, major, minor, created_at)
+            VALUES (?, ?, ?, ?, 'user', ?, ?, ?, ?)
+        """, accounts(Random(f"{seed}-accounts"), next_id(conn, "users"), count, hashes), count, stats)
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return stats
+
+
+def feed_counts(args):
+    counts = {table: int(args.rows * share) for table, share in ROW_MIX.items()}
+    for table, arg in (('users', args.users), ('followers', args.follows), ('posts', args.posts),
+                       ('comments', args.comments), ('post_reactions', args.reactions)):
+        if arg is not None:
+            counts[table] = arg
+    counts['users'] = max(counts['users'], 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("feed", "accounts"), default="feed",
+                        help="feed: the posts.py tables; accounts: ddcsocial_media_app.py users")
+    parser.add_argument("--db", help="database file (default: the app's own)")
+    parser.add_argument("--rows", type=int, default=100_000, help="total feed rows, split as in ROW_MIX")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--follows", type=int)
+    parser.add_argument("--posts", type=int)
+    parser.add_argument("--comments", type=int)
+    parser.add_argument("--reactions", type=int)
+    parser.add_argument("--seed", default="42")
+    parser.add_argument("--iterations", type=int, default=1000,
+                        help=f"PBKDF2 iterations of the account hashes (password: {DATASET_PASSWORD})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.target == "feed":
+        stats = generate_feed(args.db or posts.DB_FILE, feed_counts(args), args.seed)
+    else:
+        stats = generate_accounts(args.db or ddcsocial_media_app.DB_NAME, args.users or 1000, args.seed, args.iterations)
+    rows = sum(written for written, _ in stats.values())
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
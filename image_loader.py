@@ -0,0 +1,191 @@
+import io
+import os
+import queue
+import threading
+import tkinter as tk
+from collections import OrderedDict
+
+import blob_store
+import thumbnails
+
+# Avatars and other pictures are read and scaled on a small thread pool so
+# the Tk thread never waits on a decode. A label shows a grey placeholder
+# straight away and gets the real picture when it is ready. Tk objects may
+# only be touched on the Tk thread, so workers hand back plain bytes (a
+# PNG thumbnail, or raw PPM pixels when Pillow did the scaling) through a
+# queue that the Tk thread drains with root.after.
+#
+# Finished PhotoImages are kept in an LRU bounded by their pixel memory, and
+# a picture that is already being loaded is not queued again, so each
+# avatar is decoded once per session unless the budget forces it out.
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # about 4000 avatars at 64 px
+DECODE_WORKERS = 2
+POLL_MS = 15
+PLACEHOLDER_COLOR = "#dddddd"
+
+
+def avatar_data(avatar_key, source, size, db_file=None):
+    """Image bytes Tk can read for an avatar at `size` px. Runs on a worker.
+
+    Without a cached thumbnail the picture is made again from `source`, or
+    from the original kept in db_file's blob store.
+    """
+    path = thumbnails.get_thumbnail(avatar_key, size) or thumbnails.rebuild_thumbnail(avatar_key, size, source)
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    if source and os.path.exists(source):
+        return scaled_image_data(source, size)
+    if avatar_key and db_file:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            original = blob_store.export_blob(db_file, avatar_key, os.path.join(tmp, avatar_key))
+            if original:
+                path = thumbnails.rebuild_thumbnail(avatar_key, size, original)
+                if path:
+                    with open(path, "rb") as f:
+                        return f.read()
+                return scaled_image_data(original, size)
+    return None
+
+
+def scaled_image_data(source, size):
+    """Decodes and shrinks any image file with Pillow, returning PPM or PNG bytes."""
+    from PIL import Image  # only needed when there is no thumbnail
+
+    with Image.open(source) as image:
+        image.draft("RGB", (size * 2, size * 2))
+        image.thumbnail((size, size))
+        buf = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.convert("RGBA").save(buf, "PNG")
+        else:
+            # Tk copies raw PPM pixels instead of decoding them
+            image.convert("RGB").save(buf, "PPM")
+    return buf.getvalue()
+
+
+class ImageLoader:
+    """Loads images off the Tk thread into an LRU of PhotoImages bounded by bytes."""
+
+    def __init__(self, root, max_bytes=CACHE_MAX_BYTES, workers=DECODE_WORKERS):
+        from concurrent.futures import ThreadPoolExecutor  # not needed until a screen shows pictures
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.cached_bytes = 0
+        self.decodes = 0            # images made, for benchmarks and sanity checks
+        self._cache = OrderedDict()  # cache key -> (PhotoImage, bytes)
+        self._waiting = {}           # cache key -> callbacks of requests in flight
+        self._done = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-decode")
+        self._placeholders = {}
+        self._polling = False
+
+    def placeholder(self, width, height=None):
+        """A flat grey image shown until the real one arrives."""
+        height = height or width
+        image = self._placeholders.get((width, height))
+        if image is None:
+            image = tk.PhotoImage(master=self.root, width=width, height=height)
+            image.put(PLACEHOLDER_COLOR, to=(0, 0, width, height))
+            self._placeholders[(width, height)] = image
+        return image
+
+    def request(self, cache_key, fetch, callback):
+        """Calls callback(PhotoImage or None) on the Tk thread once the image is ready.
+
+        fetch() runs on a worker and returns bytes Tk can read. A cached image
+        is handed over at once; a request for an image already in flight
+        waits for that load instead of starting another.
+        """
+        entry = self._cache.get(cache_key)
+        if entry is not None:
+            self._cache.move_to_end(cache_key)
+            callback(entry[0])
+            return
+        if cache_key in self._waiting:
+            self._waiting[cache_key].append(callback)
+            return
+        self._waiting[cache_key] = [callback]
+        self._executor.submit(self._fetch, cache_key, fetch)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def _fetch(self, cache_key, fetch):
+        try:
+            data = fetch()
+        except Exception as e:
+            print(f"Image load failed for {cache_key}: {e}")
+            data = None
+        self._done.put((cache_key, data))
+
+    def _poll(self):
+        while True:
+            try:
+                cache_key, data = self._done.get_nowait()
+            except queue.Empty:
+                break
+            photo = None
+            if data:
+                try:
+                    photo = tk.PhotoImage(master=self.root, data=data)
+                    self.decodes += 1
+                    self._store(cache_key, photo)
+                except tk.TclError as e:
+                    print(f"Unreadable image for {cache_key}: {e}")
+            for callback in self._waiting.pop(cache_key, []):
+                callback(photo)
+        if self._waiting:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _store(self, cache_key, photo):
+        size = photo.width() * photo.height() * 4
+        self._cache[cache_key] = (photo, size)
+        self.cached_bytes += size
+        # Widgets showing an evicted image keep it alive through their own reference
+        while self.cached_bytes > self.max_bytes and len(self._cache) > 1:
+            _, (_, evicted) = self._cache.popitem(last=False)
+            self.cached_bytes -= evicted
+
+    def show(self, label, cache_key, fetch, width, height=None):
+        """Puts a placeholder on label now and the loaded image later."""
+        placeholder = self.placeholder(width, height)
+        label.config(image=placeholder)
+        label.image = placeholder
+
+        def done(photo):
+            if photo is not None and label.winfo_exists():
+                label.config(image=photo)
+                label.image = photo
+
+        self.request(cache_key, fetch, done)
+
+    def show_avatar(self, label, avatar_key, source, size, db_file=None):
+        """Shows a user's avatar at size px, or just the placeholder if they have none."""
+        if not avatar_key and not source:
+            placeholder = self.placeholder(size)
+            label.config(image=placeholder)
+            label.image = placeholder
+            return
+        self.show(label, ("avatar", avatar_key or source, size),
+                  lambda: avatar_data(avatar_key, source, size, db_file), size)
+
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+def get_loader(widget):
+    """The ImageLoader shared by every window of widget's Tk application."""
+    root = widget._root()
+    with _loaders_lock:
+        loader = _loaders.get(root)
+        if loader is None:
+            loader = _loaders[root] = ImageLoader(root)
+    return loader
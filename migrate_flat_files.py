@@ -0,0 +1,195 @@
+"""Stream the text-file users (credentials.txt, profiles.txt) into social_media.db.
+
+register_login.py and user_management.py keep accounts in two text files;
+ddcsocial_media_app.py keeps them in the users table. This tool walks
+credentials.txt line by line, joins each email with its profile (looked up
+through the profile index, so profiles.txt is never loaded whole), hashes
+the plain text passwords on a process pool and inserts the users in
+batches, one transaction per batch.
+
+Each transaction also records how far into credentials.txt it got, so an
+interrupted run picks up after the last committed batch. Emails that
+already belong to an account in the database are left alone; a later line
+for an email this tool migrated (a password change) updates that row.
+
+    python migrate_flat_files.py --db social_media.db --iterations 10000
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ddcsocial_media_app
+import password_hashing
+import profile_index
+import profile_log
+
+CREDENTIALS_FILE = "credentials.txt"
+PROFILES_FILE = profile_log.PROFILES_FILE
+BATCH_SIZE = 2000
+HASH_CHUNK = 100          # passwords per process pool task
+REPORT_EVERY = 10         # batches between progress lines
+CHECK_BYTES = 64          # bytes before the resume offset that must still match
+
+
+class MigrationReport:
+    """Counts and timing of one migration run."""
+
+    def __init__(self, resumed_at):
+        self.resumed_at = resumed_at
+        self.lines = 0
+        self.migrated = 0
+        self.skipped = []   # (email, reason)
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.lines / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        resumed = f" (resumed at byte {self.resumed_at})" if self.resumed_at else ""
+        return (f"Read {self.lines} credential lines{resumed}, migrated {self.migrated}, "
+                f"skipped {len(self.skipped)} in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} lines/s)")
+
+
+def ensure_schema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS flat_file_migration (
+            source TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL,
+            checkpoint BLOB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        -- Accounts this tool created; only these may be updated by later lines
+        CREATE TABLE IF NOT EXISTS flat_file_users (
+            email TEXT PRIMARY KEY
+        );
+    """)
+
+
+def resume_offset(conn, source, path):
+    """Where the last run stopped, or 0 if the file changed under it."""
+    row = conn.execute("SELECT offset, checkpoint FROM flat_file_migration WHERE source = ?", (source,)).fetchone()
+    if row is None:
+        return 0
+    offset, checkpoint = row
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - len(checkpoint)))
+        if f.read(len(checkpoint)) != checkpoint:
+            print(f"{path} changed since the last run; starting over")
+            return 0
+    return offset
+
+
+def read_batches(path, offset, batch_size):
+    """Yields ({email: password}, end offset, checkpoint bytes) per batch, newest line winning."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        batch, lines = {}, 0
+        tail = b""
+        for raw in f:
+            offset += len(raw)
+            tail = (tail + raw)[-CHECK_BYTES:]
+            email, sep, password = raw.decode("utf-8", errors="replace").partition(",")
+            lines += 1
+            if sep and email.strip():
+                batch[email.strip()] = password.strip()
+            if lines >= batch_size:
+                yield batch, lines, offset, tail
+                batch, lines = {}, 0
+        if lines:
+            yield batch, lines, offset, tail
+
+
+def _hash_all(pool, passwords, scheme, cost):
+    return list(pool.map(password_hashing.hash_password, passwords,
+                         [scheme] * len(passwords), [cost] * len(passwords), chunksize=HASH_CHUNK))
+
+
+def migrate(db_file, credentials_file=CREDENTIALS_FILE, profiles_file=PROFILES_FILE,
+            workers=None, scheme=None, cost=None, batch_size=BATCH_SIZE):
+    """Migrates the text-file users into db_file and returns a MigrationReport."""
+    # Make sure the users table has every column the app expects
+    ddcsocial_media_app.DB_NAME = db_file
+    ddcsocial_media_app.ensure_schema()
+
+    source = os.path.abspath(credentials_file)
+    profiles = profile_index.ProfileIndex(profiles_file)
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        ensure_schema(conn)
+        start = resume_offset(conn, source, credentials_file)
+        report = MigrationReport(start)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for n, (batch, lines, offset, checkpoint) in enumerate(read_batches(credentials_file, start, batch_size), 1):
+                report.lines += lines
+                emails = list(batch)
+                taken = set()
+                for i in range(0, len(emails), 500):
+                    chunk = emails[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    taken.update(r[0] for r in conn.execute(f"""
+                        SELECT email FROM users WHERE email IN ({marks})
+                        AND email NOT IN (SELECT email FROM flat_file_users WHERE email IN ({marks}))
+                    """, chunk + chunk))
+                for email in taken:
+                    report.skipped.append((email, "already has an account in the database"))
+                emails = [e for e in emails if e not in taken]
+                hashes = _hash_all(pool, [batch[e] for e in emails], scheme, cost)
+
+                rows = []
+                for email, pw_hash in zip(emails, hashes):
+                    profile = profiles.get(email) or {}
+                    rows.append((email, pw_hash, profile.get("name") or email.split("@")[0],
+                                 profile.get("bio") or "No bio yet", profile.get("grad_year") or None,
+                                 profile.get("major") or None, profile.get("minor") or None))
+                with conn:
+                    conn.executemany("""
+                        INSERT INTO users (email, password_hash, name, bio, role, grad_year, major, minor)
+                        VALUES (?, ?, ?, ?, 'user', ?, ?, ?)
+                        ON CONFLICT(email) DO UPDATE SET
+                            password_hash = excluded.password_hash, name = excluded.name, bio = excluded.bio,
+                            grad_year = excluded.grad_year, major = excluded.major, minor = excluded.minor
+                    """, rows)
+                    conn.executemany("INSERT OR IGNORE INTO flat_file_users (email) VALUES (?)", [(e,) for e in emails])
+                    conn.execute("""
+                        INSERT INTO flat_file_migration (source, offset, checkpoint) VALUES (?, ?, ?)
+                        ON CONFLICT(source) DO UPDATE SET
+                            offset = excluded.offset, checkpoint = excluded.checkpoint, updated_at = CURRENT_TIMESTAMP
+                    """, (source, offset, checkpoint))
+                report.migrated += len(rows)
+                if n % REPORT_EVERY == 0:
+                    print(f"  {report.lines} lines, {report.rows_per_second:,.0f} lines/s")
+    finally:
+        conn.close()
+        profiles.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=ddcsocial_media_app.DB_NAME, help="database file (default: social_media.db)")
+    parser.add_argument("--credentials", default=CREDENTIALS_FILE)
+    parser.add_argument("--profiles", default=PROFILES_FILE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="PBKDF2 iterations (default: the login cost; cheaper hashes are upgraded at first login)")
+    args = parser.parse_args()
+
+    scheme = "pbkdf2_sha256" if args.iterations else None
+    cost = (args.iterations,) if args.iterations else None
+    report = migrate(args.db, args.credentials, args.profiles, workers=args.workers,
+                     scheme=scheme, cost=cost, batch_size=args.batch_size)
+    print(report.summary())
+    for email, reason in report.skipped[:20]:
+        print(f"  skipped {email}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
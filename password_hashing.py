@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+
+# Stored hashes carry their own scheme, cost and salt so the cost can be
+# raised later without breaking existing accounts:
+#
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>
+#
+# Salt and hash are unpadded base64. Hashes made before this module existed
+# are a bare SHA-256 hex digest with a fixed salt; they still verify and are
+# replaced with the current scheme on the next successful login.
+
+HASH_SCHEME = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 600_000
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+LEGACY_SALT = "dcccd_social_salt"
+
+# hashlib releases the GIL while it derives a key, so a few threads are
+# enough to keep logins off the Tk thread without a process pool. The pool
+# is made on the first submit() so importing this module stays cheap.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def current_cost(scheme=None):
+    """The cost parameters new hashes of `scheme` are made with."""
+    scheme = scheme or HASH_SCHEME
+    if scheme == "pbkdf2_sha256":
+        return (PBKDF2_ITERATIONS,)
+    if scheme == "scrypt":
+        return (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def _derive(scheme, cost, password, salt):
+    if scheme == "pbkdf2_sha256":
+        (iterations,) = cost
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    if scheme == "scrypt":
+        n, r, p = cost
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * r * (n + p + 2), dklen=32)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def hash_password(password, scheme=None, cost=None):
+    """Hashes a password with a fresh random salt. Returns the string to store."""
+    scheme = scheme or HASH_SCHEME
+    cost = tuple(cost) if cost else current_cost(scheme)
+    salt = os.urandom(SALT_BYTES)
+    derived = _derive(scheme, cost, password, salt)
+    return "$".join([scheme, *map(str, cost), _b64(salt), _b64(derived)])
+
+
+def _parse(stored):
+    """Splits a stored hash into (scheme, cost, salt, hash); None for legacy hashes."""
+    parts = stored.split("$")
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        return parts[0], (int(parts[1]),), _unb64(parts[2]), _unb64(parts[3])
+    if parts[0] == "scrypt" and len(parts) == 6:
+        return parts[0], tuple(int(x) for x in parts[1:4]), _unb64(parts[4]), _unb64(parts[5])
+    return None
+
+
+def check_password(stored, password):
+    """Checks a plain text password against a stored hash of any supported scheme."""
+    if not stored:
+        return False
+    parsed = _parse(stored)
+    if parsed is None:
+        legacy = hashlib.sha256((password + LEGACY_SALT).encode("utf-8")).hexdigest()
+        return hmac.compare_digest(stored, legacy)
+    scheme, cost, salt, expected = parsed
+    return hmac.compare_digest(_derive(scheme, cost, password, salt), expected)
+
+
+def needs_rehash(stored):
+    """True when a stored hash was not made with the current scheme and cost."""
+    parsed = _parse(stored or "")
+    return parsed is None or parsed[0] != HASH_SCHEME or parsed[1] != current_cost()
+
+
+def submit(fn, *args):
+    """Runs fn(*args) on the hashing pool and returns its Future."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="password-hash")
+    return _executor.submit(fn, *args)
@@ -1,69 +1,169 @@
 import sqlite3
 import datetime
+import io
+import os
 from datetime import datetime as dt
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, simpledialog
+import threading
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
+
+import action_trace
+import query_stats
+import tombstones
+import blob_store
+import thumbnails
+import image_loader
 
 DB_FILE = "social_media_full.db"
 TIME_FORMAT = "%m/%d/%Y at %H:%M"
 
-# ------------------------- DATABASE SETUP -------------------------
-def get_conn():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Image attachments are shrunk on upload into three copies: the stored image
+# (JPEG), the feed thumbnail (PNG, which Tk reads without Pillow) and a tiny
+# preview kept inline in post_attachments. The feed shows the previews at
+# once and loads thumbnails only for posts within PRELOAD_SCREENS of the view.
+MAX_ATTACHMENTS = 4
+ATTACHMENT_MAX_SIDE = 1280
+FEED_IMAGE_WIDTH = 480
+PREVIEW_SIDE = 16
+PRELOAD_SCREENS = 1
+# Rows written by deactivated or deleted accounts are hidden everywhere. Every
+# query that shows them joins the author as `u` and filters on this.
+ACTIVE_USER = "u.is_active = 1 AND u.deleted_at IS NULL"
 
-def setup_database():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
+# ------------------------- DATABASE SETUP -------------------------
+# Deleting a user or post cascades to everything that points at it; the
+# tombstone purge job (tombstones.py) does that in small batches instead of
+# one long transaction, the cascade is the safety net.
+TABLE_SCHEMAS = {
+    "users": """
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT NOT NULL UNIQUE,
-            email TEXT NOT NULL UNIQUE
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS posts (
+            email TEXT NOT NULL UNIQUE,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            deleted_at TEXT,
+            avatar_key TEXT
+    """,
+    "posts": """
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             content TEXT NOT NULL,
             created_at TEXT NOT NULL,
             updated_at TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS comments (
+            deleted_at TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    """,
+    "comments": """
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             post_id INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
             comment_text TEXT NOT NULL,
             created_at TEXT NOT NULL,
-            FOREIGN KEY(post_id) REFERENCES posts(id),
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS post_reactions (
+            parent_id INTEGER,
+            path TEXT,
+            FOREIGN KEY(post_id) REFERENCES posts(id) ON DELETE CASCADE,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(parent_id) REFERENCES comments(id) ON DELETE SET NULL
+    """,
+    "post_reactions": """
             post_id INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
             reaction_type TEXT NOT NULL CHECK(reaction_type IN ('like','dislike')),
             reacted_at TEXT NOT NULL,
             PRIMARY KEY (post_id, user_id),
-            FOREIGN KEY(post_id) REFERENCES posts(id),
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS followers (
+            FOREIGN KEY(post_id) REFERENCES posts(id) ON DELETE CASCADE,
+            FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    """,
+    "post_attachments": """
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            image_hash TEXT NOT NULL,
+            thumb_hash TEXT NOT NULL,
+            thumb_width INTEGER NOT NULL,
+            thumb_height INTEGER NOT NULL,
+            preview BLOB NOT NULL,
+            FOREIGN KEY(post_id) REFERENCES posts(id) ON DELETE CASCADE
+    """,
+    "followers": """
             follower_id INTEGER NOT NULL,
             following_id INTEGER NOT NULL,
             PRIMARY KEY (follower_id, following_id),
-            FOREIGN KEY(follower_id) REFERENCES users(id),
-            FOREIGN KEY(following_id) REFERENCES users(id)
-        );
-    """)
+            FOREIGN KEY(follower_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY(following_id) REFERENCES users(id) ON DELETE CASCADE
+    """,
+}
+
+def get_conn():
+    conn = query_stats.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def table_columns(c, table):
+    c.execute(f"PRAGMA table_info({table})")
+    return [r[1] for r in c.fetchall()]
+
+def rebuild_with_cascade(c, table):
+    """Recreate a table created before its foreign keys cascaded.
+
+    SQLite cannot alter a constraint, so the rows are copied into a fresh
+    table with the current schema. Foreign keys must be off while this runs.
+    """
+    c.execute(f"PRAGMA foreign_key_list({table})")
+    actions = [r['on_delete'] for r in c.fetchall()]
+    if not actions or all(a in ("CASCADE", "SET NULL") for a in actions):
+        return
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    seq = c.fetchone()
+    new_cols = set(table_columns(c, table))
+    c.execute(f"CREATE TABLE {table}_rebuild ({TABLE_SCHEMAS[table]})")
+    cols = ", ".join(col for col in table_columns(c, f"{table}_rebuild") if col in new_cols)
+    c.execute(f"INSERT INTO {table}_rebuild ({cols}) SELECT {cols} FROM {table}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    if seq:
+        c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+
+def setup_database():
+    conn = get_conn()
+    # Table rebuilds below must not trip the constraints half way through
+    conn.execute("PRAGMA foreign_keys = OFF")
+    c = conn.cursor()
+    for table, schema in TABLE_SCHEMAS.items():
+        c.execute(f"CREATE TABLE IF NOT EXISTS {table} ({schema});")
+    # Older databases are missing columns added since they were created
+    for table, column in (("users", "is_active INTEGER NOT NULL DEFAULT 1"),
+                          ("users", "deleted_at TEXT"),
+                          ("users", "avatar_key TEXT"),
+                          ("posts", "deleted_at TEXT"),
+                          ("comments", "parent_id INTEGER REFERENCES comments(id)"),
+                          ("comments", "path TEXT")):
+        try:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass  # column already exists
+    backfill_comment_paths(c)
+    for table in TABLE_SCHEMAS:
+        rebuild_with_cascade(c, table)
+    # Comment previews and "load more" pages walk comments newest-first per post
+    c.execute("CREATE INDEX IF NOT EXISTS idx_comments_post ON comments(post_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments(parent_id)")
+    # Threads are read in path order, and a subtree is a contiguous path range
+    c.execute("CREATE INDEX IF NOT EXISTS idx_comments_thread ON comments(post_id, path)")
+    # Cascades and the purge job look rows up by the user they belong to
+    c.execute("CREATE INDEX IF NOT EXISTS idx_posts_user ON posts(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_comments_user ON comments(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_reactions_user ON post_reactions(user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_followers_following ON followers(following_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_attachments_post ON post_attachments(post_id, position)")
+    # Tombstones are rare, so the purge job finds them through tiny partial indexes
+    c.execute("CREATE INDEX IF NOT EXISTS idx_posts_deleted ON posts(id) WHERE deleted_at IS NOT NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_deleted ON users(id) WHERE deleted_at IS NOT NULL")
+    conn.commit()
+    # Avatars are kept in the database too, counted by the users pointing at them
+    blob_store.track_references(conn, "users", "avatar_key")
+    blob_store.track_references(conn, "post_attachments", "image_hash")
+    blob_store.track_references(conn, "post_attachments", "thumb_hash")
     conn.commit()
     conn.close()
 
@@ -83,7 +183,7 @@ def create_user(username, email):
 def get_user_by_email(email):
     conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email = ?", (email,))
+    c.execute(f"SELECT * FROM users u WHERE email = ? AND {ACTIVE_USER}", (email,))
     row = c.fetchone()
     conn.close()
     return row
@@ -96,30 +196,47 @@ def get_user_by_id(user_id):
     conn.close()
     return row
 
-def create_post(user_id, content):
+def set_avatar(user_id, avatar_key):
+    """Points a user at a thumbnail set made by thumbnails.make_thumbnails.
+
+    The key is also the picture's key in the blob store; the update moves
+    the blob references from the old picture to the new one.
+    """
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("UPDATE users SET avatar_key = ? WHERE id = ?", (avatar_key, user_id))
+    conn.commit()
+    conn.close()
+
+def create_post(user_id, content, attachments=()):
+    """Adds a post with attachments made by prepare_attachment, in one transaction."""
     ts = dt.now().strftime(TIME_FORMAT)
     conn = get_conn()
     c = conn.cursor()
     c.execute("INSERT INTO posts (user_id, content, created_at) VALUES (?, ?, ?)", (user_id, content, ts))
     post_id = c.lastrowid
+    for position, a in enumerate(attachments):
+        image_hash = blob_store.put_bytes(conn, a['image'], "image/jpeg")
+        thumb_hash = blob_store.put_bytes(conn, a['thumb'], "image/png")
+        c.execute("""
+            INSERT INTO post_attachments (post_id, position, image_hash, thumb_hash, thumb_width, thumb_height, preview)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (post_id, position, image_hash, thumb_hash, a['thumb_width'], a['thumb_height'], a['preview']))
     conn.commit()
     conn.close()
     return post_id
 
 def delete_post(post_id, user_id):
+    # Only tombstone the post here; comments and reactions are removed later
+    # by the purge job so the click returns immediately
     conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT user_id FROM posts WHERE id = ?", (post_id,))
-    post = c.fetchone()
-    if not post or post['user_id'] != user_id:
-        conn.close()
-        return False
-    c.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
-    c.execute("DELETE FROM post_reactions WHERE post_id = ?", (post_id,))
-    c.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+    c.execute("UPDATE posts SET deleted_at = ? WHERE id = ? AND user_id = ? AND deleted_at IS NULL",
+              (dt.now().isoformat(), post_id, user_id))
+    deleted = c.rowcount > 0
     conn.commit()
     conn.close()
-    return True
+    return deleted
 
 def update_post(post_id, new_text):
     updated_ts = dt.now().strftime(TIME_FORMAT)
@@ -132,21 +249,87 @@ def update_post(post_id, new_text):
 def fetch_posts():
     conn = get_conn()
     c = conn.cursor()
-    c.execute("""
-        SELECT p.id, p.user_id, u.username, p.content, p.created_at, p.updated_at
+    c.execute(f"""
+        SELECT p.id, p.user_id, u.username, u.avatar_key, p.content, p.created_at, p.updated_at
         FROM posts p
         JOIN users u ON p.user_id = u.id
+        WHERE p.deleted_at IS NULL AND {ACTIVE_USER}
         ORDER BY p.id DESC
     """)
     rows = c.fetchall()
     conn.close()
     return rows
 
+# ------------------------- ATTACHMENTS -------------------------
+def prepare_attachment(path):
+    """Shrinks and re-encodes an image for a post. Slow; run it on a worker.
+
+    Needs Pillow; raises ImportError without it and OSError for files it
+    cannot read as an image.
+    """
+    from PIL import Image, ImageOps  # only needed to attach images
+
+    with Image.open(path) as image:
+        image.draft("RGB", (ATTACHMENT_MAX_SIDE, ATTACHMENT_MAX_SIDE))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((ATTACHMENT_MAX_SIDE, ATTACHMENT_MAX_SIDE))
+    attachment = {}
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=85, optimize=True)
+    attachment['image'] = buf.getvalue()
+    # Each smaller copy is shrunk from the one before it
+    image.thumbnail((FEED_IMAGE_WIDTH, FEED_IMAGE_WIDTH * 2))
+    buf = io.BytesIO()
+    image.save(buf, "PNG", optimize=True)
+    attachment['thumb'] = buf.getvalue()
+    attachment['thumb_width'], attachment['thumb_height'] = image.size
+    image.thumbnail((PREVIEW_SIDE, PREVIEW_SIDE))
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    attachment['preview'] = buf.getvalue()
+    return attachment
+
+def get_attachments(post_ids):
+    """Attachment sizes and inline previews per post, without any image data.
+
+    Returns {post_id: [rows in position order]}; posts without attachments
+    are left out.
+    """
+    if not post_ids:
+        return {}
+    placeholders = ",".join("?" * len(post_ids))
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT post_id, id, thumb_hash, thumb_width, thumb_height, preview
+        FROM post_attachments
+        WHERE post_id IN ({placeholders})
+        ORDER BY post_id, position
+    """, post_ids)
+    rows = c.fetchall()
+    conn.close()
+    attachments = {}
+    for r in rows:
+        attachments.setdefault(r['post_id'], []).append(r)
+    return attachments
+
+def attachment_thumbnail(thumb_hash):
+    """PNG bytes of a feed thumbnail, streamed out of the blob store. Runs on a worker."""
+    conn = sqlite3.connect(DB_FILE, timeout=10)
+    try:
+        return blob_store.read_bytes(conn, thumb_hash)
+    finally:
+        conn.close()
+
 # ------------------------- FOLLOWERS / FOLLOWING -------------------------
 def count_followers(user_id):
     conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM followers WHERE following_id = ?", (user_id,))
+    c.execute(f"""
+        SELECT COUNT(*) FROM followers f
+        JOIN users u ON u.id = f.follower_id
+        WHERE f.following_id = ? AND {ACTIVE_USER}
+    """, (user_id,))
     count = c.fetchone()[0]
     conn.close()
     return count
@@ -154,7 +337,11 @@ def count_followers(user_id):
 def count_following(user_id):
     conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM followers WHERE follower_id = ?", (user_id,))
+    c.execute(f"""
+        SELECT COUNT(*) FROM followers f
+        JOIN users u ON u.id = f.following_id
+        WHERE f.follower_id = ? AND {ACTIVE_USER}
+    """, (user_id,))
     count = c.fetchone()[0]
     conn.close()
     return count
@@ -172,6 +359,14 @@ def follow_user(follower_id, following_id):
     finally:
         conn.close()
 
+def is_following(follower_id, following_id):
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM followers WHERE follower_id=? AND following_id=?", (follower_id, following_id))
+    found = c.fetchone() is not None
+    conn.close()
+    return found
+
 def unfollow_user(follower_id, following_id):
     conn = get_conn()
     c = conn.cursor()
@@ -181,7 +376,36 @@ def unfollow_user(follower_id, following_id):
     conn.close()
 
 # ------------------------- COMMENTS -------------------------
-def add_comment(post_id, user_email, comment_text):
+COMMENT_PREVIEW_SIZE = 3
+COMMENT_PAGE_SIZE = 20
+MAX_ROWID = 2 ** 63 - 1
+# Each comment's path is its ancestors' ids plus its own, zero-padded so that
+# sorting by path gives depth-first thread order: "0000000004/0000000009"
+PATH_DIGITS = 10
+PATH_SEP = "/"
+
+def path_segment(comment_id):
+    return str(comment_id).zfill(PATH_DIGITS)
+
+def path_depth(path):
+    return path.count(PATH_SEP)
+
+def backfill_comment_paths(c):
+    # Top-level comments first, then one level of replies per pass
+    c.execute(f"UPDATE comments SET path = printf('%0{PATH_DIGITS}d', id) WHERE path IS NULL AND parent_id IS NULL")
+    while True:
+        c.execute(f"""
+            UPDATE comments
+            SET path = (SELECT p.path FROM comments p WHERE p.id = comments.parent_id) || '{PATH_SEP}' || printf('%0{PATH_DIGITS}d', id)
+            WHERE path IS NULL
+              AND parent_id IN (SELECT id FROM comments WHERE path IS NOT NULL)
+        """)
+        if c.rowcount <= 0:
+            break
+    # Replies whose parent no longer exists are shown as top-level comments
+    c.execute(f"UPDATE comments SET path = printf('%0{PATH_DIGITS}d', id) WHERE path IS NULL")
+
+def add_comment(post_id, user_email, comment_text, parent_id=None):
     if not comment_text or not post_id or not user_email:
         return False
     conn = get_conn()
@@ -195,8 +419,19 @@ def add_comment(post_id, user_email, comment_text):
         c.execute("SELECT id FROM posts WHERE id = ?", (post_id,))
         if not c.fetchone():
             return False
-        c.execute("INSERT INTO comments (post_id, user_id, comment_text, created_at) VALUES (?, ?, ?, ?)",
-                  (post_id, user_id, comment_text, dt.now().isoformat()))
+        parent_path = None
+        if parent_id is not None:
+            # Replies must stay on the same post as the comment they answer
+            c.execute("SELECT path FROM comments WHERE id = ? AND post_id = ?", (parent_id, post_id))
+            parent = c.fetchone()
+            if not parent:
+                return False
+            parent_path = parent['path']
+        c.execute("INSERT INTO comments (post_id, user_id, comment_text, created_at, parent_id) VALUES (?, ?, ?, ?, ?)",
+                  (post_id, user_id, comment_text, dt.now().isoformat(), parent_id))
+        segment = path_segment(c.lastrowid)
+        path = parent_path + PATH_SEP + segment if parent_path else segment
+        c.execute("UPDATE comments SET path = ? WHERE id = ?", (path, c.lastrowid))
         conn.commit()
         return True
     finally:
@@ -205,26 +440,138 @@ def add_comment(post_id, user_email, comment_text):
 def get_comments_for_post(post_id):
     conn = get_conn()
     c = conn.cursor()
-    c.execute("""
+    c.execute(f"""
         SELECT c.comment_text, u.username, c.created_at
         FROM comments c
         JOIN users u ON c.user_id = u.id
-        WHERE c.post_id = ?
+        WHERE c.post_id = ? AND {ACTIVE_USER}
         ORDER BY c.id ASC
     """, (post_id,))
     rows = c.fetchall()
     conn.close()
     return rows
 
+def get_comment_previews(post_ids, limit=COMMENT_PREVIEW_SIZE):
+    """Newest `limit` comments plus the total count for each post, in one query.
+
+    Returns {post_id: {'comments': [...oldest first...], 'total': n}}; posts
+    without comments are left out.
+    """
+    if not post_ids:
+        return {}
+    placeholders = ",".join("?" * len(post_ids))
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT post_id, id, comment_text, username, created_at, total
+        FROM (
+            SELECT c.post_id, c.id, c.comment_text, u.username, c.created_at,
+                   ROW_NUMBER() OVER (PARTITION BY c.post_id ORDER BY c.id DESC) AS rn,
+                   COUNT(*) OVER (PARTITION BY c.post_id) AS total
+            FROM comments c
+            JOIN users u ON c.user_id = u.id
+            WHERE c.post_id IN ({placeholders}) AND {ACTIVE_USER}
+        )
+        WHERE rn <= ?
+        ORDER BY post_id, id ASC
+    """, (*post_ids, limit))
+    rows = c.fetchall()
+    conn.close()
+    previews = {}
+    for r in rows:
+        preview = previews.setdefault(r['post_id'], {'comments': [], 'total': r['total']})
+        preview['comments'].append(r)
+    return previews
+
+def get_comments_page(post_id, before_id=None, limit=COMMENT_PAGE_SIZE):
+    """Keyset page of comments older than `before_id`, returned oldest first."""
+    conn = get_conn()
+    c = conn.cursor()
+    if before_id is None:
+        before_id = MAX_ROWID
+    c.execute(f"""
+        SELECT c.id, c.comment_text, u.username, c.created_at
+        FROM comments c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.post_id = ? AND c.id < ? AND {ACTIVE_USER}
+        ORDER BY c.id DESC
+        LIMIT ?
+    """, (post_id, before_id, limit))
+    rows = c.fetchall()
+    conn.close()
+    rows.reverse()
+    return rows
+
+# ------------------------- COMMENT THREADS -------------------------
+def get_comment_thread(post_id, root_id=None):
+    """Comments of a post (or one comment's subtree) in depth-first order."""
+    conn = get_conn()
+    c = conn.cursor()
+    if root_id is None:
+        c.execute(f"""
+            SELECT c.id, c.parent_id, c.path, c.comment_text, u.username, c.created_at
+            FROM comments c
+            JOIN users u ON c.user_id = u.id
+            WHERE c.post_id = ? AND {ACTIVE_USER}
+            ORDER BY c.path
+        """, (post_id,))
+    else:
+        # Every descendant's path sorts between the root's path and path + '0'
+        c.execute(f"""
+            SELECT c.id, c.parent_id, c.path, c.comment_text, u.username, c.created_at
+            FROM comments r
+            JOIN comments c ON c.post_id = r.post_id AND c.path >= r.path AND c.path < r.path || '0'
+            JOIN users u ON c.user_id = u.id
+            WHERE r.id = ? AND r.post_id = ? AND {ACTIVE_USER}
+            ORDER BY c.path
+        """, (root_id, post_id))
+    rows = c.fetchall()
+    conn.close()
+    return [dict(r, depth=path_depth(r['path'])) for r in rows]
+
+def get_reply_counts(comment_ids):
+    """Number of direct replies to each of the given comments."""
+    if not comment_ids:
+        return {}
+    placeholders = ",".join("?" * len(comment_ids))
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT c.parent_id, COUNT(*) AS cnt
+        FROM comments c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.parent_id IN ({placeholders}) AND {ACTIVE_USER}
+        GROUP BY c.parent_id
+    """, tuple(comment_ids))
+    rows = c.fetchall()
+    conn.close()
+    return {r['parent_id']: r['cnt'] for r in rows}
+
+def count_subtree(comment_id):
+    """Number of replies at any depth below a comment."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT COUNT(*)
+        FROM comments r
+        JOIN comments c ON c.post_id = r.post_id AND c.path > r.path AND c.path < r.path || '0'
+        JOIN users u ON c.user_id = u.id
+        WHERE r.id = ? AND {ACTIVE_USER}
+    """, (comment_id,))
+    count = c.fetchone()[0]
+    conn.close()
+    return count
+
 # ------------------------- REACTIONS -------------------------
 def get_reaction_counts(post_id):
     conn = get_conn()
     c = conn.cursor()
-    c.execute("""
-        SELECT reaction_type, COUNT(*) as cnt
-        FROM post_reactions
-        WHERE post_id = ?
-        GROUP BY reaction_type
+    c.execute(f"""
+        SELECT r.reaction_type, COUNT(*) as cnt
+        FROM post_reactions r
+        JOIN users u ON r.user_id = u.id
+        WHERE r.post_id = ? AND {ACTIVE_USER}
+        GROUP BY r.reaction_type
     """, (post_id,))
     rows = c.fetchall()
     conn.close()
@@ -251,6 +598,23 @@ def set_reaction(post_id, user_id, reaction_type):
     conn.commit()
     conn.close()
 
+def load_feed(user_id=None):
+    """Everything refresh_feed shows, for the user with user_id (None: logged out).
+
+    Returns (posts, comment previews, attachments, reaction counts by post id,
+    ids of the authors user_id follows).
+    """
+    posts = fetch_posts()
+    post_ids = [p['id'] for p in posts]
+    previews = get_comment_previews(post_ids)
+    attachments = get_attachments(post_ids)
+    reactions = {pid: get_reaction_counts(pid) for pid in post_ids}
+    following = set()
+    if user_id is not None:
+        authors = {p['user_id'] for p in posts} - {user_id}
+        following = {author for author in authors if is_following(user_id, author)}
+    return posts, previews, attachments, reactions, following
+
 # ------------------------- GUI -------------------------
 class SocialApp:
     def __init__(self, root):
@@ -282,6 +646,7 @@ class SocialApp:
         btn_frame.pack(pady=6)
         ttk.Button(btn_frame, text="Register", command=self.register).grid(row=0,column=0,padx=8)
         ttk.Button(btn_frame, text="Login", command=self.login).grid(row=0,column=1,padx=8)
+        ttk.Button(btn_frame, text="Avatar", command=self.choose_avatar).grid(row=0,column=2,padx=8)
 
         self.logged_label = ttk.Label(self.left_frame, text="Not logged in", font=("Segoe UI", 10))
         self.logged_label.pack(padx=20, pady=(6,12))
@@ -292,6 +657,10 @@ class SocialApp:
         ttk.Label(self.left_frame, text="Create a Post", font=("Segoe UI", 12, "bold")).pack(anchor="w", padx=20)
         self.post_text = scrolledtext.ScrolledText(self.left_frame, width=36, height=7, wrap=tk.WORD, font=("Segoe UI", 10))
         self.post_text.pack(padx=20, pady=(6,10))
+        ttk.Button(self.left_frame, text="Attach Images", command=self.attach_images).pack(pady=(0,4))
+        self.attachments_label = ttk.Label(self.left_frame, text="", font=("Segoe UI", 9))
+        self.attachments_label.pack()
+        self.pending_attachments = []
         self.post_button = ttk.Button(self.left_frame, text="Share Post", command=self.create_post)
         self.post_button.pack(pady=6)
 
@@ -299,17 +668,38 @@ class SocialApp:
         self.right_frame = tk.Frame(root, bg="#fafafa", bd=0)
         self.right_frame.place(x=380, y=20, width=600, height=660)
         ttk.Label(self.right_frame, text="Feed", font=("Segoe UI", 16, "bold")).pack(pady=10)
-        self.feed_frame = tk.Frame(self.right_frame, bg="#fafafa")
-        self.feed_frame.pack(fill="both", expand=True)
+        # The feed scrolls inside a canvas; scrolling decides which images get loaded
+        self.feed_canvas = tk.Canvas(self.right_frame, bg="#fafafa", highlightthickness=0)
+        feed_scrollbar = ttk.Scrollbar(self.right_frame, orient="vertical", command=self.feed_canvas.yview)
+        self.feed_canvas.configure(yscrollcommand=lambda first, last: (feed_scrollbar.set(first, last),
+                                                                        self.schedule_image_check()))
+        feed_scrollbar.pack(side="right", fill="y")
+        self.feed_canvas.pack(side="left", fill="both", expand=True)
+        self.feed_frame = tk.Frame(self.feed_canvas, bg="#fafafa")
+        feed_window = self.feed_canvas.create_window((0, 0), window=self.feed_frame, anchor="nw")
+        self.feed_frame.bind("<Configure>", lambda e: self.feed_canvas.configure(scrollregion=self.feed_canvas.bbox("all")))
+        self.feed_canvas.bind("<Configure>", lambda e: self.feed_canvas.itemconfigure(feed_window, width=e.width))
+        root.bind("<MouseWheel>", lambda e: self.feed_canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        root.bind("<Button-4>", lambda e: self.feed_canvas.yview_scroll(-1, "units"))
+        root.bind("<Button-5>", lambda e: self.feed_canvas.yview_scroll(1, "units"))
+        self.feed_images = []   # one dict per attachment label, top to bottom
+        self.image_check_pending = False
+        # Avatars and attachments are decoded on worker threads and cached for the session
+        self.images = image_loader.get_loader(root)
         self.refresh_feed()
 
     # ------------------------- USER ACTIONS -------------------------
+    def trace(self, action, **params):
+        action_trace.record(action, self.current_user['email'] if self.current_user else None, **params)
+
+    @query_stats.tagged("register")
     def register(self):
         email = self.email_entry.get().strip()
         username = self.username_entry.get().strip()
         if not email or not username:
             messagebox.showwarning("Input Error", "Email and Username required")
             return
+        action_trace.record("register", email, username_len=len(username))
         uid = create_user(username, email)
         if uid:
             self.current_user = {'id': uid, 'username': username, 'email': email}
@@ -320,8 +710,10 @@ class SocialApp:
         else:
             messagebox.showwarning("Exists", "User already exists")
 
+    @query_stats.tagged("login")
     def login(self):
         email = self.email_entry.get().strip()
+        action_trace.record("login", email)
         user = get_user_by_email(email)
         if user:
             self.current_user = dict(user)
@@ -332,6 +724,75 @@ class SocialApp:
         else:
             messagebox.showwarning("Not Found", "User not found. Please register first.")
 
+    def choose_avatar(self):
+        if not self.current_user:
+            messagebox.showwarning("Not logged in", "Login to set an avatar")
+            return
+        path = filedialog.askopenfilename(title="Select Avatar", filetypes=[("Image Files", "*.png *.jpg *.jpeg")])
+        if not path:
+            return
+        result = {}
+
+        def run():
+            try:
+                result['key'] = thumbnails.make_thumbnails(path)
+                blob_store.store_file(DB_FILE, path)
+            except (ImportError, OSError, sqlite3.Error) as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+
+        def check_done():
+            if worker.is_alive():
+                self.root.after(50, check_done)
+            elif 'error' in result:
+                messagebox.showerror("Avatar", f"Could not use this picture: {result['error']}")
+            else:
+                set_avatar(self.current_user['id'], result['key'])
+                self.refresh_feed()
+
+        self.root.after(50, check_done)
+
+    def attach_images(self):
+        if not self.current_user:
+            messagebox.showwarning("Not logged in", "Login to attach images")
+            return
+        paths = filedialog.askopenfilenames(title="Attach Images", filetypes=[("Image Files", "*.png *.jpg *.jpeg")])
+        paths = list(paths)[:MAX_ATTACHMENTS - len(self.pending_attachments)]
+        if not paths:
+            return
+        result = {}
+
+        # Resizing and re-encoding happen here, before Share Post writes anything
+        def run():
+            try:
+                result['attachments'] = [prepare_attachment(path) for path in paths]
+            except (ImportError, OSError) as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        self.post_button.config(state="disabled")
+        self.attachments_label.config(text="Processing images...")
+
+        def check_done():
+            if worker.is_alive():
+                self.root.after(50, check_done)
+                return
+            self.post_button.config(state="normal")
+            if 'error' in result:
+                messagebox.showerror("Attach Images", f"Could not use these images: {result['error']}")
+            else:
+                self.pending_attachments.extend(result['attachments'])
+            self.show_pending_attachments()
+
+        self.root.after(50, check_done)
+
+    def show_pending_attachments(self):
+        count = len(self.pending_attachments)
+        self.attachments_label.config(text=f"{count} image{'s' if count != 1 else ''} attached" if count else "")
+
     def update_follow_counts(self):
         if not self.current_user:
             self.follow_info.config(text="")
@@ -341,6 +802,7 @@ class SocialApp:
         following = count_following(uid)
         self.follow_info.config(text=f"Followers: {followers}   Following: {following}")
 
+    @query_stats.tagged("post")
     def create_post(self):
         if not self.current_user:
             messagebox.showwarning("Not logged in", "Please login first")
@@ -349,32 +811,73 @@ class SocialApp:
         if not content:
             messagebox.showwarning("Empty Post", "Post content cannot be empty")
             return
-        create_post(self.current_user['id'], content)
+        self.trace("post", content_len=len(content), attachments=len(self.pending_attachments))
+        create_post(self.current_user['id'], content, self.pending_attachments)
         self.post_text.delete("1.0","end")
+        self.pending_attachments = []
+        self.show_pending_attachments()
         self.refresh_feed()
 
+    @query_stats.tagged("react")
     def react(self, post_id, r_type):
         if not self.current_user:
             messagebox.showwarning("Not logged in", "Login to react")
             return
+        self.trace("react", post_id=post_id, reaction=r_type)
         set_reaction(post_id, self.current_user['id'], r_type)
         self.refresh_feed()
 
+    @query_stats.tagged("comment")
     def add_comment_gui(self, post_id):
         if not self.current_user:
             messagebox.showwarning("Not logged in", "Login to comment")
             return
         comment = simpledialog.askstring("Comment", "Enter your comment:")
         if comment:
+            self.trace("comment", post_id=post_id, text_len=len(comment))
             add_comment(post_id, self.current_user['email'], comment)
             self.refresh_feed()
 
+    @query_stats.tagged("reply")
+    def reply_gui(self, post_id, parent_id, thread_win):
+        if not self.current_user:
+            messagebox.showwarning("Not logged in", "Login to reply", parent=thread_win)
+            return
+        reply = simpledialog.askstring("Reply", "Enter your reply:", parent=thread_win)
+        if reply:
+            self.trace("comment", post_id=post_id, parent_id=parent_id, text_len=len(reply))
+            add_comment(post_id, self.current_user['email'], reply, parent_id=parent_id)
+            thread_win.destroy()
+            self.show_thread(post_id)
+
+    @query_stats.tagged("thread")
+    def show_thread(self, post_id):
+        self.trace("thread", post_id=post_id)
+        win = tk.Toplevel(self.root)
+        win.title("Comment Thread")
+        win.geometry("600x500")
+        text = scrolledtext.ScrolledText(win, wrap=tk.WORD, font=("Segoe UI", 9))
+        text.pack(fill="both", expand=True, padx=8, pady=8)
+        thread = get_comment_thread(post_id)
+        reply_counts = get_reply_counts([c['id'] for c in thread])
+        for c in thread:
+            indent = "    " * c['depth']
+            replies = reply_counts.get(c['id'], 0)
+            suffix = f"  ({replies} {'reply' if replies == 1 else 'replies'})" if replies else ""
+            text.insert("end", f"{indent}{c['username']}: {c['comment_text']}{suffix}  ")
+            btn = ttk.Button(text, text="Reply", command=lambda cid=c['id']: self.reply_gui(post_id, cid, win))
+            text.window_create("end", window=btn)
+            text.insert("end", "\n")
+        text.config(state="disabled")
+
+    @query_stats.tagged("delete_post")
     def delete_post_gui(self, post_id):
         if not self.current_user:
             messagebox.showwarning("Not logged in", "Login first")
             return
         confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this post?")
         if confirm:
+            self.trace("delete_post", post_id=post_id)
             success = delete_post(post_id, self.current_user['id'])
             if success:
                 messagebox.showinfo("Deleted", "Your post was deleted successfully.")
@@ -382,6 +885,7 @@ class SocialApp:
             else:
                 messagebox.showerror("Error", "You can only delete your own posts.")
 
+    @query_stats.tagged("edit_post")
     def edit_post_gui(self, post_id):
         if not self.current_user:
             messagebox.showwarning("Not logged in", "Login first")
@@ -396,43 +900,144 @@ class SocialApp:
             return
         new_text = simpledialog.askstring("Edit Post", "Update your post:", initialvalue=post['content'])
         if new_text and new_text.strip():
+            self.trace("edit_post", post_id=post_id, text_len=len(new_text.strip()))
             update_post(post_id, new_text.strip())
             messagebox.showinfo("Updated", "Post updated successfully.")
             self.refresh_feed()
 
+    @query_stats.tagged("follow")
     def follow_gui(self, user_id):
+        self.trace("follow", user_id=user_id)
         if follow_user(self.current_user['id'], user_id):
             messagebox.showinfo("Followed", "You are now following this user!")
             self.update_follow_counts()
             self.refresh_feed()
 
+    @query_stats.tagged("unfollow")
     def unfollow_gui(self, user_id):
+        self.trace("unfollow", user_id=user_id)
         unfollow_user(self.current_user['id'], user_id)
         messagebox.showinfo("Unfollowed", "You have unfollowed this user.")
         self.update_follow_counts()
         self.refresh_feed()
 
     # ------------------------- FEED -------------------------
+    def comment_label(self, parent, c):
+        return ttk.Label(parent, text=f"{c['username']}: {c['comment_text']}", wraplength=580, font=("Segoe UI", 9))
+
+    @query_stats.tagged("more_comments")
+    def load_more_comments(self, post_id, comments_frame, more_btn, state):
+        self.trace("more_comments", post_id=post_id, before_id=state['oldest_id'])
+        # Older comments go between the button and the ones already shown
+        page = get_comments_page(post_id, before_id=state['oldest_id'])
+        labels = [self.comment_label(comments_frame, c) for c in page]
+        for lbl in labels:
+            lbl.pack(anchor="w", padx=12, before=state['first_label'])
+        if labels:
+            state['first_label'] = labels[0]
+        state['remaining'] -= len(page)
+        if page:
+            state['oldest_id'] = page[0]['id']
+        if state['remaining'] > 0 and page:
+            more_btn.config(text=f"Load {min(state['remaining'], COMMENT_PAGE_SIZE)} more comments ({state['remaining']} hidden)")
+        else:
+            more_btn.destroy()
+
+    def attachment_label(self, parent, a):
+        """A grey box the size of the thumbnail; update_visible_images fills it in."""
+        label = tk.Label(parent, bg=image_loader.PLACEHOLDER_COLOR, image=self.images.placeholder(1),
+                         width=a['thumb_width'], height=a['thumb_height'])
+        self.feed_images.append({'label': label, 'attachment': a, 'state': 'empty'})
+        return label
+
+    def schedule_image_check(self):
+        if not self.image_check_pending:
+            self.image_check_pending = True
+            self.root.after_idle(self.update_visible_images)
+
+    def update_visible_images(self):
+        """Loads the images on and near the screen and lets go of the others.
+
+        Near the view a label shows its zoomed inline preview straight away
+        and the thumbnail once a worker has read it. Further away it goes
+        back to the shared 1px placeholder, so the only thumbnails kept in
+        memory are the ones in view and the image loader's bounded cache.
+        """
+        self.image_check_pending = False
+        if not self.feed_images:
+            return
+        view_height = self.feed_canvas.winfo_height()
+        top = self.feed_canvas.canvasy(0) - PRELOAD_SCREENS * view_height
+        bottom = self.feed_canvas.canvasy(0) + (PRELOAD_SCREENS + 1) * view_height
+        frame_y = self.feed_frame.winfo_rooty()
+        for item in self.feed_images:
+            label = item['label']
+            y = label.winfo_rooty() - frame_y
+            near = y + label.winfo_height() >= top and y <= bottom
+            if near and item['state'] == 'empty':
+                self.show_attachment(item)
+            elif not near and item['state'] != 'empty':
+                item['state'] = 'empty'
+                blank = self.images.placeholder(1)
+                label.config(image=blank)
+                label.image = blank
+
+    def show_attachment(self, item):
+        a, label = item['attachment'], item['label']
+        preview = tk.PhotoImage(master=self.root, data=a['preview'])
+        zoom = max(1, a['thumb_width'] // max(1, preview.width()))
+        preview = preview.zoom(zoom)
+        label.config(image=preview)
+        label.image = preview
+        item['state'] = 'preview'
+
+        def done(photo):
+            # The row may have scrolled away or the feed been rebuilt meanwhile
+            if photo is not None and item['state'] == 'preview' and label.winfo_exists():
+                label.config(image=photo)
+                label.image = photo
+                item['state'] = 'full'
+
+        thumb_hash = a['thumb_hash']
+        self.images.request(("attachment", thumb_hash), lambda: attachment_thumbnail(thumb_hash), done)
+
+    @query_stats.tagged("refresh_feed")
     def refresh_feed(self):
         for widget in self.feed_frame.winfo_children():
             widget.destroy()
-        posts = fetch_posts()
+        self.feed_images = []
+        self.trace("refresh_feed")
+        posts, previews, attachments, reactions, following = load_feed(
+            self.current_user['id'] if self.current_user else None)
         for p in posts:
             frame = tk.Frame(self.feed_frame, bg="white", bd=1, relief="solid")
             frame.pack(fill="x", padx=10, pady=5)
             header_text = f"{p['username']} ({p['created_at']})"
             if p['updated_at']:
                 header_text += "  (edited)"
-            ttk.Label(frame, text=header_text, font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=6, pady=2)
+            header = ttk.Label(frame, text=" " + header_text, font=("Segoe UI", 10, "bold"), compound="left")
+            self.images.show_avatar(header, p['avatar_key'], None, 32, db_file=DB_FILE)
+            header.pack(anchor="w", padx=6, pady=2)
             ttk.Label(frame, text=p['content'], wraplength=580).pack(anchor="w", padx=6)
+            for a in attachments.get(p['id'], []):
+                self.attachment_label(frame, a).pack(anchor="w", padx=6, pady=2)
 
-            comments = get_comments_for_post(p['id'])
-            if comments:
+            preview = previews.get(p['id'])
+            if preview:
                 ttk.Label(frame, text="Comments:", font=("Segoe UI", 9, "bold")).pack(anchor="w", padx=6)
-                for c in comments:
-                    ttk.Label(frame, text=f"{c['username']}: {c['comment_text']}", wraplength=580, font=("Segoe UI", 9)).pack(anchor="w", padx=12)
+                comments_frame = tk.Frame(frame, bg="white")
+                comments_frame.pack(anchor="w", fill="x")
+                labels = [self.comment_label(comments_frame, c) for c in preview['comments']]
+                for lbl in labels:
+                    lbl.pack(anchor="w", padx=12)
+                remaining = preview['total'] - len(preview['comments'])
+                if remaining > 0:
+                    state = {'oldest_id': preview['comments'][0]['id'], 'remaining': remaining, 'first_label': labels[0]}
+                    more_btn = ttk.Button(comments_frame, text=f"Load {min(remaining, COMMENT_PAGE_SIZE)} more comments ({remaining} hidden)")
+                    more_btn.config(command=lambda pid=p['id'], cf=comments_frame, b=more_btn, s=state: self.load_more_comments(pid, cf, b, s))
+                    more_btn.pack(anchor="w", padx=12, before=labels[0])
 
-            counts = get_reaction_counts(p['id'])
+            counts = reactions[p['id']]
             ttk.Label(frame, text=f"👍 {counts['like']}   👎 {counts['dislike']}", font=("Segoe UI", 9)).pack(anchor="w", padx=6)
 
             btn_frame = tk.Frame(frame, bg="white")
@@ -442,6 +1047,8 @@ class SocialApp:
             ttk.Button(btn_frame, text="Like", command=lambda pid=p['id']: self.react(pid,'like')).pack(side="left", padx=2)
             ttk.Button(btn_frame, text="Dislike", command=lambda pid=p['id']: self.react(pid,'dislike')).pack(side="left", padx=2)
             ttk.Button(btn_frame, text="Comment", command=lambda pid=p['id']: self.add_comment_gui(pid)).pack(side="left", padx=2)
+            if preview:
+                ttk.Button(btn_frame, text="Thread", command=lambda pid=p['id']: self.show_thread(pid)).pack(side="left", padx=2)
 
             # Edit/Delete for own posts
             if self.current_user and p['user_id'] == self.current_user['id']:
@@ -450,21 +1057,21 @@ class SocialApp:
 
             # Follow/Unfollow for other users
             if self.current_user and p['user_id'] != self.current_user['id']:
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("SELECT 1 FROM followers WHERE follower_id=? AND following_id=?", 
-                          (self.current_user['id'], p['user_id']))
-                is_following = c.fetchone() is not None
-                conn.close()
-
-                if is_following:
+                if p['user_id'] in following:
                     ttk.Button(btn_frame, text="Unfollow", command=lambda uid=p['user_id']: self.unfollow_gui(uid)).pack(side="left", padx=2)
                 else:
                     ttk.Button(btn_frame, text="Follow", command=lambda uid=p['user_id']: self.follow_gui(uid)).pack(side="left", padx=2)
+        # Positions are known only once the new rows are laid out
+        self.root.after_idle(self.schedule_image_check)
 
 # ------------------------- MAIN -------------------------
 if __name__ == "__main__":
     setup_database()
+    action_trace.start("posts")
+    tombstones.start_purge_thread(DB_FILE)
     root = tk.Tk()
+    if os.environ.get("SOCIAL_WATCHDOG"):
+        import ui_watchdog  # only needed when measuring UI stalls
+        ui_watchdog.start(root)
     app = SocialApp(root)
     root.mainloop()
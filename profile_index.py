@@ -0,0 +1,199 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+import profile_log
+
+# Read path for profiles.txt that never parses the whole log. The log is
+# memory-mapped next to an index file of fixed-size entries sorted by a hash
+# of the email:
+#
+#   header:  magic, log inode, log bytes covered, entry count, the last
+#            CHECK_BYTES of the covered log bytes
+#   entries: 8-byte blake2b digest of the email, record offset, record length
+#
+# A lookup is a binary search over the mapped entries and one slice of the
+# mapped log. The header ties the index to the log it was built from: a
+# compacted (new inode) or rewritten log gets a full rebuild, while records
+# appended since the index was written are scanned into a small in-memory
+# overlay and folded into the index file once there are enough of them.
+# "Enough" counts every record and byte past the index file, superseded ones
+# included: the overlay is rebuilt from there after every append, so a user
+# saving the same profile over and over must trigger a merge too.
+
+INDEX_SUFFIX = ".idx"
+MAGIC = b"PIX1"
+HEADER = struct.Struct("<4sQQQH64s")
+ENTRY = struct.Struct("<8sQI")
+MERGE_THRESHOLD = 256            # records past the index file that trigger a rewrite of it
+MERGE_TAIL_BYTES = 64 * 1024     # log bytes past the index file that do the same
+
+
+def email_digest(email):
+    return hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest()
+
+
+class ProfileIndex:
+    """Single-profile lookups over a memory-mapped profile log and sorted index."""
+
+    def __init__(self, log_path=profile_log.PROFILES_FILE, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + INDEX_SUFFIX
+        self._stamp = None     # (inode, size, mtime) of the log when last checked
+        self._log_map = None
+        self._index_map = None
+        self._count = 0        # entries in the index file
+        self._covered = 0      # log bytes the index file covers
+        self._scanned = 0      # log bytes covered by the index file plus the overlay
+        self._overlay = {}     # email -> (offset, length) for records past _covered
+        self._tail_records = 0  # records past _covered, superseded ones included
+        self._lock = threading.RLock()
+
+    # --- Lookups ---
+
+    def get(self, email):
+        """The newest profile for email, or None."""
+        with self._lock:
+            self.refresh()
+            location = self._overlay.get(email) or self._search(email)
+            if location is None:
+                return None
+            offset, length = location
+            record = profile_log.decode_record(self._log_map[offset:offset + length])
+            return record[1] if record and record[0] == email else None
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._index_map, HEADER.size + i * ENTRY.size)
+
+    def _search(self, email):
+        if not self._count:
+            return None
+        digest = email_digest(email)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Different emails can share a digest; check each record's email
+        while lo < self._count:
+            entry_digest, offset, length = self._entry(lo)
+            if entry_digest != digest:
+                break
+            record = profile_log.decode_record(self._log_map[offset:offset + length])
+            if record and record[0] == email:
+                return offset, length
+            lo += 1
+        return None
+
+    # --- Keeping the index current ---
+
+    def _stat(self):
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def refresh(self):
+        """Catches up with the log. Costs one stat() when it has not changed."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return
+            self.close()
+            self._stamp = stamp
+            if stamp is None or stamp[1] == 0:
+                return
+            with open(self.log_path, 'rb') as f:
+                self._log_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._open_index(stamp[0])  # if stale, the tail scan below rebuilds it
+            self._scan_tail()
+
+    def _open_index(self, log_inode):
+        """Maps the index file if it was built from this log. Returns False otherwise."""
+        try:
+            with open(self.index_path, 'rb') as f:
+                index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(index_map) < HEADER.size:
+            index_map.close()
+            return False
+        magic, inode, covered, count, check_len, check = HEADER.unpack_from(index_map)
+        valid = (magic == MAGIC and inode == log_inode and covered <= len(self._log_map)
+                 and len(index_map) == HEADER.size + count * ENTRY.size
+                 and self._log_map[covered - check_len:covered] == check[:check_len])
+        if not valid:
+            index_map.close()
+            return False
+        self._index_map, self._count, self._covered = index_map, count, covered
+        self._scanned = covered
+        return True
+
+    def _scan_tail(self):
+        """Adds records appended past the index file to the overlay."""
+        records, consumed = profile_log.scan_records(self._log_map[self._scanned:], self._scanned)
+        for email, offset, length in records:
+            self._overlay[email] = (offset, length)
+        self._tail_records += len(records)
+        self._scanned += consumed
+        if (self._covered == 0 or self._tail_records >= MERGE_THRESHOLD
+                or self._scanned - self._covered >= MERGE_TAIL_BYTES):
+            self._merge()
+
+    def _merge(self):
+        """Rewrites the index file with the overlay folded in."""
+        replaced = {email_digest(email): email for email in self._overlay}
+        entries = []
+        for i in range(self._count):
+            digest, offset, length = self._entry(i)
+            if digest in replaced:
+                record = profile_log.decode_record(self._log_map[offset:offset + length])
+                if record and record[0] in self._overlay:
+                    continue  # superseded by a newer record
+            entries.append((digest, offset, length))
+        entries.extend((email_digest(email), offset, length) for email, (offset, length) in self._overlay.items())
+        entries.sort()
+        self._write_index(entries, self._scanned)
+        self._overlay.clear()
+        self._tail_records = 0
+
+    def _write_index(self, entries, covered):
+        check = self._log_map[max(0, covered - profile_log.CHECK_BYTES):covered]
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".profiles-idx-", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self._stamp[0], covered, len(entries), len(check), check))
+                f.writelines(ENTRY.pack(*entry) for entry in entries)
+            if self._index_map is not None:
+                self._index_map.close()
+                self._index_map = None
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with open(self.index_path, 'rb') as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count, self._covered = len(entries), covered
+        self._scanned = max(self._scanned, covered)
+
+    def close(self):
+        """Unmaps both files; the next lookup maps them again."""
+        with self._lock:
+            for m in (self._log_map, self._index_map):
+                if m is not None:
+                    m.close()
+            self._log_map = self._index_map = None
+            self._count = self._covered = self._scanned = self._tail_records = 0
+            self._overlay.clear()
+            self._stamp = None
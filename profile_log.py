@@ -0,0 +1,240 @@
+import os
+import tempfile
+import threading
+import zlib
+
+# profiles.txt as an append-only log. Saving a profile appends one record
+# instead of rewriting the file; the newest record for an email wins. An
+# in-memory index maps each email to the offset and length of its newest
+# record, so a lookup reads only that record.
+#
+# A record is one line in the original profiles.txt format plus a checksum:
+#
+#   email:name|bio|grad_year|major|minor<TAB>crc32 of everything before the tab
+#
+# Lines without a checksum (written before the log existed) are still read.
+# A record is only valid once its newline is on disk and its checksum
+# matches, so a write torn by a crash or a full disk is skipped rather than
+# read as a truncated profile. Compaction rewrites the newest record of each
+# email into a temp file and renames it over the log.
+
+PROFILES_FILE = "profiles.txt"
+PROFILE_FIELDS = ('name', 'bio', 'grad_year', 'major', 'minor')
+COMPACT_INTERVAL = 300.0   # seconds between compaction checks
+COMPACT_RATIO = 2.0        # compact once there are this many records per email
+COMPACT_MIN_RECORDS = 64   # never bother compacting smaller logs
+CHECK_BYTES = 64           # bytes before the read offset compared on refresh
+
+
+def _clean(value):
+    # The separators cannot appear inside a field
+    return str(value).replace('|', '/').replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def encode_record(email, profile):
+    """The bytes of one log record, newline included."""
+    body = f"{_clean(email).replace(':', '')}:" + "|".join(_clean(profile.get(f, '')) for f in PROFILE_FIELDS)
+    body = body.encode('utf-8')
+    return body + b"\t%08x\n" % zlib.crc32(body)
+
+
+def decode_record(line):
+    """(email, profile dict) for a valid record line, otherwise None."""
+    line = line.rstrip(b"\r\n")
+    body, tab, crc = line.partition(b"\t")
+    if tab and crc != b"%08x" % zlib.crc32(body):
+        return None
+    email, colon, data = body.decode('utf-8', errors='replace').partition(':')
+    parts = data.split('|')
+    if not colon or not email.strip() or len(parts) != len(PROFILE_FIELDS):
+        return None
+    return email.strip(), dict(zip(PROFILE_FIELDS, parts))
+
+
+def scan_records(data, base=0):
+    """Finds the valid records among the complete lines of data.
+
+    `base` is the file offset data was read from. Returns a list of
+    (email, offset, length) in file order and the number of bytes up to
+    the last newline; an unterminated tail is left for the next scan.
+    """
+    records = []
+    pos = 0
+    while True:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            break  # unterminated tail: being written, or torn
+        record = decode_record(data[pos:end])
+        if record:
+            records.append((record[0], base + pos, end - pos))
+        pos = end + 1
+    return records, pos
+
+
+class ProfileLog:
+    """Append-only profile store with an in-memory email -> (offset, length) index."""
+
+    def __init__(self, path=PROFILES_FILE):
+        self.path = path
+        self.index = {}
+        self.records = 0      # valid records in the file, superseded ones included
+        self._stamp = None    # (inode, size, mtime) the index was built from
+        self._offset = 0      # bytes of the file indexed so far
+        self._check = b""     # the CHECK_BYTES before _offset
+        self._lock = threading.RLock()
+        # Called before the file is replaced, so readers holding it open or
+        # mapped (profile_index.py) can let go; Windows refuses the rename otherwise
+        self.before_replace = []
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def refresh(self):
+        """Indexes records appended since the last call; rebuilds if the file was replaced."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return
+            if stamp is None or not self._appended_only(stamp):
+                self.index.clear()
+                self.records, self._offset, self._check = 0, 0, b""
+            if stamp is not None:
+                with open(self.path, 'rb') as f:
+                    f.seek(self._offset)
+                    self._scan(f.read())
+            self._stamp = stamp
+
+    def _appended_only(self, stamp):
+        if self._stamp is None or stamp[0] != self._stamp[0] or stamp[1] < self._offset:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset - len(self._check))
+            return f.read(len(self._check)) == self._check
+
+    def _scan(self, data):
+        """Indexes the complete lines of data, which starts at _offset."""
+        records, consumed = scan_records(data, self._offset)
+        for email, offset, length in records:
+            self.index[email] = (offset, length)
+        self.records += len(records)
+        self._offset += consumed
+        self._check = (self._check + data[:consumed])[-CHECK_BYTES:]
+
+    def _read(self, offset, length):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def get(self, email):
+        """The newest profile saved for email, or None."""
+        with self._lock:
+            self.refresh()
+            location = self.index.get(email)
+            if location is None:
+                return None
+            record = decode_record(self._read(*location))
+            return record[1] if record else None
+
+    def __contains__(self, email):
+        with self._lock:
+            self.refresh()
+            return email in self.index
+
+    def load_all(self):
+        """Every profile as {email: profile}, in one pass over the file."""
+        with self._lock:
+            self.refresh()
+            profiles = {}
+            if self._stamp is None:
+                return profiles
+            with open(self.path, 'rb') as f:
+                data = f.read(self._offset)
+            for email, (offset, length) in self.index.items():
+                record = decode_record(data[offset:offset + length])
+                if record:
+                    profiles[email] = record[1]
+            return profiles
+
+    def put(self, email, profile):
+        """Appends one record for email. Costs the same however many users there are."""
+        record = encode_record(email, profile)
+        with self._lock:
+            self.refresh()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != self._offset:
+                    # A torn record at the end: start on a fresh line so it stays a
+                    # single unreadable line instead of swallowing this one
+                    record = b"\n" + record
+                os.write(fd, record)
+            finally:
+                os.close(fd)
+            self.refresh()
+
+    def needs_compaction(self):
+        with self._lock:
+            self.refresh()
+            return self.records >= COMPACT_MIN_RECORDS and self.records > len(self.index) * COMPACT_RATIO
+
+    def rewrite(self, profiles):
+        """Atomically replaces the log with one record per profile."""
+        with self._lock:
+            self._replace(profiles, expected=None)
+
+    def compact(self):
+        """Rewrites the log keeping only the newest record per email. Returns True if it did.
+
+        Gives up, to try again later, if the file changes while the copy is
+        being written.
+        """
+        with self._lock:
+            self.refresh()
+            if self._stamp is None:
+                return False
+            return self._replace(self.load_all(), expected=self._stamp)
+
+    def _replace(self, profiles, expected):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".profiles-", dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.writelines(encode_record(email, profile) for email, profile in profiles.items())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)  # mkstemp creates it private
+            if expected is not None and self._stat() != expected:
+                os.remove(tmp_path)
+                return False
+            for callback in self.before_replace:
+                callback()
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._stamp = None
+        self.refresh()
+        return True
+
+
+def start_compaction_thread(log, interval=COMPACT_INTERVAL):
+    """Compacts the log on a daemon thread whenever superseded records pile up.
+
+    Returns the threading.Event that stops the loop when set.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                if log.needs_compaction():
+                    log.compact()
+            except OSError as e:
+                print(f"Profile log compaction error: {e}")
+
+    threading.Thread(target=run, name="profile-compaction", daemon=True).start()
+    return stop_event
@@ -0,0 +1,370 @@
+import atexit
+import collections
+import collections.abc
+import contextlib
+import contextvars
+import functools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Query timing for the apps' database code. connect() replaces
+# sqlite3.connect in get_conn/get_db_connection; while instrumentation is on
+# it returns a connection whose cursors time every statement with
+# time.perf_counter_ns. The time spent fetching the rows counts too, since
+# for a SELECT that is where SQLite does most of the work. A statement is
+# finished when its rows run out, when the cursor runs the next statement, or
+# when the connection is closed. Commits are timed as "COMMIT", including the
+# ones a `with conn:` block makes on the way out.
+#
+# Each statement is charged to the UI action that caused it. The GUI wraps
+# its handlers in action("react") (or the tagged("react") decorator), and an
+# action started inside another one is recorded under both names, e.g.
+# "react/refresh_feed". Statements outside any action go under "-".
+#
+# Per action there are invocation and statement counts and a latency
+# histogram with power-of-two microsecond buckets, plus totals per SQL text.
+# Statements slower than the threshold go to the slow-query log with their
+# EXPLAIN QUERY PLAN. Bound parameters are logged as type and length only
+# (str(12), bytes(4096)), like the action trace, so the log never holds
+# passwords, post text or attachments.
+#
+# Turned on by enable() or the SOCIAL_QUERY_STATS environment variable (the
+# slow threshold in ms, or 1 for the default), which also prints report()
+# at exit. While off, connect() is plain sqlite3.connect and action() only
+# checks a flag.
+
+STATS_ENV = "SOCIAL_QUERY_STATS"
+SLOW_QUERY_MS = 50
+SLOW_LOG_FILE = "slow_queries.log"
+SLOW_KEEP = 200           # slow queries kept in memory for slow_queries()
+UNTAGGED = "-"
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+_enabled = False
+_slow_ns = SLOW_QUERY_MS * 1_000_000
+_slow_log = SLOW_LOG_FILE
+_current = contextvars.ContextVar("query_stats_action", default=UNTAGGED)
+_lock = threading.Lock()
+_actions = {}             # action -> ActionStats
+_statements = {}          # sql -> [count, total ns, max ns]
+_slow = collections.deque(maxlen=SLOW_KEEP)
+
+
+class ActionStats:
+    """Counts and a latency histogram of the statements of one action."""
+
+    def __init__(self):
+        self.invocations = 0
+        self.queries = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = collections.Counter()   # bit length of the time in us -> statements
+
+    def add(self, elapsed_ns):
+        self.queries += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        self.buckets[(elapsed_ns // 1000).bit_length()] += 1
+
+    def percentile_us(self, q):
+        """Upper bound of the bucket holding the q-quantile, in microseconds."""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q * self.queries:
+                return 2 ** bucket
+        return 0
+
+    def histogram(self):
+        """[(bucket upper bound in us, statements)] in bucket order."""
+        return [(2 ** bucket, n) for bucket, n in sorted(self.buckets.items())]
+
+
+def _stats(action):
+    stats = _actions.get(action)
+    if stats is None:
+        stats = _actions[action] = ActionStats()
+    return stats
+
+
+def normalize(sql):
+    """sql on one line, with IN lists of any length written as "?,...", so they count as one statement."""
+    return PLACEHOLDER_LIST.sub("?,...", " ".join(sql.split()))
+
+
+def _record(conn, sql, params, elapsed_ns, action):
+    with _lock:
+        _stats(action).add(elapsed_ns)
+        entry = _statements.setdefault(normalize(sql), [0, 0, 0])
+        entry[0] += 1
+        entry[1] += elapsed_ns
+        entry[2] = max(entry[2], elapsed_ns)
+    if elapsed_ns >= _slow_ns:
+        _log_slow(conn, sql, params, elapsed_ns, action)
+
+
+def describe_params(params):
+    """The types and lengths of bound parameters, without their values."""
+    def describe(value):
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            return f"{type(value).__name__}({len(value)})"
+        return type(value).__name__
+    if params is None:
+        return "()"
+    if isinstance(params, collections.abc.Mapping):
+        return "{" + ", ".join(f"{name}: {describe(value)}" for name, value in params.items()) + "}"
+    return "(" + ", ".join(describe(value) for value in params) + ")"
+
+
+def _log_slow(conn, sql, params, elapsed_ns, action):
+    plan = []
+    if sql.lstrip().upper().startswith(EXPLAINABLE):
+        try:
+            # The base class execute, so the EXPLAIN itself is not timed
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+            plan = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+    entry = {'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'action': action, 'ms': elapsed_ns / 1e6,
+             'sql': normalize(sql), 'params': describe_params(params), 'plan': plan}
+    with _lock:
+        _slow.append(entry)
+    if _slow_log:
+        with open(_slow_log, "a", encoding="utf-8") as f:
+            f.write(f"{entry['time']} [{action}] {entry['ms']:.1f} ms  {entry['sql']}  params={entry['params']}\n")
+            for line in plan:
+                f.write(f"    plan: {line}\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that times each statement from execute to its last fetch."""
+
+    _pending = None   # [sql, params, ns so far, action] of the statement being read
+
+    def _begin(self, sql, params, started):
+        self._pending = [sql, params, time.perf_counter_ns() - started, _current.get()]
+        self.connection._open_cursors.add(self)
+
+    def _add(self, started, done=False):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter_ns() - started
+            if done:
+                self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self.connection._open_cursors.discard(self)
+            _record(self.connection, pending[0], pending[1], pending[2], pending[3])
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter_ns()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, parameters, started)
+            if self.description is None:
+                # No rows to read: INSERT, UPDATE, DDL
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        started = time.perf_counter_ns()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, None, started)
+            self._finish()
+
+    def executescript(self, sql_script):
+        self._finish()
+        started = time.perf_counter_ns()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._begin(sql_script, None, started)
+            self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter_ns()
+        row = super().fetchone()
+        self._add(started, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter_ns()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add(started, done=not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter_ns()
+        rows = super().fetchall()
+        self._add(started, done=True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter_ns()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(started, done=True)
+            raise
+        self._add(started)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose statements and commits are timed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._open_cursors = set()
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # The base class versions make plain cursors
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        started = time.perf_counter_ns()
+        try:
+            super().commit()
+        finally:
+            _record(self, "COMMIT", None, time.perf_counter_ns() - started, _current.get())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The base class commits in C without going through commit() above
+        if exc_type is not None:
+            return super().__exit__(exc_type, exc_value, traceback)
+        started = time.perf_counter_ns()
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            _record(self, "COMMIT", None, time.perf_counter_ns() - started, _current.get())
+
+    def close(self):
+        for cursor in list(self._open_cursors):
+            cursor._finish()
+        super().close()
+
+
+def connect(database, **kwargs):
+    """sqlite3.connect, with timed statements while instrumentation is on."""
+    if not _enabled:
+        return sqlite3.connect(database, **kwargs)
+    return sqlite3.connect(database, factory=InstrumentedConnection, **kwargs)
+
+
+@contextlib.contextmanager
+def action(name):
+    """Charges the statements run inside the block to UI action `name`."""
+    if not _enabled:
+        yield
+        return
+    parent = _current.get()
+    path = name if parent == UNTAGGED else f"{parent}/{name}"
+    with _lock:
+        _stats(path).invocations += 1
+    token = _current.set(path)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def tagged(name):
+    """Decorator form of action(name)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with action(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(slow_ms=SLOW_QUERY_MS, slow_log=SLOW_LOG_FILE):
+    """Turns instrumentation on for connections opened from now on. slow_log=None keeps slow queries in memory only."""
+    global _enabled, _slow_ns, _slow_log
+    _slow_ns = int(slow_ms * 1_000_000)
+    _slow_log = slow_log
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _actions.clear()
+        _statements.clear()
+        _slow.clear()
+
+
+def snapshot():
+    """The statistics so far as plain data."""
+    with _lock:
+        return {
+            'actions': {name: {'invocations': s.invocations, 'queries': s.queries, 'total_ms': s.total_ns / 1e6,
+                               'max_ms': s.max_ns / 1e6, 'p50_us': s.percentile_us(0.5),
+                               'p95_us': s.percentile_us(0.95), 'histogram_us': s.histogram()}
+                        for name, s in _actions.items()},
+            'statements': {sql: {'count': n, 'total_ms': total / 1e6, 'max_ms': worst / 1e6}
+                           for sql, (n, total, worst) in _statements.items()},
+        }
+
+
+def slow_queries():
+    """The most recent slow queries, oldest first."""
+    with _lock:
+        return list(_slow)
+
+
+def report(top=10):
+    """A text summary: per action statements and latency, then the costliest SQL."""
+    data = snapshot()
+    lines = [f"{'action':<32} {'calls':>6} {'queries':>8} {'q/call':>7} {'total ms':>10} {'p50 us':>8} "
+             f"{'p95 us':>8} {'max ms':>8}"]
+    for name, s in sorted(data['actions'].items(), key=lambda item: -item[1]['total_ms']):
+        per_call = s['queries'] / s['invocations'] if s['invocations'] else 0
+        lines.append(f"{name:<32} {s['invocations']:6d} {s['queries']:8d} {per_call:7.1f} {s['total_ms']:10.1f} "
+                     f"{s['p50_us']:8d} {s['p95_us']:8d} {s['max_ms']:8.1f}")
+    lines.append("")
+    lines.append(f"{'count':>7} {'total ms':>10} {'max ms':>8}  statement")
+    ranked = sorted(data['statements'].items(), key=lambda item: -item[1]['total_ms'])
+    for sql, s in ranked[:top]:
+        lines.append(f"{s['count']:7d} {s['total_ms']:10.1f} {s['max_ms']:8.1f}  {sql[:100]}")
+    return "\n".join(lines)
+
+
+def _enable_from_env():
+    setting = os.environ.get(STATS_ENV)
+    if not setting:
+        return
+    enable(SLOW_QUERY_MS if setting == "1" else float(setting))
+    atexit.register(lambda: print(report(), file=sys.stderr))
+
+
+_enable_from_env()
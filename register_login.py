@@ -4,16 +4,15 @@ import re
 from tkinter import *
 from tkinter import messagebox
 import user_management  # DO NOT CHANGE
+import credential_store
 
 
 def show_(m, p, w):
     mail = m.get()
     password = p.get()
-    with open("credentials.txt", "a") as f:
-        f.write(mail+','+password+'\n')
-        f.close()
-        messagebox.showinfo(
-            "User Created", f"User : {mail} Created successfully!!!")
+    credentials.add(mail, password)
+    messagebox.showinfo(
+        "User Created", f"User : {mail} Created successfully!!!")
     w.destroy()
 
 
@@ -40,7 +39,10 @@ def new_user():
 # command=lambda : btn1click()
 
 
-loginCredentials = {}
+# Parsed once; try_login only re-reads credentials.txt after it changes.
+# loginCredentials is the store's own dict, so it is always current.
+credentials = credential_store.get_store("credentials.txt")
+loginCredentials = credentials.credentials
 
 # funtions
 
@@ -123,33 +125,36 @@ def admin_window():
 
 
 def try_login():
-    loginCredentials.clear()  # reset before loading
-
-    # load all users from text file
-    with open("credentials.txt", 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:  # ignore empty lines
-                email, password = line.split(",")
-                loginCredentials[email.strip()] = password.strip()
-
-    print("Loaded credentials:", loginCredentials)
+    credentials.refresh()  # picks up new registrations and password changes
 
     # get input values
     email = loginInput.get().strip()
     password = PasswordInput.get().strip()
 
-    # check user exists
+    # check user exists; accounts moved to the database are read through,
+    # with the password hash checked off the Tk thread
     if email in loginCredentials:
-        if loginCredentials[email] == password:
-            messagebox.showinfo("Login Successful", f"Welcome {email}!")
-            # Open dashbard when login is successfull
-            user_management.show_dashboard(
-                root, loginInput.get(), loginCredentials)
-
-        else:
-            messagebox.showerror("Login Failed", "Wrong password")
-            PasswordInput.delete(0, tk.END)
+        finish_login(email, loginCredentials[email] == password)
+    else:
+        btn.config(state="disabled")
+
+        def done(correct):
+            btn.config(state="normal")
+            finish_login(email, correct)
+
+        user_management.check_database_login_later(root, email, password, done)
+
+
+def finish_login(email, correct):
+    if correct:
+        messagebox.showinfo("Login Successful", f"Welcome {email}!")
+        # Open dashbard when login is successfull
+        user_management.show_dashboard(
+            root, loginInput.get(), loginCredentials)
+
+    elif correct is False:
+        messagebox.showerror("Login Failed", "Wrong password")
+        PasswordInput.delete(0, tk.END)
     else:
         messagebox.showerror("Login Failed", "User not found")
         loginInput.delete(0, tk.END)
@@ -185,5 +190,6 @@ btn = tk.Button(root, text="LOGIN", command=try_login,
                 width=15, height=1, padx=3, pady=3)
 btn.grid(row=6, column=0, columnspan=2)
 user_management.show_login_screen(root, loginCredentials)  # DO NOT CHANGE
+credential_store.start_compaction_thread(credentials)
 
 root.mainloop()
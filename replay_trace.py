@@ -0,0 +1,269 @@
+"""Replay an action trace recorded by the Tk apps against copies of their databases.
+
+Run posts.py or ddcsocial_media_app.py with SOCIAL_TRACE=<file> set and
+every user action is appended to that file (see action_trace.py). This tool
+copies the databases the trace touches into a scratch directory and performs
+each recorded action again through the same functions the GUI calls, minus
+the widgets. A feed refresh is recorded as its own action, so it is replayed
+as often as it happened.
+
+--speed 1 keeps the recorded gaps between actions, 2 replays twice as fast
+and 0 runs the actions back to back. With --parallel N the sessions are
+spread over N processes, so concurrent users stay concurrent. Otherwise one
+process replays everything in timestamp order.
+
+Typed text is replayed as filler of the recorded length and attachments are
+not replayed. Filler search terms and admin filters rarely match anyone, so
+those replay the cost of the lookup, not of a long result. Usernames must be
+unique, so a posts.py registration uses the account email as the username. Logins to ddcsocial_media_app.py replay the account lookup but
+not the password check, because passwords are not recorded. Actions without
+a replay (save_profile) are counted as skipped.
+
+    SOCIAL_TRACE=trace.jsonl python posts.py
+    python replay_trace.py trace.jsonl --speed 0 --parallel 4
+    python replay_trace.py trace.jsonl --posts-db snapshot.db --speed 1 --keep /tmp/replayed
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import action_trace
+import ddcsocial_media_app
+import posts
+
+REPLAYED_PASSWORD = "replayed-password"
+
+
+# --- posts.py actions ---
+
+def posts_user_id(ctx, email):
+    """Id of the posts.py user with email, cached per worker."""
+    if email is None:
+        return None
+    ids = ctx.setdefault('user_ids', {})
+    if email not in ids:
+        user = posts.get_user_by_email(email)
+        ids[email] = user['id'] if user else None
+    return ids[email]
+
+
+def posts_login(ctx, user, params):
+    found = posts.get_user_by_email(user)
+    if found:
+        posts.count_followers(found['id'])
+        posts.count_following(found['id'])
+
+
+def posts_follow(ctx, user, params, follow=True):
+    me = posts_user_id(ctx, user)
+    if follow:
+        posts.follow_user(me, params['user_id'])
+    else:
+        posts.unfollow_user(me, params['user_id'])
+    posts.count_followers(me)
+    posts.count_following(me)
+
+
+def posts_thread(ctx, user, params):
+    thread = posts.get_comment_thread(params['post_id'])
+    posts.get_reply_counts([c['id'] for c in thread])
+
+
+def filler(length):
+    return "x" * max(1, length)
+
+
+# --- ddcsocial_media_app.py actions ---
+
+def accounts_register(ctx, user, params):
+    # register_user_db shows a message box for an existing email
+    if ddcsocial_media_app.get_user_data(user) is None:
+        ddcsocial_media_app.register_user_db(user, REPLAYED_PASSWORD, filler(params.get('name_len', 0)))
+
+
+def accounts_users_page(ctx, user, params):
+    sort_by = params.get('sort_by') or 'email'
+    after = None
+    if params.get('after_id') is not None:
+        # Only the id of the last row shown is recorded; its sort value (an
+        # email, name or date) is read back from the copied database
+        conn = sqlite3.connect(ddcsocial_media_app.DB_NAME)
+        try:
+            row = conn.execute(f"SELECT {ddcsocial_media_app.USER_SORT_KEYS[sort_by]} FROM users WHERE id = ?",
+                               (params['after_id'],)).fetchone()
+        finally:
+            conn.close()
+        if row is not None:
+            after = (row[0], params['after_id'])
+    ddcsocial_media_app.get_users_page(sort_by, params.get('descending', False), after,
+                                       filler(params['prefix_len']) if params.get('prefix_len') else '',
+                                       include_inactive=params.get('include_inactive', False))
+
+
+HANDLERS = {
+    ('posts', 'register'): lambda ctx, user, p: posts.create_user(user, user),
+    ('posts', 'login'): posts_login,
+    ('posts', 'refresh_feed'): lambda ctx, user, p: posts.load_feed(posts_user_id(ctx, user)),
+    ('posts', 'post'): lambda ctx, user, p: posts.create_post(posts_user_id(ctx, user), filler(p['content_len'])),
+    ('posts', 'react'): lambda ctx, user, p: posts.set_reaction(p['post_id'], posts_user_id(ctx, user), p['reaction']),
+    ('posts', 'comment'): lambda ctx, user, p: posts.add_comment(p['post_id'], user, filler(p['text_len']),
+                                                                 parent_id=p.get('parent_id')),
+    ('posts', 'thread'): posts_thread,
+    ('posts', 'more_comments'): lambda ctx, user, p: posts.get_comments_page(p['post_id'], before_id=p['before_id']),
+    ('posts', 'delete_post'): lambda ctx, user, p: posts.delete_post(p['post_id'], posts_user_id(ctx, user)),
+    ('posts', 'edit_post'): lambda ctx, user, p: posts.update_post(p['post_id'], filler(p['text_len'])),
+    ('posts', 'follow'): posts_follow,
+    ('posts', 'unfollow'): lambda ctx, user, p: posts_follow(ctx, user, p, follow=False),
+    ('accounts', 'login'): lambda ctx, user, p: ddcsocial_media_app.get_user_data(user),
+    ('accounts', 'register'): accounts_register,
+    ('accounts', 'search'): lambda ctx, user, p: ddcsocial_media_app.find_students(filler(p['term_len']), user),
+    ('accounts', 'view_profile'): lambda ctx, user, p: ddcsocial_media_app.get_user_data(user),
+    ('accounts', 'admin_users_page'): accounts_users_page,
+}
+
+
+# --- Replay ---
+
+def copy_database(source, target):
+    """Copies a database with the backup API, so a live database gives a consistent copy."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def replay(records, databases, speed, t0, start_at):
+    """Replays records (in timestamp order) and returns their timings.
+
+    t0 is the first timestamp of the whole trace and start_at the wall clock
+    time it maps to, so parallel workers stay on one schedule.
+    """
+    posts.DB_FILE = databases['posts']
+    ddcsocial_media_app.DB_NAME = databases['accounts']
+    ctx = {}
+    samples, errors, skipped, lags = {}, {}, {}, []
+    for rec in records:
+        key = f"{rec['app']}.{rec['action']}"
+        handler = HANDLERS.get((rec['app'], rec['action']))
+        if handler is None:
+            skipped[key] = skipped.get(key, 0) + 1
+            continue
+        if speed:
+            due = start_at + (rec['ts'] - t0) / speed
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                lags.append(-wait)
+        start = time.perf_counter()
+        try:
+            handler(ctx, rec.get('user'), rec.get('params') or {})
+        except (sqlite3.Error, KeyError, TypeError) as e:
+            errors.setdefault(key, {})
+            errors[key][type(e).__name__] = errors[key].get(type(e).__name__, 0) + 1
+            continue
+        samples.setdefault(key, []).append(time.perf_counter() - start)
+    return {'samples': samples, 'errors': errors, 'skipped': skipped, 'lags': lags}
+
+
+def split_sessions(records, parallel):
+    """Deals whole sessions out to `parallel` workers, keeping each worker's records in time order."""
+    sessions = {}
+    for rec in records:
+        sessions.setdefault(rec.get('session'), []).append(rec)
+    ordered = sorted(sessions.values(), key=lambda recs: recs[0]['ts'])
+    shares = [[] for _ in range(parallel)]
+    for i, recs in enumerate(ordered):
+        shares[i % parallel].extend(recs)
+    return [sorted(share, key=lambda rec: rec['ts']) for share in shares if share]
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(results, elapsed):
+    merged = {'samples': {}, 'errors': {}, 'skipped': {}, 'lags': []}
+    for r in results:
+        for key, values in r['samples'].items():
+            merged['samples'].setdefault(key, []).extend(values)
+        for key, kinds in r['errors'].items():
+            for kind, n in kinds.items():
+                merged['errors'].setdefault(key, {})
+                merged['errors'][key][kind] = merged['errors'][key].get(kind, 0) + n
+        for key, n in r['skipped'].items():
+            merged['skipped'][key] = merged['skipped'].get(key, 0) + n
+        merged['lags'].extend(r['lags'])
+
+    print(f"{'action':<26} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>8}")
+    keys = sorted(merged['samples'].keys() | merged['errors'].keys())
+    for key in keys:
+        ordered = sorted(merged['samples'].get(key, [])) or [0.0]
+        failed = sum(merged['errors'].get(key, {}).values())
+        print(f"{key:<26} {len(merged['samples'].get(key, [])):7d} {failed:7d} {percentile(ordered, 0.5) * 1000:9.2f} "
+              f"{percentile(ordered, 0.95) * 1000:9.2f} {percentile(ordered, 0.99) * 1000:9.2f} {sum(ordered):8.2f}")
+    for key, kinds in sorted(merged['errors'].items()):
+        print(f"  errors in {key}: " + ", ".join(f"{kind} x{n}" for kind, n in kinds.items()))
+    for key, n in sorted(merged['skipped'].items()):
+        print(f"  skipped {n} x {key} (no replay)")
+    done = sum(len(v) for v in merged['samples'].values())
+    line = f"Replayed {done} actions in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f}/s)"
+    if merged['lags']:
+        lags = sorted(merged['lags'])
+        line += f"; behind schedule for {len(lags)} actions, p95 {percentile(lags, 0.95) * 1000:.0f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="JSONL trace written with SOCIAL_TRACE set")
+    parser.add_argument("--posts-db", default=posts.DB_FILE, help="posts.py database to copy")
+    parser.add_argument("--accounts-db", default=ddcsocial_media_app.DB_NAME,
+                        help="ddcsocial_media_app.py database to copy")
+    parser.add_argument("--speed", type=float, default=0.0, help="1: recorded pace, 2: twice as fast, 0: no waiting")
+    parser.add_argument("--parallel", type=int, default=1, help="processes; sessions are spread over them")
+    parser.add_argument("--keep", help="directory to leave the replayed database copies in")
+    args = parser.parse_args()
+
+    records = sorted(action_trace.read_trace(args.trace), key=lambda rec: rec['ts'])
+    if not records:
+        parser.error(f"{args.trace} holds no records")
+    apps = {rec['app'] for rec in records}
+    print(f"{len(records)} actions, {len({rec.get('session') for rec in records})} sessions, "
+          f"{records[-1]['ts'] - records[0]['ts']:.1f}s recorded")
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="replay-")
+    os.makedirs(workdir, exist_ok=True)
+    databases = {}
+    try:
+        for app, source in (('posts', args.posts_db), ('accounts', args.accounts_db)):
+            databases[app] = os.path.join(workdir, os.path.basename(source))
+            if app in apps:
+                if not os.path.exists(source):
+                    parser.error(f"the trace uses {app} but {source} does not exist")
+                copy_database(source, databases[app])
+
+        # A second for the worker processes to start before the schedule begins
+        start_at = time.time() + (1.0 if args.parallel > 1 else 0.0)
+        if args.parallel > 1:
+            with ProcessPoolExecutor(max_workers=args.parallel) as pool:
+                futures = [pool.submit(replay, share, databases, args.speed, records[0]['ts'], start_at)
+                           for share in split_sessions(records, args.parallel)]
+                results = [f.result() for f in futures]
+        else:
+            results = [replay(records, databases, args.speed, records[0]['ts'], start_at)]
+        report(results, time.time() - start_at)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
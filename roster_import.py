@@ -0,0 +1,240 @@
+"""Bulk import of a student roster into the users table of social_media.db.
+
+The roster is a CSV file with a header row, or a JSON Lines file, with the
+fields email, name, password and optionally grad_year, major and bio. Rows
+are streamed: they are validated in batches, their passwords are hashed on a
+process pool, and they are inserted with executemany, many batches per
+transaction. Bad rows are reported and skipped; they never abort the import.
+
+    python roster_import.py roster.csv --db social_media.db --errors bad_rows.csv
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import password_hashing
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,4}$')
+MIN_PASSWORD_LENGTH = 6
+BATCH_SIZE = 5000            # rows validated, hashed and inserted together
+HASH_TASK_SIZE = 250         # passwords per process pool task
+BATCHES_PER_TRANSACTION = 10
+OPTIONAL_FIELDS = ("name", "bio", "grad_year", "major")
+INSERT_USER = """
+    INSERT INTO users (email, password_hash, name, bio, role, grad_year, major)
+    VALUES (?, ?, ?, ?, 'user', ?, ?)
+"""
+
+
+class ImportReport:
+    """Counts, bad rows and timing of one roster import."""
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.bad_rows = []   # (line number, email, reason)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, line_no, email, reason):
+        self.bad_rows.append((line_no, email, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"Read {self.read} rows, imported {self.imported}, rejected {len(self.bad_rows)} "
+                f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+def read_roster(path):
+    """Yields (line number, row dict) from a CSV or JSONL roster, one at a time."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                yield line_no, row if isinstance(row, dict) else None
+        else:
+            # Line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+
+
+def validate_batch(conn, batch, seen, report):
+    """Returns the rows of a batch that can be inserted, reporting the others.
+
+    `seen` holds every email accepted so far, so duplicates within the
+    roster are caught too. Emails already in the database are looked up
+    with one query per batch.
+    """
+    candidates = []
+    for line_no, row in batch:
+        if not isinstance(row, dict):
+            report.reject(line_no, "", "unreadable row")
+            continue
+        # JSON rows can hold numbers, lists or objects where text belongs
+        email = row.get("email") or ""
+        password = row.get("password") or ""
+        if not isinstance(email, str):
+            report.reject(line_no, "", "email is not text")
+            continue
+        email = email.strip()
+        wrong_type = [field for field in OPTIONAL_FIELDS
+                      if not isinstance(row.get(field), (str, int, float, type(None)))]
+        if not isinstance(password, str):
+            report.reject(line_no, email, "password is not text")
+        elif wrong_type:
+            report.reject(line_no, email, f"{wrong_type[0]} is not text or a number")
+        elif not EMAIL_PATTERN.match(email):
+            report.reject(line_no, email, "invalid email")
+        elif len(password) < MIN_PASSWORD_LENGTH:
+            report.reject(line_no, email, f"password shorter than {MIN_PASSWORD_LENGTH} characters")
+        elif email in seen:
+            report.reject(line_no, email, "duplicate email in roster")
+        else:
+            seen.add(email)
+            candidates.append((line_no, email, row))
+
+    existing = set()
+    emails = [email for _, email, _ in candidates]
+    for start in range(0, len(emails), 500):
+        chunk = emails[start:start + 500]
+        cursor = conn.execute(f"SELECT email FROM users WHERE email IN ({','.join('?' * len(chunk))})", chunk)
+        existing.update(r[0] for r in cursor)
+
+    valid = []
+    for line_no, email, row in candidates:
+        if email in existing:
+            report.reject(line_no, email, "email already registered")
+        else:
+            valid.append((line_no, email, row))
+    return valid
+
+
+def _hash_many(passwords, scheme, cost):
+    # Runs in a worker process
+    return [password_hashing.hash_password(p, scheme, cost) for p in passwords]
+
+
+def _submit_hashing(pool, valid, scheme, cost):
+    passwords = [row["password"] for _, _, row in valid]
+    return [pool.submit(_hash_many, passwords[i:i + HASH_TASK_SIZE], scheme, cost)
+            for i in range(0, len(passwords), HASH_TASK_SIZE)]
+
+
+def _insert(conn, valid, futures, report):
+    """Inserts a validated batch and returns the number of rows inserted.
+
+    An email registered after the batch was validated makes executemany
+    fail. The batch is then rolled back to its savepoint and inserted row
+    by row, and the rows that collide are reported.
+    """
+    hashes = [h for future in futures for h in future.result()]
+    params = [(line_no, email, (email, pw_hash, row.get("name") or "",
+                                row.get("bio") or f"New user {row.get('name') or ''}",
+                                row.get("grad_year") or None, row.get("major") or None))
+              for (line_no, email, row), pw_hash in zip(valid, hashes)]
+    if not conn.in_transaction:
+        # Otherwise releasing the savepoint would commit
+        conn.execute("BEGIN")
+    conn.execute("SAVEPOINT roster_batch")
+    try:
+        conn.executemany(INSERT_USER, [p for _, _, p in params])
+        inserted = len(params)
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO roster_batch")
+        inserted = 0
+        for line_no, email, p in params:
+            try:
+                conn.execute(INSERT_USER, p)
+                inserted += 1
+            except sqlite3.IntegrityError:
+                report.reject(line_no, email, "email already registered")
+    conn.execute("RELEASE roster_batch")
+    return inserted
+
+
+def import_roster(path, db_file, workers=None, scheme=None, cost=None, batch_size=BATCH_SIZE):
+    """Imports a roster file into db_file and returns an ImportReport.
+
+    `scheme` and `cost` default to the current settings in
+    password_hashing.py. A cheaper cost imports faster; those hashes are
+    upgraded to the current cost the first time each student logs in.
+    """
+    report = ImportReport()
+    conn = sqlite3.connect(db_file, timeout=30)
+    rows = read_roster(path)
+    seen = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Hash batch N+1 on the pool while batch N is being inserted
+            pending = None
+            batches_in_transaction = 0
+            while True:
+                batch = list(islice(rows, batch_size))
+                report.read += len(batch)
+                valid = validate_batch(conn, batch, seen, report) if batch else []
+                futures = _submit_hashing(pool, valid, scheme, cost) if valid else None
+                if pending:
+                    report.imported += _insert(conn, *pending, report)
+                    batches_in_transaction += 1
+                    if batches_in_transaction >= BATCHES_PER_TRANSACTION:
+                        conn.commit()
+                        batches_in_transaction = 0
+                pending = (valid, futures) if valid else None
+                if not batch:
+                    break
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def write_bad_rows(report, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["line", "email", "reason"])
+        writer.writerows(report.bad_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a student roster (CSV or JSONL) into the users table.")
+    parser.add_argument("roster", help="roster file (.csv, or .jsonl for JSON Lines)")
+    parser.add_argument("--db", default="social_media.db", help="database file (default: social_media.db)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="PBKDF2 iterations for imported hashes (default: the login cost; "
+                             "cheaper hashes are upgraded at first login)")
+    parser.add_argument("--errors", help="write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    cost = (args.iterations,) if args.iterations else None
+    scheme = "pbkdf2_sha256" if args.iterations else None
+    report = import_roster(args.roster, args.db, workers=args.workers, scheme=scheme, cost=cost)
+    print(report.summary())
+    for line_no, email, reason in report.bad_rows[:20]:
+        print(f"  line {line_no}: {email or '?'}: {reason}")
+    if len(report.bad_rows) > 20:
+        print(f"  ... and {len(report.bad_rows) - 20} more")
+    if args.errors:
+        write_bad_rows(report, args.errors)
+
+
+if __name__ == "__main__":
+    main()
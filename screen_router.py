@@ -0,0 +1,70 @@
+import tkinter as tk
+
+# Full-window screens that are built once and then kept. Each screen lives in
+# its own frame, stacked in one grid cell of a container that fills the
+# window; showing a screen raises its frame (tkraise, as in nav_bar.py) and
+# calls its refresh function, which only updates the data on it.
+#
+# A screen is registered by the first show(): build(frame) lays out the
+# widgets and returns refresh(*args), the part that runs on every visit.
+# Screens stay cached until reset(), which logout uses so nothing of one
+# user's screens survives into the next login.
+
+
+class ScreenRouter:
+    """Shows cached screens in one window."""
+
+    def __init__(self, root):
+        self.root = root
+        self.container = tk.Frame(root)
+        self.container.pack(fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+        self.screens = {}   # name -> (frame, refresh)
+        self.current = None
+        self.builds = 0     # screens built, for benchmarks and sanity checks
+
+    def show(self, name, build, *args):
+        """Raises screen `name`, building it the first time, and refreshes it with args."""
+        entry = self.screens.get(name)
+        if entry is None:
+            frame = tk.Frame(self.container)
+            frame.grid(row=0, column=0, sticky="nsew")
+            entry = self.screens[name] = (frame, build(frame))
+            self.builds += 1
+        frame, refresh = entry
+        frame.tkraise()
+        self.current = name
+        if refresh:
+            refresh(*args)
+        return frame
+
+    def forget(self, name):
+        """Drops one cached screen; it is built again on its next visit."""
+        entry = self.screens.pop(name, None)
+        if entry:
+            entry[0].destroy()
+
+    def reset(self):
+        """Drops every cached screen."""
+        for name in list(self.screens):
+            self.forget(name)
+        self.current = None
+
+
+def get_router(root):
+    """The router of root, made on first use.
+
+    Widgets that other code placed straight on root (a screen not built
+    through the router) are removed first. Toplevel windows are left alone.
+    """
+    router = getattr(root, "_screen_router", None)
+    if router is None or not router.container.winfo_exists():
+        router = None
+    for widget in root.winfo_children():
+        if isinstance(widget, tk.Toplevel) or (router and widget is router.container):
+            continue
+        widget.destroy()
+    if router is None:
+        router = root._screen_router = ScreenRouter(root)
+    return router
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+# The logged-in user, created once at login and kept for the life of the app
+# so screens don't go back to the database for the same row on every
+# navigation. Only edit_profile refreshes it, since nothing else changes the
+# user's own profile while they are logged in.
+#
+# With "keep me signed in" a signed token is written to SESSION_FILE:
+#
+#   <base64 payload>.<hex HMAC-SHA256 of the payload>
+#
+# The payload holds the user id and an expiry time. The HMAC key lives in
+# SESSION_KEY_FILE and never leaves this machine, so a token cannot be forged
+# or edited to point at another account.
+
+SESSION_FILE = '.session'
+SESSION_KEY_FILE = '.session_key'
+SESSION_TTL = 7 * 24 * 3600   # seconds a saved session stays valid
+KEY_BYTES = 32
+
+# Fields of a user row that never go into the session
+PRIVATE_FIELDS = ('password_hash',)
+
+current_session = None
+
+
+class Session:
+    """The logged-in user's id, role and profile."""
+
+    def __init__(self, profile):
+        self.profile = {}
+        self.refresh(profile)
+
+    def refresh(self, profile):
+        """Replaces the cached profile, e.g. after the user saved their changes."""
+        self.profile = {k: v for k, v in dict(profile).items() if k not in PRIVATE_FIELDS}
+
+    @property
+    def user_id(self):
+        return self.profile['id']
+
+    @property
+    def email(self):
+        return self.profile['email']
+
+    @property
+    def role(self):
+        return self.profile.get('role', 'user')
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+def start_session(profile, remember=False):
+    """Makes `profile` the current session, optionally saving a signed token."""
+    global current_session
+    current_session = Session(profile)
+    if remember:
+        save_token(current_session.user_id)
+    return current_session
+
+
+def end_session():
+    """Logs out: forgets the current session and removes any saved token."""
+    global current_session
+    current_session = None
+    try:
+        os.remove(SESSION_FILE)
+    except FileNotFoundError:
+        pass
+
+
+# --- Signed session tokens ---
+
+def _key():
+    try:
+        with open(SESSION_KEY_FILE, 'rb') as f:
+            key = f.read()
+        if len(key) == KEY_BYTES:
+            return key
+    except FileNotFoundError:
+        pass
+    key = os.urandom(KEY_BYTES)
+    fd = os.open(SESSION_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def _sign(payload):
+    return hmac.new(_key(), payload, hashlib.sha256).hexdigest()
+
+
+def make_token(user_id, ttl=SESSION_TTL):
+    payload = base64.urlsafe_b64encode(json.dumps({'uid': user_id, 'exp': int(time.time() + ttl)}).encode())
+    return f"{payload.decode()}.{_sign(payload)}"
+
+
+def read_token(token):
+    """Returns the user id of a valid, unexpired token, otherwise None."""
+    try:
+        payload, signature = token.strip().rsplit('.', 1)
+        if not hmac.compare_digest(signature, _sign(payload.encode())):
+            return None
+        data = json.loads(base64.urlsafe_b64decode(payload))
+        if data['exp'] < time.time():
+            return None
+        return data['uid']
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def save_token(user_id):
+    fd = os.open(SESSION_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(make_token(user_id))
+
+
+def restore_session(load_user):
+    """Resumes a saved session without asking for the password again.
+
+    `load_user(user_id)` returns the profile of an active account or None;
+    a token for a deleted or deactivated account is discarded.
+    """
+    try:
+        with open(SESSION_FILE) as f:
+            user_id = read_token(f.read())
+    except OSError:
+        return None
+    profile = load_user(user_id) if user_id is not None else None
+    if not profile:
+        end_session()
+        return None
+    return start_session(profile)
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import time
+
+import action_trace
+import replay_trace
+
+
+def lines_in(path):
+    return path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+
+
+def test_records_wait_for_a_full_batch(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    writer = action_trace.TraceWriter(str(path), "posts", flush_records=3, flush_seconds=60)
+    try:
+        writer.record("react", "a@dcccd.edu", post_id=1, reaction="like")
+        writer.record("react", "a@dcccd.edu", post_id=2, reaction="like")
+        assert lines_in(path) == []
+        writer.record("refresh_feed", "a@dcccd.edu")
+        records = [json.loads(line) for line in lines_in(path)]
+        assert [r['action'] for r in records] == ["react", "react", "refresh_feed"]
+        assert records[0]['params'] == {"post_id": 1, "reaction": "like"}
+        assert {r['session'] for r in records} == {writer.session}
+    finally:
+        writer.close()
+
+
+def test_an_idle_writer_flushes_on_the_timer(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    writer = action_trace.TraceWriter(str(path), "posts", flush_records=64, flush_seconds=0.05)
+    try:
+        writer.record("login", "a@dcccd.edu")
+        deadline = time.monotonic() + 5
+        while not lines_in(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(lines_in(path)) == 1
+    finally:
+        writer.close()
+
+
+def test_close_writes_what_is_left(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    writer = action_trace.TraceWriter(str(path), "posts", flush_records=64, flush_seconds=60)
+    writer.record("login", "a@dcccd.edu")
+    writer.close()
+    assert len(lines_in(path)) == 1
+    assert writer.closed.is_set()
+
+
+def test_read_trace_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    whole = json.dumps({"ts": 1.0, "session": "s1", "action": "login", "params": {}})
+    path.write_text(whole + "\n\n" + whole[:len(whole) // 2], encoding="utf-8")
+    assert [r['action'] for r in action_trace.read_trace(str(path))] == ["login"]
+
+
+def test_split_sessions_keeps_sessions_whole_and_in_time_order():
+    def rec(session, ts):
+        return {"session": session, "ts": ts, "action": "react", "params": {}}
+
+    records = [rec("b", 2.0), rec("a", 1.0), rec("c", 3.0), rec("a", 4.0), rec("b", 2.5), rec("c", 3.5)]
+    shares = replay_trace.split_sessions(records, 2)
+    assert len(shares) == 2
+    # Sessions are dealt out by first timestamp: a and c to the first worker, b to the second
+    assert [(r['session'], r['ts']) for r in shares[0]] == [("a", 1.0), ("c", 3.0), ("c", 3.5), ("a", 4.0)]
+    assert [(r['session'], r['ts']) for r in shares[1]] == [("b", 2.0), ("b", 2.5)]
+    assert replay_trace.split_sessions(records[:1], 4) == [records[:1]]
+
+
+def test_users_page_replay_reads_the_sort_value_by_id(tmp_path, monkeypatch):
+    db = tmp_path / "accounts.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT, name TEXT, role TEXT, created_at TEXT)")
+    conn.execute("INSERT INTO users (id, email, name) VALUES (7, 'b@dcccd.edu', 'Bea')")
+    conn.commit()
+    conn.close()
+    calls = []
+    monkeypatch.setattr(replay_trace.ddcsocial_media_app, "DB_NAME", str(db))
+    monkeypatch.setattr(replay_trace.ddcsocial_media_app, "get_users_page", lambda *args, **kw: calls.append(args))
+
+    replay_trace.accounts_users_page({}, "admin@dcccd.edu", {"sort_by": "name", "after_id": 7})
+    replay_trace.accounts_users_page({}, "admin@dcccd.edu", {"sort_by": "email", "after_id": None})
+    assert calls == [("name", False, ("Bea", 7), ""), ("email", False, None, "")]
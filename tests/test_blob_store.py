@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+import blob_store
+
+
+@pytest.fixture(params=[True, False], ids=["blobopen", "bound-value"])
+def conn(request, monkeypatch):
+    if request.param and not blob_store.HAS_BLOBOPEN:
+        pytest.skip("Connection.blobopen needs Python 3.11")
+    monkeypatch.setattr(blob_store, "HAS_BLOBOPEN", request.param)
+    monkeypatch.setattr(blob_store, "CHUNK_SIZE", 1000)
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def test_file_round_trip(conn, tmp_path):
+    source = tmp_path / "picture.png"
+    content = bytes(range(256)) * 37
+    source.write_bytes(content)
+
+    key = blob_store.put_file(conn, str(source))
+
+    assert blob_store.put_file(conn, str(source)) == key
+    assert conn.execute("SELECT COUNT(*), size, mime FROM blobs").fetchone() == (1, len(content), "image/png")
+    assert blob_store.read_bytes(conn, key) == content
+    assert [len(c) for c in blob_store.iter_chunks(conn, key, 4096)] == [4096, 4096, 1280]
+    target = tmp_path / "copy.png"
+    blob_store.export_to_file(conn, key, str(target))
+    assert target.read_bytes() == content
+
+
+def test_unknown_key(conn):
+    blob_store.ensure_schema(conn)
+
+    with pytest.raises(KeyError):
+        blob_store.read_bytes(conn, "0" * 64)
+
+
+def test_export_blob_from_a_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "HAS_BLOBOPEN", False)
+    db = str(tmp_path / "blobs.db")
+    source = tmp_path / "avatar.jpg"
+    source.write_bytes(b"jpeg bytes")
+
+    key = blob_store.store_file(db, str(source))
+
+    assert blob_store.export_blob(db, key, str(tmp_path / "out.jpg")) == str(tmp_path / "out.jpg")
+    assert blob_store.export_blob(db, "missing", str(tmp_path / "none.jpg")) is None
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+import credential_store
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = tmp_path / "credentials.txt"
+    p.write_text("a@dcccd.edu,one\nb@dcccd.edu,two\n")
+    return str(p)
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_load_and_last_line_wins(path):
+    append(path, "a@dcccd.edu,three\n")
+    store = credential_store.CredentialStore(path)
+
+    assert store.get("a@dcccd.edu") == "three"
+    assert store.get("b@dcccd.edu") == "two"
+    assert len(store) == 2
+    assert store.lines == 3
+
+
+def test_appended_lines_are_parsed_without_a_reload(path, monkeypatch):
+    store = credential_store.CredentialStore(path)
+    store.refresh()
+    monkeypatch.setattr(store, "_load", lambda: pytest.fail("reloaded the whole file"))
+
+    append(path, "c@dcccd.edu,four\n")
+
+    assert store.get("c@dcccd.edu") == "four"
+    assert store.lines == 3
+
+
+def test_unchanged_file_is_not_read(path, monkeypatch):
+    store = credential_store.CredentialStore(path)
+    store.refresh()
+    monkeypatch.setattr(store, "_read_appended", lambda stamp: pytest.fail("read an unchanged file"))
+
+    assert "a@dcccd.edu" in store
+
+
+def test_rewritten_file_is_reloaded(path):
+    store = credential_store.CredentialStore(path)
+    store.refresh()
+    seen = store.credentials
+
+    # Same length as before, different content
+    with open(path, "r+") as f:
+        f.write("z@dcccd.edu,one\nb@dcccd.edu,two\n")
+    os.utime(path, ns=(0, 0))
+
+    assert store.get("a@dcccd.edu") is None
+    assert store.get("z@dcccd.edu") == "one"
+    assert store.credentials is seen
+
+
+def test_partial_last_line_is_read_again(path):
+    store = credential_store.CredentialStore(path)
+    append(path, "c@dcccd.edu,fo")
+    assert store.get("c@dcccd.edu") == "fo"
+
+    append(path, "ur\n")
+    assert store.get("c@dcccd.edu") == "four"
+    assert store.lines == 3
+
+
+def test_deleted_file_empties_the_store(path):
+    store = credential_store.CredentialStore(path)
+    store.refresh()
+    os.remove(path)
+
+    assert len(store) == 0
+
+
+def test_add_and_compact(path):
+    store = credential_store.CredentialStore(path)
+    for n in range(3):
+        store.add("a@dcccd.edu", f"pw{n}")
+
+    assert store.needs_compaction()
+    assert store.compact()
+    with open(path) as f:
+        assert f.read().splitlines() == ["a@dcccd.edu,pw2", "b@dcccd.edu,two"]
+    assert store.lines == 2
+    assert not store.needs_compaction()
+
+    store.add("c@dcccd.edu", "five")
+    assert store.get("c@dcccd.edu") == "five"
+
+
+def test_compact_skips_a_half_written_line(path):
+    store = credential_store.CredentialStore(path)
+    append(path, "c@dcccd.edu,fo")
+
+    assert not store.compact()
+
+
+def test_get_store_is_shared_per_file(path, tmp_path):
+    store = credential_store.get_store(path)
+
+    assert credential_store.get_store(path) is store
+    assert credential_store.get_store(str(tmp_path / "other.txt")) is not store
+
+
+def test_one_compaction_thread_per_store(path):
+    store = credential_store.CredentialStore(path)
+    stop = credential_store.start_compaction_thread(store, interval=60)
+    try:
+        assert credential_store.start_compaction_thread(store, interval=60) is stop
+    finally:
+        stop.set()
+    assert credential_store.start_compaction_thread(store, interval=60) is not stop
+    store._compaction.set()
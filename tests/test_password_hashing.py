@@ -0,0 +1,65 @@
+import hashlib
+
+import pytest
+
+import password_hashing
+
+# Low costs keep the suite fast; the format is the same at any cost
+FAST = {"pbkdf2_sha256": (1000,), "scrypt": (2 ** 4, 8, 1)}
+
+
+@pytest.mark.parametrize("scheme", sorted(FAST))
+def test_round_trip(scheme):
+    stored = password_hashing.hash_password("correct horse", scheme, FAST[scheme])
+
+    assert stored.startswith(scheme + "$")
+    assert password_hashing.check_password(stored, "correct horse")
+    assert not password_hashing.check_password(stored, "wrong horse")
+
+
+def test_salts_differ():
+    first = password_hashing.hash_password("same", cost=FAST["pbkdf2_sha256"])
+    second = password_hashing.hash_password("same", cost=FAST["pbkdf2_sha256"])
+
+    assert first != second
+    assert password_hashing.check_password(first, "same") and password_hashing.check_password(second, "same")
+
+
+def test_legacy_hashes_still_verify():
+    legacy = hashlib.sha256(("hunter2" + password_hashing.LEGACY_SALT).encode("utf-8")).hexdigest()
+
+    assert password_hashing.check_password(legacy, "hunter2")
+    assert not password_hashing.check_password(legacy, "hunter3")
+    assert password_hashing.needs_rehash(legacy)
+
+
+def test_empty_stored_hash_never_matches():
+    assert not password_hashing.check_password("", "")
+    assert not password_hashing.check_password(None, "anything")
+
+
+def test_needs_rehash(monkeypatch):
+    monkeypatch.setattr(password_hashing, "PBKDF2_ITERATIONS", 1000)
+    current = password_hashing.hash_password("pw")
+    cheaper = password_hashing.hash_password("pw", cost=(500,))
+    other_scheme = password_hashing.hash_password("pw", "scrypt", FAST["scrypt"])
+
+    assert not password_hashing.needs_rehash(current)
+    assert password_hashing.needs_rehash(cheaper)
+    assert password_hashing.needs_rehash(other_scheme)
+    assert password_hashing.needs_rehash(None)
+
+    # Raising the cost makes yesterday's hashes due for an upgrade
+    monkeypatch.setattr(password_hashing, "PBKDF2_ITERATIONS", 2000)
+    assert password_hashing.needs_rehash(current)
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        password_hashing.hash_password("pw", "md5")
+
+
+def test_submit_runs_on_the_pool():
+    stored = password_hashing.hash_password("pooled", cost=FAST["pbkdf2_sha256"])
+
+    assert password_hashing.submit(password_hashing.check_password, stored, "pooled").result(timeout=30)
@@ -0,0 +1,53 @@
+import profile_index
+import profile_log
+
+
+def profile(name):
+    return {"name": name, "bio": "", "grad_year": "2026", "major": "CS", "minor": ""}
+
+
+def test_lookups_follow_appends(tmp_path):
+    path = str(tmp_path / "profiles.txt")
+    log = profile_log.ProfileLog(path)
+    index = profile_index.ProfileIndex(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    assert index.get("a@dcccd.edu")["name"] == "Ann"
+
+    log.put("b@dcccd.edu", profile("Bob"))
+    log.put("a@dcccd.edu", profile("Ann 2"))
+
+    assert index.get("a@dcccd.edu")["name"] == "Ann 2"
+    assert index.get("b@dcccd.edu")["name"] == "Bob"
+    assert index.get("missing@dcccd.edu") is None
+
+
+def test_repeated_edits_of_one_profile_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_index, "MERGE_THRESHOLD", 8)
+    path = str(tmp_path / "profiles.txt")
+    log = profile_log.ProfileLog(path)
+    index = profile_index.ProfileIndex(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    index.get("a@dcccd.edu")
+    covered = index._covered
+
+    for n in range(8):
+        log.put("a@dcccd.edu", profile(f"Ann {n}"))
+        assert index.get("a@dcccd.edu")["name"] == f"Ann {n}"
+
+    assert index._covered > covered
+    assert index._scanned == index._covered
+    assert not index._overlay
+
+
+def test_a_large_tail_is_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_index, "MERGE_TAIL_BYTES", 1000)
+    path = str(tmp_path / "profiles.txt")
+    log = profile_log.ProfileLog(path)
+    index = profile_index.ProfileIndex(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    index.get("a@dcccd.edu")
+
+    log.put("a@dcccd.edu", dict(profile("Ann"), bio="x" * 2000))
+
+    assert index.get("a@dcccd.edu")["bio"] == "x" * 2000
+    assert index._scanned == index._covered
@@ -0,0 +1,118 @@
+import pytest
+
+import profile_log
+
+
+def profile(name, major="CS"):
+    return {"name": name, "bio": "hi", "grad_year": "2026", "major": major, "minor": ""}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "profiles.txt")
+
+
+def test_put_and_get_newest_record(path):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    log.put("b@dcccd.edu", profile("Bob"))
+    log.put("a@dcccd.edu", profile("Ann", major="Math"))
+
+    assert log.get("a@dcccd.edu")["major"] == "Math"
+    assert log.get("missing@dcccd.edu") is None
+    assert log.records == 3
+    assert set(log.load_all()) == {"a@dcccd.edu", "b@dcccd.edu"}
+
+
+def test_separators_in_fields_are_cleaned(path):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann|Lee\tthe\nfirst"))
+
+    assert log.get("a@dcccd.edu")["name"] == "Ann/Lee the first"
+
+
+def test_legacy_lines_without_checksum_are_read(path):
+    with open(path, "w") as f:
+        f.write("old@dcccd.edu:Old|bio|2020|Art|\n")
+
+    assert profile_log.ProfileLog(path).get("old@dcccd.edu")["major"] == "Art"
+
+
+def test_torn_tail_is_skipped_and_the_next_put_starts_a_new_line(path):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    torn = profile_log.encode_record("b@dcccd.edu", profile("Bob"))[:-5]
+    with open(path, "ab") as f:
+        f.write(torn)
+
+    assert "b@dcccd.edu" not in log
+    log.put("c@dcccd.edu", profile("Cat"))
+
+    fresh = profile_log.ProfileLog(path)
+    assert fresh.get("c@dcccd.edu")["name"] == "Cat"
+    assert fresh.get("a@dcccd.edu")["name"] == "Ann"
+    assert "b@dcccd.edu" not in fresh
+
+
+def test_corrupt_record_fails_its_checksum(path):
+    record = profile_log.encode_record("a@dcccd.edu", profile("Ann"))
+    with open(path, "wb") as f:
+        f.write(record.replace(b"Ann", b"Anx"))
+
+    assert profile_log.ProfileLog(path).get("a@dcccd.edu") is None
+
+
+def test_other_writers_are_picked_up(path):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    profile_log.ProfileLog(path).put("b@dcccd.edu", profile("Bob"))
+
+    assert log.get("b@dcccd.edu")["name"] == "Bob"
+
+
+def test_compaction_keeps_the_newest_record_per_email(path, monkeypatch):
+    monkeypatch.setattr(profile_log, "COMPACT_MIN_RECORDS", 4)
+    log = profile_log.ProfileLog(path)
+    replaced = []
+    log.before_replace.append(lambda: replaced.append(True))
+    for n in range(5):
+        log.put("a@dcccd.edu", profile(f"Ann {n}"))
+    log.put("b@dcccd.edu", profile("Bob"))
+
+    assert log.needs_compaction()
+    assert log.compact()
+    assert replaced == [True]
+    assert log.records == 2
+    assert not log.needs_compaction()
+    with open(path, "rb") as f:
+        assert len(f.read().splitlines()) == 2
+    assert log.get("a@dcccd.edu")["name"] == "Ann 4"
+
+
+def test_compaction_drops_a_torn_tail(path):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    with open(path, "ab") as f:
+        f.write(b"b@dcccd.edu:Bo")
+
+    assert log.compact()
+    with open(path, "rb") as f:
+        assert f.read() == profile_log.encode_record("a@dcccd.edu", profile("Ann"))
+
+
+def test_compaction_gives_up_if_the_file_changes(path, monkeypatch):
+    log = profile_log.ProfileLog(path)
+    log.put("a@dcccd.edu", profile("Ann"))
+    fsync = profile_log.os.fsync
+
+    def write_meanwhile(fd):
+        # Another process saves a profile while the copy is being written
+        fsync(fd)
+        profile_log.ProfileLog(path).put("b@dcccd.edu", profile("Bob"))
+
+    monkeypatch.setattr(profile_log.os, "fsync", write_meanwhile)
+    assert not log.compact()
+    monkeypatch.undo()
+
+    assert log.get("b@dcccd.edu")["name"] == "Bob"
+    assert log.compact()
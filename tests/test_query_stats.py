@@ -0,0 +1,83 @@
+import pytest
+
+import query_stats
+
+
+@pytest.fixture
+def stats():
+    query_stats.reset()
+    query_stats.enable(slow_log=None)
+    yield query_stats
+    query_stats.disable()
+    query_stats.reset()
+
+
+def test_statements_are_charged_to_the_action(stats):
+    conn = stats.connect(":memory:")
+    conn.execute("CREATE TABLE t (x)")
+    with stats.action("react"):
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+        with stats.action("refresh_feed"):
+            assert len(conn.execute("SELECT x FROM t WHERE x IN (?, ?, ?)", (1, 2, 3)).fetchall()) == 3
+    conn.commit()
+    conn.close()
+
+    data = stats.snapshot()
+    assert data['actions']['react']['queries'] == 1
+    assert data['actions']['react/refresh_feed']['queries'] == 1
+    assert data['actions'][stats.UNTAGGED]['queries'] == 2   # CREATE and COMMIT
+    assert "SELECT x FROM t WHERE x IN (?,...)" in data['statements']
+
+
+def test_with_block_commits_are_timed(stats):
+    conn = stats.connect(":memory:")
+    conn.execute("CREATE TABLE t (x)")
+    with stats.action("save"):
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(ZeroDivisionError):
+        with stats.action("broken"):
+            with conn:
+                conn.execute("INSERT INTO t VALUES (2)")
+                1 / 0
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    conn.close()
+
+    data = stats.snapshot()
+    assert data['statements']['COMMIT']['count'] == 1
+    assert data['actions']['save']['queries'] == 2
+    assert data['actions']['broken']['queries'] == 1   # the rolled back INSERT
+
+
+def test_slow_queries_keep_their_plan(stats):
+    stats.enable(slow_ms=0, slow_log=None)
+    conn = stats.connect(":memory:")
+    conn.execute("CREATE TABLE t (x)")
+    conn.execute("SELECT * FROM t WHERE x = ?", (1,)).fetchall()
+    conn.close()
+
+    slow = [q for q in stats.slow_queries() if q['sql'].startswith("SELECT")]
+    assert slow and slow[0]['plan']
+
+
+def test_slow_log_has_parameter_types_not_values(stats, tmp_path):
+    log = tmp_path / "slow.log"
+    stats.enable(slow_ms=0, slow_log=str(log))
+    conn = stats.connect(":memory:")
+    conn.execute("CREATE TABLE t (email, data, n)")
+    conn.execute("INSERT INTO t VALUES (?, ?, ?)", ("secret@dcccd.edu", b"\0" * 4096, 3))
+    conn.execute("SELECT * FROM t WHERE email = :email", {"email": "secret@dcccd.edu"}).fetchall()
+    conn.close()
+
+    params = [q['params'] for q in stats.slow_queries() if q['sql'].startswith(("INSERT", "SELECT"))]
+    assert params == ["(str(16), bytes(4096), int)", "{email: str(16)}"]
+    assert "secret" not in log.read_text(encoding="utf-8")
+
+
+def test_connect_is_plain_while_disabled():
+    query_stats.disable()
+    conn = query_stats.connect(":memory:")
+    try:
+        assert not isinstance(conn, query_stats.InstrumentedConnection)
+    finally:
+        conn.close()
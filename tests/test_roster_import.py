@@ -0,0 +1,119 @@
+import json
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+
+import roster_import
+
+CHEAP = ("pbkdf2_sha256", (1000,))
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "social_media.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            name TEXT, bio TEXT, role TEXT DEFAULT 'user', grad_year INTEGER, major TEXT
+        )
+    """)
+    conn.execute("INSERT INTO users (email, password_hash) VALUES ('taken@dcccd.edu', 'x')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def emails(db):
+    conn = sqlite3.connect(db)
+    try:
+        return {r[0] for r in conn.execute("SELECT email FROM users")}
+    finally:
+        conn.close()
+
+
+def write_jsonl(path, lines):
+    path.write_text("\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n")
+    return str(path)
+
+
+def test_bad_rows_are_reported_and_skipped(tmp_path, db):
+    roster = write_jsonl(tmp_path / "roster.jsonl", [
+        {"email": "good@dcccd.edu", "name": "Good", "password": "secret1", "grad_year": 2026},
+        {"email": "short@dcccd.edu", "password": "abc"},
+        {"email": "not-an-email", "password": "secret1"},
+        {"email": "good@dcccd.edu", "password": "secret1"},
+        {"email": "taken@dcccd.edu", "password": "secret1"},
+        {"email": "number@dcccd.edu", "password": 1234567},
+        {"email": 5, "password": "secret1"},
+        {"email": "listname@dcccd.edu", "password": "secret1", "name": ["a", "b"]},
+        ["not", "an", "object"],
+        "{broken json",
+    ])
+
+    report = roster_import.import_roster(roster, db, workers=1, scheme=CHEAP[0], cost=CHEAP[1])
+
+    assert report.read == 10
+    assert report.imported == 1
+    assert report.bad_rows == [
+        (2, "short@dcccd.edu", "password shorter than 6 characters"),
+        (3, "not-an-email", "invalid email"),
+        (4, "good@dcccd.edu", "duplicate email in roster"),
+        (6, "number@dcccd.edu", "password is not text"),
+        (7, "", "email is not text"),
+        (8, "listname@dcccd.edu", "name is not text or a number"),
+        (9, "", "unreadable row"),
+        (10, "", "unreadable row"),
+        (5, "taken@dcccd.edu", "email already registered"),
+    ]
+    assert emails(db) == {"taken@dcccd.edu", "good@dcccd.edu"}
+
+
+def test_csv_roster(tmp_path, db):
+    roster = tmp_path / "roster.csv"
+    roster.write_text("email,name,password,major\n"
+                      "a@dcccd.edu,A,secret1,CS\n"
+                      "b@dcccd.edu,B,,Math\n")
+
+    report = roster_import.import_roster(str(roster), db, workers=1, scheme=CHEAP[0], cost=CHEAP[1])
+
+    assert report.imported == 1
+    assert report.bad_rows == [(3, "b@dcccd.edu", "password shorter than 6 characters")]
+
+
+def test_email_registered_after_validation_falls_back_to_single_rows(db):
+    conn = sqlite3.connect(db)
+    report = roster_import.ImportReport()
+    valid = [(2, "new@dcccd.edu", {"password": "secret1"}),
+             (3, "taken@dcccd.edu", {"password": "secret1"}),
+             (4, "also-new@dcccd.edu", {"password": "secret1"})]
+    future = Future()
+    future.set_result(["hash"] * len(valid))
+
+    assert roster_import._insert(conn, valid, [future], report) == 2
+    conn.commit()
+    conn.close()
+
+    assert report.bad_rows == [(3, "taken@dcccd.edu", "email already registered")]
+    assert emails(db) == {"taken@dcccd.edu", "new@dcccd.edu", "also-new@dcccd.edu"}
+
+
+def test_fallback_keeps_earlier_batches_of_the_transaction(db):
+    conn = sqlite3.connect(db)
+    report = roster_import.ImportReport()
+    first = Future()
+    first.set_result(["hash"])
+    second = Future()
+    second.set_result(["hash", "hash"])
+
+    roster_import._insert(conn, [(2, "first@dcccd.edu", {})], [first], report)
+    roster_import._insert(conn, [(3, "taken@dcccd.edu", {}), (4, "second@dcccd.edu", {})], [second], report)
+    assert conn.in_transaction
+    conn.rollback()
+    conn.close()
+
+    # Nothing was committed behind the importer's back
+    assert emails(db) == {"taken@dcccd.edu"}
@@ -0,0 +1,95 @@
+import tkinter as tk
+
+import pytest
+
+import screen_router
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"Tk needs a display: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def screen(calls):
+    """A build function that records its builds and refreshes in calls."""
+    def build(frame):
+        calls.append(("build", frame))
+        tk.Label(frame, text="hello").pack()
+        return lambda *args: calls.append(("refresh", args))
+    return build
+
+
+def test_show_builds_once_and_refreshes_every_time(root):
+    router = screen_router.ScreenRouter(root)
+    calls = []
+
+    first = router.show("profile", screen(calls), "a@dcccd.edu")
+    second = router.show("profile", screen(calls), "b@dcccd.edu")
+
+    assert first is second
+    assert calls == [("build", first), ("refresh", ("a@dcccd.edu",)), ("refresh", ("b@dcccd.edu",))]
+    assert router.builds == 1
+    assert router.current == "profile"
+
+
+def test_screens_share_the_container_and_the_last_shown_is_current(root):
+    router = screen_router.ScreenRouter(root)
+    home = router.show("home", lambda frame: None)
+    search = router.show("search", lambda frame: None)
+
+    assert home.master is search.master is router.container
+    assert router.current == "search"
+    assert router.show("home", lambda frame: pytest.fail("built twice")) is home
+    assert router.current == "home"
+
+
+def test_forget_rebuilds_on_the_next_visit(root):
+    router = screen_router.ScreenRouter(root)
+    calls = []
+    frame = router.show("home", screen(calls))
+
+    router.forget("home")
+    router.forget("never shown")
+
+    assert not frame.winfo_exists()
+    assert router.show("home", screen(calls)) is not frame
+    assert router.builds == 2
+
+
+def test_reset_drops_every_screen(root):
+    router = screen_router.ScreenRouter(root)
+    frames = [router.show(name, lambda frame: None) for name in ("home", "search", "profile")]
+
+    router.reset()
+
+    assert router.screens == {}
+    assert router.current is None
+    assert not any(frame.winfo_exists() for frame in frames)
+
+
+def test_get_router_reuses_the_router_and_clears_stray_widgets(root):
+    router = screen_router.get_router(root)
+    stray = tk.Label(root, text="built straight on root")
+    stray.pack()
+    dialog = tk.Toplevel(root)
+
+    assert screen_router.get_router(root) is router
+    assert not stray.winfo_exists()
+    assert dialog.winfo_exists()
+    assert router.container.winfo_exists()
+
+
+def test_get_router_replaces_a_destroyed_container(root):
+    router = screen_router.get_router(root)
+    router.container.destroy()
+
+    replacement = screen_router.get_router(root)
+
+    assert replacement is not router
+    assert replacement.container.winfo_exists()
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+import posts
+import tombstones
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "social.db")
+    monkeypatch.setattr(posts, "DB_FILE", path)
+    posts.setup_database()
+    return path
+
+
+def count(db, table):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def tombstone_user(db, user_id):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE users SET deleted_at = ? WHERE id = ?", (datetime.now().isoformat(), user_id))
+    conn.close()
+
+
+def test_purging_a_user_removes_everything_that_points_at_them(db):
+    gone = posts.create_user("gone", "gone@dcccd.edu")
+    kept = posts.create_user("kept", "kept@dcccd.edu")
+    their_post = posts.create_post(gone, "about to go")
+    other_post = posts.create_post(kept, "staying")
+    posts.add_comment(their_post, "kept@dcccd.edu", "on a doomed post")
+    posts.add_comment(other_post, "gone@dcccd.edu", "by a doomed user")
+    posts.add_comment(other_post, "kept@dcccd.edu", "survives")
+    posts.set_reaction(other_post, gone, "like")
+    posts.set_reaction(their_post, kept, "like")
+    posts.follow_user(gone, kept)
+    posts.follow_user(kept, gone)
+    tombstone_user(db, gone)
+
+    deleted = tombstones.purge_tombstones(db, pause=0)
+
+    assert deleted == {"comments": 2, "post_reactions": 2, "followers": 2, "posts": 1, "users": 1,
+                       "blobs": 0}
+    assert count(db, "users") == 1
+    assert count(db, "posts") == 1
+    assert count(db, "comments") == 1
+    assert count(db, "post_reactions") == 0
+    assert count(db, "followers") == 0
+
+
+def test_purging_a_deleted_post_keeps_its_author(db):
+    author = posts.create_user("author", "author@dcccd.edu")
+    post_id = posts.create_post(author, "regret")
+    posts.add_comment(post_id, "author@dcccd.edu", "reply")
+    assert posts.delete_post(post_id, author)
+
+    deleted = tombstones.purge_tombstones(db, pause=0)
+
+    assert deleted == {"comments": 1, "posts": 1, "blobs": 0}
+    assert count(db, "users") == 1
+    assert count(db, "posts") == 0
+
+
+def test_small_batches_delete_the_same_rows(db):
+    gone = posts.create_user("gone", "gone@dcccd.edu")
+    for i in range(7):
+        posts.create_post(gone, f"post {i}")
+    tombstone_user(db, gone)
+
+    deleted = tombstones.purge_tombstones(db, batch_size=2, pause=0)
+
+    assert deleted == {"posts": 7, "users": 1, "blobs": 0}
+    assert count(db, "posts") == 0
+
+
+def test_a_set_stop_event_purges_nothing(db):
+    gone = posts.create_user("gone", "gone@dcccd.edu")
+    tombstone_user(db, gone)
+    stop = threading.Event()
+    stop.set()
+
+    assert tombstones.purge_tombstones(db, pause=0, stop_event=stop) == {}
+    assert count(db, "users") == 1
+
+
+def test_nothing_to_purge_without_tombstone_columns(tmp_path):
+    path = str(tmp_path / "plain.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+    conn.close()
+    conn = tombstones.connect(path)
+    try:
+        assert tombstones.purge_steps(conn) == []
+    finally:
+        conn.close()
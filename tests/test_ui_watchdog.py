@@ -0,0 +1,73 @@
+import sys
+import tkinter
+
+import query_stats
+import ui_watchdog
+
+
+class FakeWidget:
+    """Just enough of a widget for tkinter.CallWrapper."""
+
+    def _report_exception(self):
+        raise
+
+
+def run_as_tk_callback(func, *args):
+    """Calls func the way Tk calls a button command or an after() callback."""
+    return tkinter.CallWrapper(func, None, FakeWidget())(*args)
+
+
+def test_idle_outside_a_callback():
+    assert ui_watchdog.classify(sys._getframe()) == (ui_watchdog.IDLE, None)
+
+
+def test_callback_and_innermost_frame():
+    def get_reaction_counts():
+        return ui_watchdog.classify(sys._getframe())
+
+    def react():
+        return get_reaction_counts()
+
+    callback, where = run_as_tk_callback(react)
+
+    # Qualified names need Python 3.11; before that it is the bare function name
+    assert callback.split(" (")[0].split(".")[-1] == "react"
+    assert "(test_ui_watchdog.py:" in callback
+    assert where.split(" (")[0].split(".")[-1] == "get_reaction_counts"
+
+
+def test_lambdas_and_tagged_wrappers_are_skipped():
+    @query_stats.tagged("search")
+    def perform_search(term):
+        return ui_watchdog.classify(sys._getframe())
+
+    callback, where = run_as_tk_callback(lambda: perform_search("ann"))
+
+    assert "perform_search" in callback
+    assert callback == where
+
+
+def test_query_stats_frames_are_not_the_innermost_frame():
+    samples = []
+
+    def sample():
+        # Classify the stack as it is inside query_stats, without this frame
+        samples.append(ui_watchdog.classify(sys._getframe(1)))
+        return 1
+
+    def load_next_page():
+        conn = query_stats.connect(":memory:")
+        conn.create_function("sample", 0, sample)
+        conn.execute("SELECT sample()").fetchall()
+        conn.close()
+
+    query_stats.enable(slow_log=None)
+    try:
+        run_as_tk_callback(query_stats.tagged("admin_users")(load_next_page))
+    finally:
+        query_stats.disable()
+        query_stats.reset()
+
+    (callback, where), = samples
+    assert "load_next_page" in callback
+    assert "load_next_page" in where
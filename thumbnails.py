@@ -0,0 +1,120 @@
+import hashlib
+import os
+
+# Profile pictures are shrunk once, when they are uploaded, into a few fixed
+# sizes. The thumbnails are PNGs, which Tk's PhotoImage reads by itself, so
+# screens show a picture without Pillow and without decoding the original.
+#
+# The cache is content-addressed: a picture's key is the SHA-256 of the
+# original file, and its thumbnails live at <cache>/<key[:2]>/<key>_<size>.png.
+# Uploading the same picture twice costs one hash and no decode. Every read
+# touches the file's mtime, and eviction removes the least recently used
+# files once the cache grows past CACHE_MAX_BYTES.
+
+THUMBNAIL_SIZES = (32, 64, 128)
+CACHE_DIR = "thumbnail_cache"
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+
+
+def file_key(path):
+    """The cache key of an image file: the SHA-256 of its contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _variant_path(key, size, cache_dir):
+    return os.path.join(cache_dir, key[:2], f"{key}_{size}.png")
+
+
+def make_thumbnails(source, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Creates every thumbnail size for an image file and returns its key.
+
+    Needs Pillow; raises ImportError without it and OSError for files it
+    cannot read as an image.
+    """
+    key = file_key(source)
+    paths = {size: _variant_path(key, size, cache_dir) for size in THUMBNAIL_SIZES}
+    if all(os.path.exists(p) for p in paths.values()):
+        for p in paths.values():
+            os.utime(p)
+        return key
+
+    import tempfile
+    from PIL import Image, ImageOps  # only needed here, at upload time
+
+    largest = max(THUMBNAIL_SIZES)
+    with Image.open(source) as image:
+        # JPEGs can be decoded straight at 1/2, 1/4 or 1/8 scale; ask for the
+        # smallest scale that still leaves room to downsample cleanly
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    os.makedirs(os.path.dirname(paths[largest]), exist_ok=True)
+    # Largest first, each size shrunk from the one before it
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+        image.thumbnail((size, size))
+        fd, tmp_path = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(paths[size]))
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, "PNG")
+        os.replace(tmp_path, paths[size])
+
+    evict(cache_dir, max_bytes)
+    return key
+
+
+def get_thumbnail(key, size, cache_dir=CACHE_DIR):
+    """Path of the cached PNG thumbnail of `key` at `size` px, or None if it was evicted.
+
+    Costs one utime(), so it is safe on the Tk thread. A missing thumbnail
+    is made again by rebuild_thumbnail, which decodes the original and
+    belongs on a worker (image_loader.py does it on its pool).
+    """
+    if not key:
+        return None
+    path = _variant_path(key, size, cache_dir)
+    try:
+        os.utime(path)  # marks it recently used
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def rebuild_thumbnail(key, size, source, cache_dir=CACHE_DIR):
+    """Makes the thumbnails of `key` again from its original `source`. Returns the path at `size` or None."""
+    if key and source and os.path.exists(source):
+        try:
+            if make_thumbnails(source, cache_dir) == key:
+                return _variant_path(key, size, cache_dir)
+        except (ImportError, OSError) as e:
+            print(f"Could not rebuild thumbnail: {e}")
+    return None
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Deletes the least recently used thumbnails until the cache fits in max_bytes."""
+    files = []
+    total = 0
+    for dirpath, _, filenames in os.walk(cache_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, path))
+            total += st.st_size
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+
+import blob_store
+
+# Soft-deleted rows carry a deleted_at timestamp (a "tombstone") so that the
+# user-facing delete is a single UPDATE. The purge job below removes the
+# tombstoned rows and everything that depends on them, a small batch per
+# transaction, so the write lock is never held long enough to stall readers.
+
+PURGE_BATCH_SIZE = 500
+PURGE_PAUSE = 0.05      # seconds between batches, lets waiting readers in
+PURGE_INTERVAL = 60.0   # seconds between purge runs of the background thread
+
+
+def connect(db_file):
+    conn = sqlite3.connect(db_file, timeout=10)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _tables(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def purge_steps(conn):
+    """Build the ordered (description, DELETE statement) list for this database.
+
+    Dependents are removed before the rows they point to. Every statement
+    takes the batch size as its only parameter. Tables or columns that do
+    not exist in this database are skipped.
+    """
+    tables = _tables(conn)
+    if "users" not in tables or "deleted_at" not in _columns(conn, "users"):
+        return []
+    dead_users = "SELECT id FROM users WHERE deleted_at IS NOT NULL"
+    steps = []
+    dead_posts = None
+    if "posts" in tables:
+        if "deleted_at" in _columns(conn, "posts"):
+            dead_posts = f"SELECT id FROM posts WHERE deleted_at IS NOT NULL OR user_id IN ({dead_users})"
+        else:
+            dead_posts = f"SELECT id FROM posts WHERE user_id IN ({dead_users})"
+    if "comments" in tables:
+        where = f"user_id IN ({dead_users})"
+        if dead_posts:
+            where += f" OR post_id IN ({dead_posts})"
+        steps.append(("comments", f"DELETE FROM comments WHERE id IN (SELECT id FROM comments WHERE {where} LIMIT ?)"))
+    if "post_reactions" in tables:
+        where = f"user_id IN ({dead_users})"
+        if dead_posts:
+            where += f" OR post_id IN ({dead_posts})"
+        steps.append(("post_reactions", f"DELETE FROM post_reactions WHERE rowid IN (SELECT rowid FROM post_reactions WHERE {where} LIMIT ?)"))
+    if "followers" in tables:
+        steps.append(("followers", f"""DELETE FROM followers WHERE rowid IN (
+            SELECT rowid FROM followers
+            WHERE follower_id IN ({dead_users}) OR following_id IN ({dead_users})
+            LIMIT ?)"""))
+    if "post_attachments" in tables and dead_posts:
+        steps.append(("post_attachments", f"DELETE FROM post_attachments WHERE id IN (SELECT id FROM post_attachments WHERE post_id IN ({dead_posts}) LIMIT ?)"))
+    if dead_posts:
+        steps.append(("posts", f"DELETE FROM posts WHERE id IN ({dead_posts} LIMIT ?)"))
+    steps.append(("users", f"DELETE FROM users WHERE id IN ({dead_users} LIMIT ?)"))
+    return steps
+
+
+def purge_tombstones(db_file, batch_size=PURGE_BATCH_SIZE, pause=PURGE_PAUSE, stop_event=None):
+    """Hard-delete tombstoned rows in batches. Returns {table: rows deleted}."""
+    conn = connect(db_file)
+    deleted = {}
+    try:
+        for table, sql in purge_steps(conn):
+            while stop_event is None or not stop_event.is_set():
+                try:
+                    with conn:
+                        count = conn.execute(sql, (batch_size,)).rowcount
+                except sqlite3.OperationalError as e:
+                    # Somebody else holds the write lock; try again next run
+                    print(f"Purge of {table} postponed: {e}")
+                    return deleted
+                if count <= 0:
+                    break
+                deleted[table] = deleted.get(table, 0) + count
+                time.sleep(pause)
+        # Pictures only the purged rows pointed at
+        if "blobs" in _tables(conn) and (stop_event is None or not stop_event.is_set()):
+            try:
+                deleted["blobs"] = blob_store.collect_garbage(conn)
+            except sqlite3.OperationalError as e:
+                print(f"Blob cleanup postponed: {e}")
+    finally:
+        conn.close()
+    return deleted
+
+
+def start_purge_thread(db_file, interval=PURGE_INTERVAL, batch_size=PURGE_BATCH_SIZE):
+    """Run purge_tombstones every `interval` seconds on a daemon thread.
+
+    Returns the threading.Event that stops the loop when set.
+    """
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            try:
+                purge_tombstones(db_file, batch_size=batch_size, stop_event=stop_event)
+            except sqlite3.Error as e:
+                print(f"Purge job error: {e}")
+            stop_event.wait(interval)
+
+    threading.Thread(target=run, name="tombstone-purge", daemon=True).start()
+    return stop_event
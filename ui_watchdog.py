@@ -0,0 +1,252 @@
+import atexit
+import collections
+import functools
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tkinter
+
+# How long the Tk window stays unresponsive, and what it was doing meanwhile.
+#
+# A heartbeat is scheduled with root.after every INTERVAL_MS. Tk can only
+# run it between callbacks, so how late it fires is how long input and
+# redraws were kept waiting. Every lateness goes into a histogram. A
+# lateness of STALL_MS or more is a stall and goes into the rolling log.
+#
+# The heartbeat only learns about a stall after it is over. To say what
+# caused it, a side thread samples the Tk thread's stack every SAMPLE_MS
+# with sys._current_frames(). Each sample keeps the callback Tk was running
+# (the first application frame above tkinter's CallWrapper, e.g.
+# SocialApp.react) and the innermost application frame (e.g.
+# get_reaction_counts). Frames that only pass the call on don't count as
+# the callback: the lambdas buttons are wired to, query_stats.tagged
+# wrappers and functools. query_stats frames don't count as the innermost
+# frame either, since every query runs through them. A stall is charged to
+# the callback seen most often in the samples taken while it lasted.
+#
+# Turned on by start(root) when SOCIAL_WATCHDOG is set (to the stall
+# threshold in ms, or 1 for the default). The summary is printed at exit and
+# stalls are also appended to STALL_LOG_FILE.
+
+WATCHDOG_ENV = "SOCIAL_WATCHDOG"
+INTERVAL_MS = 50
+STALL_MS = 100
+SAMPLE_MS = 10
+LOG_SIZE = 500            # stalls kept in the rolling log
+SAMPLE_KEEP = 2000        # stack samples kept, about 20 s at SAMPLE_MS
+STALL_LOG_FILE = "ui_stalls.log"
+IDLE = "(idle)"
+
+# Frames from these directories are library code, not application code
+LIBRARY_DIRS = tuple({os.path.normcase(p) for key in ("stdlib", "platstdlib", "purelib", "platlib")
+                      if (p := sysconfig.get_paths().get(key))})
+TKINTER_DIR = os.path.normcase(os.path.dirname(os.path.abspath(tkinter.__file__)))
+WATCHDOG_FILE = os.path.normcase(os.path.abspath(__file__))
+QUERY_STATS_FILE = os.path.join(os.path.dirname(WATCHDOG_FILE), "query_stats.py")
+FUNCTOOLS_FILE = os.path.normcase(os.path.abspath(functools.__file__))
+
+
+def _is_application(filename):
+    path = os.path.normcase(os.path.abspath(filename))
+    return not path.startswith(LIBRARY_DIRS) and path != WATCHDOG_FILE
+
+
+def _path(frame):
+    return os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+
+
+def _passes_call_on(frame):
+    return frame.f_code.co_name == "<lambda>" or _path(frame) in (QUERY_STATS_FILE, FUNCTOOLS_FILE)
+
+
+def _describe(frame):
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def classify(frame):
+    """(callback, innermost application frame) of a Tk thread stack, or (IDLE, None)."""
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()   # outermost first
+    # The innermost CallWrapper is the callback Tk is running now; outer ones
+    # belong to callbacks waiting on a nested event loop (dialogs, update())
+    start = None
+    for i, f in enumerate(stack):
+        if f.f_code.co_name == "__call__" and os.path.normcase(f.f_code.co_filename).startswith(TKINTER_DIR):
+            start = i + 1
+    if start is None:
+        return IDLE, None
+    app_frames = [f for f in stack[start:] if _is_application(f.f_code.co_filename)]
+    if not app_frames:
+        return IDLE, None
+    callback = next((f for f in app_frames if not _passes_call_on(f)), app_frames[0])
+    innermost = next((f for f in reversed(app_frames) if _path(f) != QUERY_STATS_FILE), app_frames[-1])
+    return _describe(callback), _describe(innermost)
+
+
+class Histogram:
+    """Power-of-two millisecond buckets."""
+
+    def __init__(self):
+        self.buckets = collections.Counter()   # bit length of the time in ms -> count
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[int(ms).bit_length()] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile_ms(self, q):
+        """Upper bound of the bucket holding the q-quantile."""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= q * self.count:
+                return 2 ** bucket
+        return 0
+
+    def rows(self):
+        """[(bucket lower bound ms, upper bound ms, count)]."""
+        return [(2 ** (b - 1) if b else 0, 2 ** b, n) for b, n in sorted(self.buckets.items())]
+
+
+class UIWatchdog:
+    """Heartbeat lateness and stall attribution for one Tk root."""
+
+    def __init__(self, root, interval_ms=INTERVAL_MS, stall_ms=STALL_MS, sample_ms=SAMPLE_MS,
+                 log_size=LOG_SIZE, log_file=None):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.stall_ms = stall_ms
+        self.sample_interval = sample_ms / 1000
+        self.log_file = log_file
+        self.lateness = Histogram()
+        self.stalls = Histogram()
+        self.log = collections.deque(maxlen=log_size)
+        self.stalled_by = collections.Counter()   # callback -> stalled ms
+        self.samples = collections.deque(maxlen=SAMPLE_KEEP)   # (time, callback, innermost frame)
+        self.lock = threading.Lock()
+        self.running = False
+        self.tk_thread = None
+        self.expected = None
+        self.after_id = None
+
+    def start(self):
+        """Starts the heartbeat and the sampler. Call it on the Tk thread."""
+        if self.running:
+            return self
+        self.running = True
+        self.tk_thread = threading.get_ident()
+        self.expected = time.perf_counter() + self.interval
+        self.after_id = self.root.after(int(self.interval * 1000), self._beat)
+        threading.Thread(target=self._sample_loop, name="ui-watchdog", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                # The window may already be gone
+                pass
+            self.after_id = None
+
+    def _beat(self):
+        now = time.perf_counter()
+        late_ms = max(0.0, (now - self.expected) * 1000)
+        with self.lock:
+            self.lateness.add(late_ms)
+        if late_ms >= self.stall_ms:
+            self._record_stall(self.expected, now, late_ms)
+        if self.running:
+            self.expected = now + self.interval
+            self.after_id = self.root.after(int(self.interval * 1000), self._beat)
+
+    def _record_stall(self, began, ended, late_ms):
+        with self.lock:
+            window = [(cb, where) for t, cb, where in self.samples if began - self.interval <= t <= ended]
+        busy = [(cb, where) for cb, where in window if cb != IDLE]
+        callback, where = IDLE, None
+        if busy:
+            callback = collections.Counter(cb for cb, _ in busy).most_common(1)[0][0]
+            where = collections.Counter(w for cb, w in busy if cb == callback).most_common(1)[0][0]
+        entry = {'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'ms': late_ms, 'callback': callback,
+                 'where': where, 'samples': len(window)}
+        with self.lock:
+            self.stalls.add(late_ms)
+            self.stalled_by[callback] += late_ms
+            self.log.append(entry)
+        if self.log_file:
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(f"{entry['time']} stalled {late_ms:.0f} ms in {callback}"
+                        + (f" at {where}" if where and where != callback else "") + "\n")
+
+    def _sample_loop(self):
+        while self.running:
+            time.sleep(self.sample_interval)
+            frame = sys._current_frames().get(self.tk_thread)
+            if frame is None:
+                # The Tk thread has exited
+                return
+            callback, where = classify(frame)
+            del frame
+            with self.lock:
+                self.samples.append((time.perf_counter(), callback, where))
+
+    def summary(self):
+        """Histograms, the worst callbacks and the rolling log as plain data."""
+        with self.lock:
+            return {
+                'heartbeats': self.lateness.count,
+                'lateness_ms': {'p50': self.lateness.percentile_ms(0.5), 'p95': self.lateness.percentile_ms(0.95),
+                                'p99': self.lateness.percentile_ms(0.99), 'max': self.lateness.max_ms,
+                                'histogram': self.lateness.rows()},
+                'stalls': {'count': self.stalls.count, 'total_ms': self.stalls.total_ms,
+                           'max_ms': self.stalls.max_ms, 'histogram': self.stalls.rows()},
+                'stalled_by': self.stalled_by.most_common(),
+                'log': list(self.log),
+            }
+
+    def report(self, top=10):
+        data = self.summary()
+        late = data['lateness_ms']
+        lines = [f"heartbeats {data['heartbeats']}, lateness p50 <{late['p50']} ms, p95 <{late['p95']} ms, "
+                 f"p99 <{late['p99']} ms, max {late['max']:.0f} ms",
+                 f"stalls over {self.stall_ms} ms: {data['stalls']['count']}, "
+                 f"{data['stalls']['total_ms'] / 1000:.1f} s in total, worst {data['stalls']['max_ms']:.0f} ms"]
+        for low, high, n in data['stalls']['histogram']:
+            lines.append(f"  {low:>6}-{high:<6} ms {n:6d}")
+        if data['stalled_by']:
+            lines.append("stalled time by callback:")
+            for callback, ms in data['stalled_by'][:top]:
+                lines.append(f"  {ms:10.0f} ms  {callback}")
+        return "\n".join(lines)
+
+
+_watchdog = None
+
+
+def start(root, stall_ms=None):
+    """Starts watching root if SOCIAL_WATCHDOG (or stall_ms) is set. Returns the watchdog or None."""
+    global _watchdog
+    setting = os.environ.get(WATCHDOG_ENV)
+    if stall_ms is None and not setting:
+        return None
+    if stall_ms is None:
+        stall_ms = STALL_MS if setting == "1" else float(setting)
+    _watchdog = UIWatchdog(root, stall_ms=stall_ms, log_file=STALL_LOG_FILE).start()
+    atexit.register(lambda: print(_watchdog.report(), file=sys.stderr))
+    return _watchdog
+
+
+def get_watchdog():
+    return _watchdog
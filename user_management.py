@@ -2,72 +2,135 @@ import tkinter as tk
 from tkinter import messagebox
 import re
 import os
+import sqlite3
+
+import credential_store
+import profile_log
+import profile_index
+import password_hashing
+import screen_router
 
 # File paths
 PROFILES_FILE = "profiles.txt"
 CREDENTIALS_FILE = "credentials.txt"
+# Users moved over by migrate_flat_files.py (or registered in the main app)
+# live here; the text files are checked first and this is the fallback
+USERS_DB = "social_media.db"
+
+# Both files are append-only logs: saving one user appends one line, and
+# background compaction drops the superseded lines (see profile_log.py and
+# credential_store.py). The credential store is shared with register_login.py,
+# so appends and compaction of credentials.txt take the same lock
+profile_store = profile_log.ProfileLog(PROFILES_FILE)
+credential_file = credential_store.get_store(CREDENTIALS_FILE)
+# Single-profile reads go through a memory-mapped, sorted index instead of
+# parsing the whole log on every view
+profile_reader = profile_index.ProfileIndex(PROFILES_FILE)
+profile_store.before_replace.append(profile_reader.close)
 
 def load_profiles():
     """Load user profiles from profiles.txt file"""
-    profiles = {}
-    if os.path.exists(PROFILES_FILE):
-        try:
-            with open(PROFILES_FILE, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if line and ':' in line:
-                        email, profile_data = line.split(':', 1)
-                        # Parse profile data (name|bio|grad_year|major|minor)
-                        parts = profile_data.split('|')
-                        if len(parts) == 5:
-                            profiles[email] = {
-                                'name': parts[0],
-                                'bio': parts[1],
-                                'grad_year': parts[2],
-                                'major': parts[3],
-                                'minor': parts[4]
-                            }
-        except Exception as e:
-            print(f"Error loading profiles: {e}")
-    return profiles
+    try:
+        return profile_store.load_all()
+    except Exception as e:
+        print(f"Error loading profiles: {e}")
+        return {}
 
-def save_profiles(profiles):
-    """Save user profiles to profiles.txt file"""
+def save_profile(email, profile):
+    """Append one user's profile to profiles.txt"""
     try:
-        with open(PROFILES_FILE, 'w') as file:
-            for email, profile in profiles.items():
-                profile_data = f"{profile['name']}|{profile['bio']}|{profile['grad_year']}|{profile['major']}|{profile['minor']}"
-                file.write(f"{email}:{profile_data}\n")
+        profile_store.put(email, profile)
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to save profiles: {e}")
+        messagebox.showerror("Error", f"Failed to save profile: {e}")
+
+def save_profiles(profiles):
+    """Save the profiles that changed to profiles.txt file"""
+    for email, profile in profiles.items():
+        if profile_store.get(email) != {k: str(profile.get(k, '')) for k in profile_log.PROFILE_FIELDS}:
+            save_profile(email, profile)
 
 def load_credentials():
     """Load login credentials from credentials.txt file"""
-    credentials = {}
-    if os.path.exists(CREDENTIALS_FILE):
-        try:
-            with open(CREDENTIALS_FILE, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if line and ',' in line:
-                        email, password = line.split(',', 1)
-                        credentials[email] = password
-        except Exception as e:
-            print(f"Error loading credentials: {e}")
-    return credentials
-
-def save_credentials(credentials):
-    """Save login credentials to credentials.txt file"""
     try:
-        with open(CREDENTIALS_FILE, 'w') as file:
-            for email, password in credentials.items():
-                file.write(f"{email},{password}\n")
+        credential_file.refresh()
+    except Exception as e:
+        print(f"Error loading credentials: {e}")
+    return credential_file.credentials
+
+def save_credential(email, password):
+    """Append one user's password to credentials.txt"""
+    try:
+        credential_file.add(email, password)
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save credentials: {e}")
 
 # Load initial data
 user_profiles = load_profiles()
 loginCredentials = load_credentials()
+profile_log.start_compaction_thread(profile_store)
+
+def _users_db_row(email, columns):
+    if not os.path.exists(USERS_DB):
+        return None
+    try:
+        conn = sqlite3.connect(USERS_DB)
+        try:
+            return conn.execute(f"""
+                SELECT {columns} FROM users
+                WHERE email = ? AND is_active = 1 AND deleted_at IS NULL
+            """, (email,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading {USERS_DB}: {e}")
+        return None
+
+def get_database_profile(email):
+    """A profile from the users table, for users not in profiles.txt"""
+    row = _users_db_row(email, "name, bio, grad_year, major, minor")
+    if row is None:
+        return None
+    return {field: value or '' for field, value in zip(profile_log.PROFILE_FIELDS, row)}
+
+def check_database_login(email, password):
+    """True/False for a users-table account's password, None if there is no such account.
+
+    Hashes the password, so it runs on a worker (see check_database_login_later).
+    A correct password stored with an older scheme or cost is rehashed.
+    """
+    row = _users_db_row(email, "id, password_hash")
+    if row is None:
+        return None
+    if not password_hashing.check_password(row[1], password):
+        return False
+    if password_hashing.needs_rehash(row[1]):
+        _update_password_hash(row[0], password_hashing.hash_password(password))
+    return True
+
+def _update_password_hash(user_id, password_hash):
+    try:
+        conn = sqlite3.connect(USERS_DB)
+        try:
+            with conn:
+                conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error updating {USERS_DB}: {e}")
+
+def check_database_login_later(root, email, password, on_done):
+    """Runs check_database_login on the hashing pool and calls on_done(result) on the Tk thread"""
+    root.config(cursor="watch")
+    future = password_hashing.submit(check_database_login, email, password)
+
+    def check_done():
+        if not future.done():
+            root.after(20, check_done)
+            return
+        root.config(cursor="")
+        on_done(future.result())
+
+    root.after(20, check_done)
 
 def validate_email(email):
     """Validate email format"""
@@ -75,26 +138,30 @@ def validate_email(email):
     return bool(re.match(pattern, email))
 
 def clear_screen(root):
-    """Clear all widgets from the screen"""
+    """Clear all widgets from the screen, cached screens included"""
     for widget in root.winfo_children():
         widget.destroy()
 
+def show_screen(root, name, build, *args):
+    """Raise a cached screen (see screen_router.py), built with build(root, frame) on the first visit"""
+    return screen_router.get_router(root).show(name, lambda frame: build(root, frame), *args)
+
 def show_forgot_password(root, loginCredentials):
     """Show forgot password screen"""
-    clear_screen(root)
-    
-    # Size of screen
-    root.geometry("500x400")
-    root.resizable(True, True)
+    show_screen(root, "forgot_password", build_forgot_password, loginCredentials)
+
+def build_forgot_password(root, frame):
+    state = {}
     
-    tk.Label(root, text="Reset Password", font=('Arial', 16, 'bold')).pack(pady=30)
+    tk.Label(frame, text="Reset Password", font=('Arial', 16, 'bold')).pack(pady=30)
     
-    tk.Label(root, text="Enter your email address:").pack(pady=5)
-    email_entry = tk.Entry(root, width=30, font=('Arial', 10))
+    tk.Label(frame, text="Enter your email address:").pack(pady=5)
+    email_entry = tk.Entry(frame, width=30, font=('Arial', 10))
     email_entry.pack(pady=5)
     
     def reset_password():
         email = email_entry.get()
+        loginCredentials = state['credentials']
         
         if not validate_email(email):
             messagebox.showerror("Error", "Please enter a valid email address")
@@ -104,7 +171,7 @@ def show_forgot_password(root, loginCredentials):
             # Generate a simple reset code
             new_password = "Temp123"
             loginCredentials[email] = new_password
-            save_credentials(loginCredentials)  # Save to file
+            save_credential(email, new_password)  # Save to file
             
             messagebox.showinfo("Success", 
                 f"Password reset successful!\nYour temporary password is: {new_password}\n"
@@ -116,10 +183,19 @@ def show_forgot_password(root, loginCredentials):
         else:
             messagebox.showerror("Error", "Email address not found")
     
-    tk.Button(root, text="Reset Password", command=reset_password, width=20, height=2).pack(pady=10)
-    tk.Button(root, text="Back to Login", 
+    tk.Button(frame, text="Reset Password", command=reset_password, width=20, height=2).pack(pady=10)
+    tk.Button(frame, text="Back to Login", 
               command=lambda: [clear_screen(root), __import__('marvin_code').try_login()], 
               width=20).pack(pady=5)
+    
+    def refresh(loginCredentials):
+        state['credentials'] = loginCredentials
+        # Size of screen
+        root.geometry("500x400")
+        root.resizable(True, True)
+        email_entry.delete(0, tk.END)
+    
+    return refresh
 
 def show_login_screen(root, loginCredentials):
     """Add forgot password button to login screen"""
@@ -130,161 +206,178 @@ def show_login_screen(root, loginCredentials):
 
 def show_dashboard(root, current_user, loginCredentials):
     """Show main dashboard after login"""
-    clear_screen(root)
-    root.geometry("500x400")
-    root.resizable(True, True)
-    
-    # Ensure user has a profile
-    if current_user not in user_profiles:
-        user_profiles[current_user] = {
-            'name': current_user.split('@')[0],  # Use username part of email as default name
-            'bio': 'No bio yet',
-            'grad_year': '2025',
-            'major': 'Undeclared',
-            'minor': 'None'
-        }
-        save_profiles(user_profiles)  # Save new profile
-    
-    user_name = user_profiles[current_user]['name']
-    tk.Label(root, text=f"Welcome, {user_name}!", font=('Arial', 16, 'bold')).pack(pady=20)
-    
-    tk.Button(root, text="View My Profile", 
-              command=lambda: show_profile(root, current_user, loginCredentials), 
+    show_screen(root, "dashboard", build_dashboard, current_user, loginCredentials)
+
+def build_dashboard(root, frame):
+    state = {}
+    
+    welcome_label = tk.Label(frame, font=('Arial', 16, 'bold'))
+    welcome_label.pack(pady=20)
+    
+    tk.Button(frame, text="View My Profile", 
+              command=lambda: show_profile(root, state['user'], state['credentials']), 
               width=20, height=2).pack(pady=5)
-    tk.Button(root, text="Edit My Profile", 
-              command=lambda: edit_profile(root, current_user, loginCredentials), 
+    tk.Button(frame, text="Edit My Profile", 
+              command=lambda: edit_profile(root, state['user'], state['credentials']), 
               width=20, height=2).pack(pady=5)
-    tk.Button(root, text="Change Password", 
-              command=lambda: show_change_password(root, current_user, loginCredentials), 
+    tk.Button(frame, text="Change Password", 
+              command=lambda: show_change_password(root, state['user'], state['credentials']), 
               width=20, height=2).pack(pady=5)
-    tk.Button(root, text="Logout", 
+    tk.Button(frame, text="Logout", 
               command=lambda: [clear_screen(root), __import__('marvin_code').try_login()], 
               width=20, height=2).pack(pady=20)
+    
+    def refresh(current_user, loginCredentials):
+        state['user'], state['credentials'] = current_user, loginCredentials
+        root.geometry("500x400")
+        root.resizable(True, True)
+        
+        # Ensure user has a profile
+        if current_user not in user_profiles:
+            user_profiles[current_user] = get_database_profile(current_user) or {
+                'name': current_user.split('@')[0],  # Use username part of email as default name
+                'bio': 'No bio yet',
+                'grad_year': '2025',
+                'major': 'Undeclared',
+                'minor': 'None'
+            }
+            save_profile(current_user, user_profiles[current_user])  # Save new profile
+        
+        user_name = user_profiles[current_user]['name']
+        welcome_label.config(text=f"Welcome, {user_name}!")
+    
+    return refresh
 
 def show_profile(root, current_user, loginCredentials):
     """Show user profile"""
-    clear_screen(root)
-    
-    # Reload profiles to ensure we have latest data
-    global user_profiles
-    user_profiles = load_profiles()
-    
-    profile = user_profiles.get(current_user, {})
+    show_screen(root, "profile", build_profile, current_user, loginCredentials)
+
+def build_profile(root, frame):
+    state = {}
     
-    tk.Label(root, text="My Profile", font=('Arial', 16, 'bold')).pack(pady=20)
+    tk.Label(frame, text="My Profile", font=('Arial', 16, 'bold')).pack(pady=20)
     
-    details_frame = tk.Frame(root)
+    details_frame = tk.Frame(frame)
     details_frame.pack(pady=10, padx=20)
     
-    tk.Label(details_frame, text=f"Name: {profile.get('name', 'Not set')}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
-    tk.Label(details_frame, text=f"Email: {current_user}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
-    tk.Label(details_frame, text=f"Bio: {profile.get('bio', 'Not set')}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
-    tk.Label(details_frame, text=f"Graduation Year: {profile.get('grad_year', 'Not set')}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
-    tk.Label(details_frame, text=f"Major: {profile.get('major', 'Not set')}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
-    tk.Label(details_frame, text=f"Minor: {profile.get('minor', 'Not set')}", font=('Arial', 11), anchor='w').pack(fill='x', pady=5)
+    detail_labels = {}
+    for key in ('name', 'email', 'bio', 'grad_year', 'major', 'minor'):
+        detail_labels[key] = tk.Label(details_frame, font=('Arial', 11), anchor='w')
+        detail_labels[key].pack(fill='x', pady=5)
     
-    tk.Button(root, text="Edit Profile", 
-              command=lambda: edit_profile(root, current_user, loginCredentials), 
+    tk.Button(frame, text="Edit Profile", 
+              command=lambda: edit_profile(root, state['user'], state['credentials']), 
               width=15).pack(pady=5)
-    tk.Button(root, text="Back to Dashboard", 
-              command=lambda: show_dashboard(root, current_user, loginCredentials), 
+    tk.Button(frame, text="Back to Dashboard", 
+              command=lambda: show_dashboard(root, state['user'], state['credentials']), 
               width=15).pack(pady=5)
+    
+    def refresh(current_user, loginCredentials):
+        state['user'], state['credentials'] = current_user, loginCredentials
+        
+        # Always the latest saved data, without parsing every profile
+        profile = profile_reader.get(current_user) or get_database_profile(current_user) or {}
+        
+        detail_labels['name'].config(text=f"Name: {profile.get('name', 'Not set')}")
+        detail_labels['email'].config(text=f"Email: {current_user}")
+        detail_labels['bio'].config(text=f"Bio: {profile.get('bio', 'Not set')}")
+        detail_labels['grad_year'].config(text=f"Graduation Year: {profile.get('grad_year', 'Not set')}")
+        detail_labels['major'].config(text=f"Major: {profile.get('major', 'Not set')}")
+        detail_labels['minor'].config(text=f"Minor: {profile.get('minor', 'Not set')}")
+    
+    return refresh
 
 def edit_profile(root, current_user, loginCredentials):
     """Edit user profile"""
-    clear_screen(root)
-    
-    # Reload profiles to ensure we have latest data
-    global user_profiles
-    user_profiles = load_profiles()
-    
-    current_profile = user_profiles.get(current_user, {
-        'name': '', 'bio': '', 'grad_year': '', 'major': '', 'minor': ''
-    })
+    show_screen(root, "edit_profile", build_edit_profile, current_user, loginCredentials)
+
+def build_edit_profile(root, frame):
+    state = {}
     
-    tk.Label(root, text="Edit Profile", font=('Arial', 16, 'bold')).pack(pady=20)
+    tk.Label(frame, text="Edit Profile", font=('Arial', 16, 'bold')).pack(pady=20)
     
-    form_frame = tk.Frame(root)
+    form_frame = tk.Frame(frame)
     form_frame.pack(pady=10, padx=20)
     
-    # Name
-    tk.Label(form_frame, text="Full Name:").grid(row=0, column=0, sticky='w', pady=5)
-    name_entry = tk.Entry(form_frame, width=30)
-    name_entry.insert(0, current_profile.get('name', ''))
-    name_entry.grid(row=0, column=1, pady=5, padx=10)
-    
-    # Bio
-    tk.Label(form_frame, text="Bio:").grid(row=1, column=0, sticky='w', pady=5)
-    bio_entry = tk.Entry(form_frame, width=30)
-    bio_entry.insert(0, current_profile.get('bio', ''))
-    bio_entry.grid(row=1, column=1, pady=5, padx=10)
-    
-    # Graduation Year
-    tk.Label(form_frame, text="Graduation Year:").grid(row=2, column=0, sticky='w', pady=5)
-    year_entry = tk.Entry(form_frame, width=30)
-    year_entry.insert(0, current_profile.get('grad_year', ''))
-    year_entry.grid(row=2, column=1, pady=5, padx=10)
-    
-    # Major
-    tk.Label(form_frame, text="Major:").grid(row=3, column=0, sticky='w', pady=5)
-    major_entry = tk.Entry(form_frame, width=30)
-    major_entry.insert(0, current_profile.get('major', ''))
-    major_entry.grid(row=3, column=1, pady=5, padx=10)
-    
-    # Minor
-    tk.Label(form_frame, text="Minor:").grid(row=4, column=0, sticky='w', pady=5)
-    minor_entry = tk.Entry(form_frame, width=30)
-    minor_entry.insert(0, current_profile.get('minor', ''))
-    minor_entry.grid(row=4, column=1, pady=5, padx=10)
-    
-    def save_profile():
+    # Name, Bio, Graduation Year, Major, Minor
+    entries = {}
+    for row, (key, text) in enumerate((('name', "Full Name:"), ('bio', "Bio:"), ('grad_year', "Graduation Year:"),
+                                       ('major', "Major:"), ('minor', "Minor:"))):
+        tk.Label(form_frame, text=text).grid(row=row, column=0, sticky='w', pady=5)
+        entries[key] = tk.Entry(form_frame, width=30)
+        entries[key].grid(row=row, column=1, pady=5, padx=10)
+    
+    def save_changes():
+        current_user = state['user']
         # Update profiles dictionary
-        user_profiles[current_user] = {
-            'name': name_entry.get(),
-            'bio': bio_entry.get(),
-            'grad_year': year_entry.get(),
-            'major': major_entry.get(),
-            'minor': minor_entry.get()
-        }
+        user_profiles[current_user] = {key: entry.get() for key, entry in entries.items()}
         
         # Save to file
-        save_profiles(user_profiles)
+        save_profile(current_user, user_profiles[current_user])
         
         messagebox.showinfo("Success", "Profile updated successfully!")
-        show_dashboard(root, current_user, loginCredentials)
+        show_dashboard(root, current_user, state['credentials'])
     
-    button_frame = tk.Frame(root)
+    button_frame = tk.Frame(frame)
     button_frame.pack(pady=20)
     
-    tk.Button(button_frame, text="Save Profile", command=save_profile, width=15).pack(side='left', padx=5)
+    tk.Button(button_frame, text="Save Profile", command=save_changes, width=15).pack(side='left', padx=5)
     tk.Button(button_frame, text="Cancel", 
-              command=lambda: show_dashboard(root, current_user, loginCredentials), 
+              command=lambda: show_dashboard(root, state['user'], state['credentials']), 
               width=15).pack(side='left', padx=5)
+    
+    def refresh(current_user, loginCredentials):
+        state['user'], state['credentials'] = current_user, loginCredentials
+        
+        # Always the latest saved data, without parsing every profile
+        current_profile = profile_reader.get(current_user) or get_database_profile(current_user) or {}
+        for key, entry in entries.items():
+            entry.delete(0, tk.END)
+            entry.insert(0, current_profile.get(key, ''))
+    
+    return refresh
 
 def show_change_password(root, current_user, loginCredentials):
     """Change password screen"""
-    clear_screen(root)
+    show_screen(root, "change_password", build_change_password, current_user, loginCredentials)
+
+def build_change_password(root, frame):
+    state = {}
     
-    tk.Label(root, text="Change Password", font=('Arial', 16, 'bold')).pack(pady=20)
+    tk.Label(frame, text="Change Password", font=('Arial', 16, 'bold')).pack(pady=20)
     
-    tk.Label(root, text="Current Password:").pack(pady=5)
-    current_pass_entry = tk.Entry(root, width=30, show="*")
+    tk.Label(frame, text="Current Password:").pack(pady=5)
+    current_pass_entry = tk.Entry(frame, width=30, show="*")
     current_pass_entry.pack(pady=5)
     
-    tk.Label(root, text="New Password:").pack(pady=5)
-    new_pass_entry = tk.Entry(root, width=30, show="*")
+    tk.Label(frame, text="New Password:").pack(pady=5)
+    new_pass_entry = tk.Entry(frame, width=30, show="*")
     new_pass_entry.pack(pady=5)
     
-    tk.Label(root, text="Confirm New Password:").pack(pady=5)
-    confirm_pass_entry = tk.Entry(root, width=30, show="*")
+    tk.Label(frame, text="Confirm New Password:").pack(pady=5)
+    confirm_pass_entry = tk.Entry(frame, width=30, show="*")
     confirm_pass_entry.pack(pady=5)
     
     def change_password():
+        current_user, loginCredentials = state['user'], state['credentials']
         current_pass = current_pass_entry.get()
         new_pass = new_pass_entry.get()
         confirm_pass = confirm_pass_entry.get()
         
-        if loginCredentials[current_user] != current_pass:
+        if current_user in loginCredentials:
+            finish_change_password(current_user, loginCredentials, loginCredentials[current_user] == current_pass,
+                                   new_pass, confirm_pass)
+        else:
+            change_button.config(state="disabled")
+
+            def done(current_ok):
+                change_button.config(state="normal")
+                finish_change_password(current_user, loginCredentials, current_ok, new_pass, confirm_pass)
+
+            check_database_login_later(root, current_user, current_pass, done)
+
+    def finish_change_password(current_user, loginCredentials, current_ok, new_pass, confirm_pass):
+        if not current_ok:
             messagebox.showerror("Error", "Current password is incorrect")
         elif new_pass != confirm_pass:
             messagebox.showerror("Error", "New passwords do not match")
@@ -292,14 +385,22 @@ def show_change_password(root, current_user, loginCredentials):
             messagebox.showerror("Error", "Password must be at least 6 characters long")
         else:
             loginCredentials[current_user] = new_pass
-            save_credentials(loginCredentials)  # Save to file
+            save_credential(current_user, new_pass)  # Save to file
             messagebox.showinfo("Success", "Password changed successfully!")
             show_dashboard(root, current_user, loginCredentials)
     
-    tk.Button(root, text="Change Password", command=change_password, width=20, height=2).pack(pady=10)
-    tk.Button(root, text="Cancel", 
-              command=lambda: show_dashboard(root, current_user, loginCredentials), 
+    change_button = tk.Button(frame, text="Change Password", command=change_password, width=20, height=2)
+    change_button.pack(pady=10)
+    tk.Button(frame, text="Cancel", 
+              command=lambda: show_dashboard(root, state['user'], state['credentials']), 
               width=20).pack(pady=5)
+    
+    def refresh(current_user, loginCredentials):
+        state['user'], state['credentials'] = current_user, loginCredentials
+        for entry in (current_pass_entry, new_pass_entry, confirm_pass_entry):
+            entry.delete(0, tk.END)
+    
+    return refresh
 
 def start_user_management(current_user, loginCredentials):
     """Start the user management GUI - called from login.py"""
@@ -307,6 +408,7 @@ def start_user_management(current_user, loginCredentials):
     root.title("University User Management")
     root.geometry("500x400")
     root.resizable(False, False)
+    credential_store.start_compaction_thread(credential_file)
     
     show_dashboard(root, current_user, loginCredentials)
     root.mainloop()